@@ -0,0 +1,312 @@
+"""
+Benchmark helpers for the admin analytics tables, API endpoints and CSV exports.
+"""
+import json
+import math
+import time
+from datetime import date
+from logging import getLogger
+
+from edx_django_utils.cache import TieredCache
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_csv.renderers import CSVStreamingRenderer
+
+from django.contrib.auth import get_user_model
+from django.urls import resolve, reverse
+
+from enterprise_data.admin_analytics.database.tables import (
+    FactEngagementAdminDashTable,
+    FactEnrollmentAdminDashTable,
+    SkillsDailyRollupAdminDashTable,
+)
+from enterprise_data.renderers import EnrollmentsCSVRenderer, IndividualEngagementsCSVRenderer
+
+LOGGER = getLogger(__name__)
+
+PAGE_SIZE = 100
+
+# Endpoints exercised by the benchmark as (name, url name, url kwarg holding the enterprise uuid, extra params).
+ENDPOINTS = (
+    ('aggregates', 'enterprise-admin-analytics-aggregates', 'enterprise_id', {}),
+    ('skills', 'enterprise-admin-analytics-skills', 'enterprise_id', {}),
+    ('enrolled_courses', 'enterprise-enrolled-courses', 'enterprise_uuid', {}),
+    ('enrollments', 'enterprise-admin-analytics-enrollments', 'enterprise_uuid', {}),
+    ('enrollments_stats', 'enterprise-admin-analytics-enrollments-stats', 'enterprise_uuid', {}),
+    ('completions', 'enterprise-admin-analytics-completions', 'enterprise_uuid', {}),
+    ('completions_stats', 'enterprise-admin-analytics-completions-stats', 'enterprise_uuid', {}),
+    ('engagements', 'enterprise-admin-analytics-engagements', 'enterprise_uuid', {}),
+    ('engagements_stats', 'enterprise-admin-analytics-engagements-stats', 'enterprise_uuid', {}),
+    ('leaderboard', 'enterprise-admin-analytics-leaderboard-list', 'enterprise_uuid', {}),
+)
+
+# Endpoints that can export their full result set as CSV.
+CSV_EXPORTS = (
+    ('enrollments_csv', 'enterprise-admin-analytics-enrollments', 'enterprise_uuid', {'response_type': 'csv'}),
+    ('completions_csv', 'enterprise-admin-analytics-completions', 'enterprise_uuid', {'response_type': 'csv'}),
+    ('engagements_csv', 'enterprise-admin-analytics-engagements', 'enterprise_uuid', {'response_type': 'csv'}),
+    ('leaderboard_csv', 'enterprise-admin-analytics-leaderboard-list', 'enterprise_uuid', {'response_type': 'csv'}),
+)
+
+
+def percentile(sorted_values, fraction):
+    """
+    Return the value at the given fraction of the sorted values, interpolating between neighbours.
+
+    Arguments:
+        sorted_values (list<float>): Values sorted in ascending order.
+        fraction (float): Percentile as a fraction between 0 and 1.
+
+    Returns:
+        (float): The percentile value.
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower, upper = math.floor(position), math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(durations):
+    """
+    Summarize a list of durations (in seconds) as milliseconds.
+
+    Arguments:
+        durations (list<float>): Measured durations in seconds.
+
+    Returns:
+        (dict): count, min, max, mean, p50, p95 and p99 of the durations in milliseconds.
+    """
+    values = sorted(duration * 1000 for duration in durations)
+    return {
+        'count': len(values),
+        'min': round(values[0], 3) if values else 0.0,
+        'max': round(values[-1], 3) if values else 0.0,
+        'mean': round(sum(values) / len(values), 3) if values else 0.0,
+        'p50': round(percentile(values, 0.50), 3),
+        'p95': round(percentile(values, 0.95), 3),
+        'p99': round(percentile(values, 0.99), 3),
+    }
+
+
+def run_case(func, iterations=5, warmup=1, cold=True):
+    """
+    Call `func` repeatedly and summarize the time taken by each call.
+
+    Arguments:
+        func (callable): Function to benchmark, called without arguments.
+        iterations (int): Number of measured calls.
+        warmup (int): Number of calls made before measuring.
+        cold (bool): When True, all cache tiers are cleared before every call.
+
+    Returns:
+        (dict): Summary of the measured durations, see `summarize`.
+    """
+    durations = []
+    for index in range(warmup + iterations):
+        if cold:
+            TieredCache.dangerous_clear_all_tiers()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if index >= warmup:
+            durations.append(elapsed)
+    return summarize(durations)
+
+
+def _uncached(method):
+    """
+    Return the undecorated version of a table method so the benchmark always hits the database.
+    """
+    return getattr(method, '__wrapped__', method)
+
+
+def table_cases(enterprise_customer_uuid, start_date, end_date):
+    """
+    Return the (name, callable) pairs timing every admin analytics table method for an enterprise.
+    """
+    enrollments = FactEnrollmentAdminDashTable()
+    engagements = FactEngagementAdminDashTable()
+    skills = SkillsDailyRollupAdminDashTable()
+    common = {
+        'enterprise_customer_uuid': enterprise_customer_uuid,
+        'start_date': start_date,
+        'end_date': end_date,
+    }
+    grouped = dict(common, group_uuid=None)
+    paged = dict(grouped, limit=PAGE_SIZE, offset=0)
+
+    def leaderboard():
+        total_count = _uncached(engagements.get_leaderboard_data_count)(engagements, **common)
+        engagements.get_all_leaderboard_data(limit=PAGE_SIZE, offset=0, total_count=total_count, **common)
+
+    cases = [
+        ('enrollments.get_enrollment_date_range', enrollments, 'get_enrollment_date_range',
+         {'enterprise_customer_uuid': enterprise_customer_uuid}),
+        ('enrollments.get_enrollment_count', enrollments, 'get_enrollment_count', grouped),
+        ('enrollments.get_all_enrollments', enrollments, 'get_all_enrollments', paged),
+        ('enrollments.get_enrollment_and_course_count', enrollments, 'get_enrollment_and_course_count', common),
+        ('enrollments.get_completion_count', enrollments, 'get_completion_count', grouped),
+        ('enrollments.get_top_courses_by_enrollments', enrollments, 'get_top_courses_by_enrollments', grouped),
+        ('enrollments.get_top_subjects_by_enrollments', enrollments, 'get_top_subjects_by_enrollments', grouped),
+        ('enrollments.get_enrolment_time_series_data', enrollments, 'get_enrolment_time_series_data', grouped),
+        ('enrollments.get_all_completions', enrollments, 'get_all_completions', paged),
+        ('enrollments.get_top_courses_by_completions', enrollments, 'get_top_courses_by_completions', grouped),
+        ('enrollments.get_top_subjects_by_completions', enrollments, 'get_top_subjects_by_completions', grouped),
+        ('enrollments.get_completions_time_series_data', enrollments, 'get_completions_time_series_data', grouped),
+        ('enrollments.get_all_enrolled_courses', enrollments, 'get_all_enrolled_courses', common),
+        ('engagements.get_learning_hours_and_daily_sessions', engagements,
+         'get_learning_hours_and_daily_sessions', common),
+        ('engagements.get_engagement_count', engagements, 'get_engagement_count', grouped),
+        ('engagements.get_all_engagements', engagements, 'get_all_engagements', paged),
+        ('engagements.get_top_courses_by_engagement', engagements, 'get_top_courses_by_engagement', grouped),
+        ('engagements.get_top_subjects_by_engagement', engagements, 'get_top_subjects_by_engagement', grouped),
+        ('engagements.get_engagement_time_series_data', engagements, 'get_engagement_time_series_data', grouped),
+        ('engagements.get_leaderboard_data_count', engagements, 'get_leaderboard_data_count', common),
+        ('skills.get_top_skills', skills, 'get_top_skills', common),
+        ('skills.get_top_skills_by_enrollment', skills, 'get_top_skills_by_enrollment', common),
+        ('skills.get_top_skills_by_completion', skills, 'get_top_skills_by_completion', common),
+        ('skills.get_skills_by_learning_hours', skills, 'get_skills_by_learning_hours', common),
+        ('skills.get_unique_skills_gained', skills, 'get_unique_skills_gained', common),
+        ('skills.get_upskilled_learners_count', skills, 'get_upskilled_learners_count', common),
+        ('skills.get_new_skills_learned_count', skills, 'get_new_skills_learned_count', common),
+    ]
+    result = [
+        (name, lambda table=table, method=method, kwargs=kwargs: _uncached(getattr(table, method))(table, **kwargs))
+        for name, table, method, kwargs in cases
+    ]
+    result.append(('engagements.get_all_leaderboard_data', leaderboard))
+    return result
+
+
+def _benchmark_user():
+    """
+    Return an unsaved active superuser, permission checks pass for it without touching the database.
+    """
+    return get_user_model()(username='admin-analytics-benchmark', is_active=True, is_staff=True, is_superuser=True)
+
+
+def _request_case(user, url_name, url_kwargs, params):
+    """
+    Return a callable that dispatches a GET request to the given view and consumes the whole response.
+    """
+    factory = APIRequestFactory()
+    path = reverse(f'v1:{url_name}', kwargs=url_kwargs)
+    match = resolve(path)
+
+    def request():
+        http_request = factory.get(path, params)
+        force_authenticate(http_request, user=user)
+        response = match.func(http_request, *match.args, **match.kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{path} returned status {response.status_code}')
+        if getattr(response, 'streaming', False):
+            return sum(len(chunk) for chunk in response.streaming_content)
+        return len(response.render().content)
+
+    return request
+
+
+def endpoint_cases(enterprise_customer_uuid, start_date, end_date, endpoints=ENDPOINTS):
+    """
+    Return the (name, callable) pairs timing the given API endpoints for an enterprise.
+    """
+    user = _benchmark_user()
+    params = {
+        'start_date': start_date.strftime('%Y-%m-%d') if isinstance(start_date, date) else start_date,
+        'end_date': end_date.strftime('%Y-%m-%d') if isinstance(end_date, date) else end_date,
+    }
+    return [
+        (name, _request_case(user, url_name, {kwarg: enterprise_customer_uuid}, dict(params, **extra_params)))
+        for name, url_name, kwarg, extra_params in endpoints
+    ]
+
+
+def csv_cases(enterprise_customer_uuid, start_date, end_date):
+    """
+    Return the (name, callable) pairs timing every CSV export for an enterprise.
+    """
+    return endpoint_cases(enterprise_customer_uuid, start_date, end_date, endpoints=CSV_EXPORTS)
+
+
+def _sample_rows(header, count=1000):
+    """
+    Return `count` distinct flat rows with the given header, mixing strings, numbers, dates and empty values.
+    """
+    values = (
+        lambda index: f'learner{index}@example.com',
+        lambda index: f'Course "{index}", with quotes',
+        lambda index: index * 1.5,
+        lambda index: date(2024, 1, 1 + index % 28),
+        lambda index: None if index % 3 else True,
+    )
+    return [
+        {field: values[position % len(values)](index) for position, field in enumerate(header)}
+        for index in range(count)
+    ]
+
+
+def renderer_cases(row_count=1000000):
+    """
+    Return the (name, callable) pairs timing the CSV renderers on exports of `row_count` rows.
+
+    The generic `CSVStreamingRenderer` is timed next to the flat renderers actually used by the views.
+    """
+    cases = []
+    for renderer_class in (IndividualEngagementsCSVRenderer, EnrollmentsCSVRenderer):
+        sample = _sample_rows(renderer_class.header)
+
+        def rows(sample=sample):
+            return (sample[index % len(sample)] for index in range(row_count))
+
+        def generic(header=renderer_class.header, rows=rows):
+            return sum(len(chunk) for chunk in CSVStreamingRenderer().render(rows(), renderer_context={
+                'header': header,
+            }))
+
+        def flat(renderer_class=renderer_class, rows=rows):
+            return sum(len(chunk) for chunk in renderer_class().render(rows()))
+
+        cases.append((f'renderer.{renderer_class.__name__}.generic', generic))
+        cases.append((f'renderer.{renderer_class.__name__}.flat', flat))
+    return cases
+
+
+def save_baseline(results, path):
+    """
+    Store benchmark results as a JSON baseline.
+    """
+    with open(path, 'w', encoding='utf-8') as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    """
+    Load benchmark results stored with `save_baseline`.
+    """
+    with open(path, encoding='utf-8') as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare_to_baseline(results, baseline, threshold=0.2, metric='p95'):
+    """
+    Find the benchmark cases that got slower than the baseline.
+
+    Arguments:
+        results (dict): Current results keyed by case name.
+        baseline (dict): Baseline results keyed by case name.
+        threshold (float): Allowed slowdown as a fraction of the baseline, 0.2 allows cases to be 20% slower.
+        metric (str): Summary metric to compare.
+
+    Returns:
+        (list<tuple>): (name, baseline value, current value) for every regressed case.
+    """
+    regressions = []
+    for name, summary in results.items():
+        if name not in baseline:
+            continue
+        previous, current = baseline[name][metric], summary[metric]
+        if current > previous * (1 + threshold):
+            regressions.append((name, previous, current))
+    return regressions
@@ -0,0 +1,198 @@
+"""
+Composite covering indexes for the admin analytics query shapes.
+
+Every query in `admin_analytics/database/queries` filters on `enterprise_customer_uuid` plus a date range, adds
+optional equality filters on `course_product_line`, `course_key`, `subsidy_access_policy_uuid` and
+`enterprise_user_id`, and aggregates a handful of columns. The indexes below put the equality columns first,
+then the range column, then the optional filters and aggregated columns so that MySQL can answer the queries
+from the index alone.
+"""
+from collections import namedtuple
+from contextlib import closing
+from datetime import date, timedelta
+
+from .filters import FactCompletionAdminDashFilters, FactEngagementAdminDashFilters, FactEnrollmentAdminDashFilters
+from .queries import FactEngagementAdminDashQueries, FactEnrollmentAdminDashQueries, SkillsDailyRollupAdminDashQueries
+from .query_filters import QueryFilters
+from .tables import SkillsDailyRollupAdminDashTable
+from .utils import get_db_connection, run_query
+
+IndexSpec = namedtuple('IndexSpec', ['table', 'name', 'columns'])
+
+OPTIONAL_FILTER_COLUMNS = ('course_product_line', 'course_key', 'subsidy_access_policy_uuid')
+
+COVERING_INDEXES = (
+    IndexSpec(
+        'fact_enrollment_admin_dash',
+        'ix_fead_enterprise_enrollment_date',
+        ('enterprise_customer_uuid', 'enterprise_enrollment_date') + OPTIONAL_FILTER_COLUMNS + (
+            'enterprise_user_id', 'has_passed',
+        ),
+    ),
+    IndexSpec(
+        'fact_enrollment_admin_dash',
+        'ix_fead_enterprise_passed_date',
+        ('enterprise_customer_uuid', 'has_passed', 'passed_date') + OPTIONAL_FILTER_COLUMNS + (
+            'enterprise_user_id',
+        ),
+    ),
+    IndexSpec(
+        'fact_enrollment_admin_dash',
+        'ix_fead_enterprise_email',
+        ('enterprise_customer_uuid', 'email', 'has_passed', 'passed_date'),
+    ),
+    IndexSpec(
+        'fact_enrollment_engagement_day_admin_dash',
+        'ix_feeda_enterprise_activity_date',
+        ('enterprise_customer_uuid', 'activity_date') + OPTIONAL_FILTER_COLUMNS + (
+            'enterprise_user_id', 'is_engaged', 'learning_time_seconds',
+        ),
+    ),
+    IndexSpec(
+        'fact_enrollment_engagement_day_admin_dash',
+        'ix_feeda_enterprise_email',
+        ('enterprise_customer_uuid', 'email', 'activity_date', 'is_engaged', 'learning_time_seconds'),
+    ),
+    IndexSpec(
+        'skills_daily_rollup_admin_dash',
+        'ix_sdra_enterprise_date',
+        ('enterprise_customer_uuid', 'enterprise_group_uuid', 'date') + OPTIONAL_FILTER_COLUMNS + (
+            'skill_name', 'skill_type', 'enrolls', 'completions',
+        ),
+    ),
+)
+
+
+def get_existing_indexes(table):
+    """
+    Get the indexes of the given table from the live schema.
+
+    Arguments:
+        table (str): Name of the table.
+
+    Returns:
+        (dict): Index name mapped to the tuple of its columns, in index order.
+    """
+    rows = run_query(
+        query="""
+            SELECT index_name, column_name
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %(table)s
+            ORDER BY index_name, seq_in_index;
+        """,
+        params={'table': table},
+    )
+    indexes = {}
+    for index_name, column_name in rows:
+        indexes[index_name] = indexes.get(index_name, ()) + (column_name,)
+    return indexes
+
+
+def is_covered(spec, existing_indexes):
+    """
+    Return True if one of the existing indexes starts with all the columns of the given index spec.
+    """
+    return any(columns[:len(spec.columns)] == spec.columns for columns in existing_indexes.values())
+
+
+def get_missing_indexes(specs=COVERING_INDEXES):
+    """
+    Get the index specs that are not covered by any index of the live schema.
+    """
+    existing_indexes = {}
+    missing = []
+    for spec in specs:
+        if spec.table not in existing_indexes:
+            existing_indexes[spec.table] = get_existing_indexes(spec.table)
+        if not is_covered(spec, existing_indexes[spec.table]):
+            missing.append(spec)
+    return missing
+
+
+def create_index_sql(spec):
+    """
+    Return the DDL statement creating the given index.
+    """
+    return f'CREATE INDEX {spec.name} ON {spec.table} ({", ".join(spec.columns)});'
+
+
+def create_index(spec):
+    """
+    Create the given index on the live schema.
+
+    `run_query` expects a result set, so the DDL statement is executed on a dedicated connection instead.
+    """
+    with closing(get_db_connection()) as connection:
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(create_index_sql(spec))
+
+
+def get_explain_queries(enterprise_customer_uuid, start_date=None, end_date=None):
+    """
+    Get the main admin analytics queries along with the index each of them should use.
+
+    Arguments:
+        enterprise_customer_uuid (str): Enterprise customer to build the query parameters for.
+        start_date (date): Start of the date range, defaults to one year ago.
+        end_date (date): End of the date range, defaults to today.
+
+    Returns:
+        (list<tuple>): (name, expected index name, query, params) for every query.
+    """
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=365)
+    params = {'enterprise_customer_uuid': enterprise_customer_uuid, 'start_date': start_date, 'end_date': end_date}
+    enrollment_filters = FactEnrollmentAdminDashFilters()
+    completion_filters = FactCompletionAdminDashFilters()
+    engagement_filters = FactEngagementAdminDashFilters()
+
+    def filters(filter_class, column, *extra):
+        return QueryFilters([
+            filter_class.enterprise_customer_uuid_filter('enterprise_customer_uuid'),
+            filter_class.date_range_filter(column, 'start_date', 'end_date'),
+            *extra,
+        ])
+
+    enrollments = filters(enrollment_filters, 'enterprise_enrollment_date')
+    completions = filters(completion_filters, 'passed_date', completion_filters.has_passed_filter())
+    engagements = filters(engagement_filters, 'activity_date')
+    skills, skills_params = SkillsDailyRollupAdminDashTable().build_query_filters(
+        enterprise_customer_uuid, start_date, end_date,
+    )
+    return [
+        (
+            'enrollment_count', 'ix_fead_enterprise_enrollment_date',
+            FactEnrollmentAdminDashQueries.get_enrollment_count_query(enrollments), params,
+        ),
+        (
+            'enrollment_and_course_count', 'ix_fead_enterprise_enrollment_date',
+            FactEnrollmentAdminDashQueries.get_enrollment_and_course_count_query(enrollments), params,
+        ),
+        (
+            'completion_count', 'ix_fead_enterprise_passed_date',
+            FactEnrollmentAdminDashQueries.get_completion_count_query(completions), params,
+        ),
+        (
+            'engagement_count', 'ix_feeda_enterprise_activity_date',
+            FactEngagementAdminDashQueries.get_engagement_count_query(engagements), params,
+        ),
+        (
+            'learning_hours_and_daily_sessions', 'ix_feeda_enterprise_activity_date',
+            FactEngagementAdminDashQueries.get_learning_hours_and_daily_sessions_query(engagements), params,
+        ),
+        (
+            'top_skills', 'ix_sdra_enterprise_date',
+            SkillsDailyRollupAdminDashQueries.get_top_skills(skills), skills_params,
+        ),
+    ]
+
+
+def explain(query, params):
+    """
+    Get the indexes used by the given query according to `EXPLAIN`.
+
+    Returns:
+        (list<str>): Index names chosen by MySQL for each table access, `None` for full scans.
+    """
+    rows = run_query(query=f'EXPLAIN {query.strip().rstrip(";")}', params=params, as_dict=True)
+    return [row.get('key') for row in rows]
@@ -0,0 +1,284 @@
+"""
+Synthetic data for the admin analytics tables.
+
+These helpers populate a local MySQL/MariaDB database with a dataset that is large enough to surface
+performance problems in the queries under `admin_analytics/database/queries`. Enterprise sizes follow a
+Zipf distribution so that a handful of enterprises hold most of the rows, just like production.
+"""
+import random
+from contextlib import closing
+from datetime import date, timedelta
+from logging import getLogger
+from uuid import UUID
+
+from .utils import get_db_connection
+
+LOGGER = getLogger(__name__)
+
+FACT_ENROLLMENT_ADMIN_DASH = 'fact_enrollment_admin_dash'
+FACT_ENGAGEMENT_ADMIN_DASH = 'fact_enrollment_engagement_day_admin_dash'
+SKILLS_DAILY_ROLLUP_ADMIN_DASH = 'skills_daily_rollup_admin_dash'
+
+# Column definitions for every table read by the admin analytics queries. Only the columns referenced by
+# the queries and filters are included.
+TABLE_COLUMNS = {
+    FACT_ENROLLMENT_ADMIN_DASH: (
+        ('enterprise_customer_uuid', 'CHAR(32) NOT NULL'),
+        ('enterprise_customer_name', 'VARCHAR(255)'),
+        ('lms_enrollment_id', 'BIGINT'),
+        ('enterprise_user_id', 'BIGINT'),
+        ('user_id', 'BIGINT'),
+        ('email', 'VARCHAR(255)'),
+        ('course_key', 'VARCHAR(255)'),
+        ('courserun_key', 'VARCHAR(255)'),
+        ('course_subject', 'VARCHAR(255)'),
+        ('course_title', 'VARCHAR(255)'),
+        ('course_product_line', 'VARCHAR(64)'),
+        ('subsidy_access_policy_uuid', 'CHAR(32)'),
+        ('enterprise_enrollment_date', 'DATE'),
+        ('lms_enrollment_mode', 'VARCHAR(32)'),
+        ('enroll_type', 'VARCHAR(32)'),
+        ('grade_percent', 'DOUBLE'),
+        ('cert_awarded', 'TINYINT'),
+        ('has_passed', 'TINYINT'),
+        ('passed_date', 'DATE'),
+    ),
+    FACT_ENGAGEMENT_ADMIN_DASH: (
+        ('enterprise_customer_uuid', 'CHAR(32) NOT NULL'),
+        ('enterprise_user_id', 'BIGINT'),
+        ('email', 'VARCHAR(255)'),
+        ('course_key', 'VARCHAR(255)'),
+        ('courserun_key', 'VARCHAR(255)'),
+        ('course_subject', 'VARCHAR(255)'),
+        ('course_title', 'VARCHAR(255)'),
+        ('course_product_line', 'VARCHAR(64)'),
+        ('subsidy_access_policy_uuid', 'CHAR(32)'),
+        ('enroll_type', 'VARCHAR(32)'),
+        ('activity_date', 'DATE'),
+        ('learning_time_seconds', 'INT'),
+        ('is_engaged', 'TINYINT'),
+        ('is_engaged_video', 'TINYINT'),
+        ('is_engaged_forum', 'TINYINT'),
+        ('is_engaged_problem', 'TINYINT'),
+    ),
+    SKILLS_DAILY_ROLLUP_ADMIN_DASH: (
+        ('enterprise_customer_uuid', 'CHAR(32) NOT NULL'),
+        ('enterprise_group_uuid', 'CHAR(32)'),
+        ('date', 'DATE'),
+        ('skill_name', 'VARCHAR(255)'),
+        ('skill_type', 'VARCHAR(64)'),
+        ('confidence', 'DOUBLE'),
+        ('primary_subject_name', 'VARCHAR(255)'),
+        ('course_key', 'VARCHAR(255)'),
+        ('course_product_line', 'VARCHAR(64)'),
+        ('subsidy_access_policy_uuid', 'CHAR(32)'),
+        ('enrolls', 'INT'),
+        ('completions', 'INT'),
+        ('total_learning_time_hours', 'DOUBLE'),
+    ),
+}
+
+# Value used by the skills table for rows that do not belong to a group.
+DEFAULT_GROUP_UUID = '00000000000000000000000000000000'
+
+SUBJECTS = (
+    'business-management', 'computer-science', 'data-analysis-statistics', 'engineering', 'communication',
+    'medicine', 'humanities', 'economics-finance', 'language', 'art-culture',
+)
+SKILL_TYPES = ('Specialized Skill', 'Common Skill', 'Certification')
+ENROLL_TYPES = (('certificate', 'verified'), ('audit', 'audit'))
+PRODUCT_LINES = ('OCM', 'OCM', 'OCM', 'OCM', 'OCM', 'OCM', 'OCM', 'OCM', 'OCM', 'Executive Education')
+
+
+def create_tables():
+    """
+    Create the admin analytics tables if they do not exist yet.
+    """
+    with closing(get_db_connection()) as connection:
+        with closing(connection.cursor()) as cursor:
+            for table, columns in TABLE_COLUMNS.items():
+                column_definitions = ', '.join(f'{name} {sql_type}' for name, sql_type in columns)
+                cursor.execute(f'CREATE TABLE IF NOT EXISTS {table} ({column_definitions})')
+        connection.commit()
+
+
+def enterprise_sizes(enterprise_count, total, skew, rng):
+    """
+    Split `total` rows across `enterprise_count` enterprises following a Zipf distribution.
+
+    Arguments:
+        enterprise_count (int): Number of enterprises.
+        total (int): Total number of rows to distribute.
+        skew (float): Zipf exponent, larger values put more rows in the largest enterprises.
+        rng (random.Random): Random number generator used to shuffle the ranks.
+
+    Returns:
+        (list<int>): Number of rows for each enterprise, every enterprise gets at least one row.
+    """
+    weights = [1 / (rank ** skew) for rank in range(1, enterprise_count + 1)]
+    weight_sum = sum(weights)
+    sizes = [max(1, int(total * weight / weight_sum)) for weight in weights]
+    rng.shuffle(sizes)
+    return sizes
+
+
+class SyntheticEnterprise:
+    """
+    Deterministic generator of the admin analytics rows for a single enterprise.
+    """
+
+    def __init__(self, rng, enrollment_count, course_catalog, start_date, end_date):
+        """
+        Initialize the enterprise with its own uuid, learners and budgets.
+        """
+        self.rng = rng
+        self.uuid = UUID(int=rng.getrandbits(128), version=4).hex
+        self.name = f'Synthetic Enterprise {self.uuid[:8]}'
+        self.enrollment_count = enrollment_count
+        self.course_catalog = course_catalog
+        self.start_date = start_date
+        self.day_span = (end_date - start_date).days
+        self.learner_count = max(1, enrollment_count // 3)
+        self.budgets = [UUID(int=rng.getrandbits(128), version=4).hex for _ in range(3)] + [None]
+
+    def _random_date(self, after=None):
+        """
+        Return a random date in the dataset's date range, after the given date when provided.
+        """
+        start = after or self.start_date
+        remaining = max(0, self.day_span - (start - self.start_date).days)
+        return start + timedelta(days=self.rng.randint(0, remaining))
+
+    def enrollments(self):
+        """
+        Yield (enrollment row, engagement context) tuples for this enterprise.
+        """
+        rng = self.rng
+        for _ in range(self.enrollment_count):
+            learner = rng.randrange(self.learner_count)
+            enterprise_user_id = int(self.uuid[:6], 16) * 1000000 + learner
+            course_key, course_title, course_subject, product_line = rng.choice(self.course_catalog)
+            enroll_type, enrollment_mode = ENROLL_TYPES[0] if rng.random() < 0.8 else ENROLL_TYPES[1]
+            enrollment_date = self._random_date()
+            has_passed = int(rng.random() < 0.3)
+            passed_date = self._random_date(after=enrollment_date) if has_passed else None
+            budget = rng.choice(self.budgets)
+            row = (
+                self.uuid, self.name, rng.getrandbits(40), enterprise_user_id, enterprise_user_id,
+                f'learner{learner}@{self.uuid[:8]}.example.com', course_key, f'course-v1:{course_key}+1T2024',
+                course_subject, course_title, product_line, budget, enrollment_date, enrollment_mode,
+                enroll_type, round(rng.random(), 2), has_passed, has_passed, passed_date,
+            )
+            yield row
+
+    def engagements(self, enrollment, days):
+        """
+        Yield `days` engagement rows for the given enrollment row.
+        """
+        rng = self.rng
+        (
+            enterprise_uuid, _, _, enterprise_user_id, _, email, course_key, courserun_key, course_subject,
+            course_title, product_line, budget, enrollment_date, _, enroll_type, _, _, _, _,
+        ) = enrollment
+        for _ in range(days):
+            is_engaged_video, is_engaged_forum, is_engaged_problem = (int(rng.random() < 0.5) for _ in range(3))
+            yield (
+                enterprise_uuid, enterprise_user_id, email, course_key, courserun_key, course_subject,
+                course_title, product_line, budget, enroll_type, self._random_date(after=enrollment_date),
+                rng.randint(0, 7200), int(is_engaged_video or is_engaged_forum or is_engaged_problem),
+                is_engaged_video, is_engaged_forum, is_engaged_problem,
+            )
+
+    def skills(self, enrollment, skill_names):
+        """
+        Yield skills rollup rows for the given enrollment row.
+        """
+        rng = self.rng
+        (
+            enterprise_uuid, _, _, _, _, _, course_key, _, course_subject, _, product_line, budget,
+            enrollment_date, _, _, _, _, has_passed, _,
+        ) = enrollment
+        for skill_name in rng.sample(skill_names, 2):
+            yield (
+                enterprise_uuid, DEFAULT_GROUP_UUID, enrollment_date, skill_name, rng.choice(SKILL_TYPES),
+                round(rng.random(), 2), course_subject, course_key, product_line, budget, 1, has_passed,
+                round(rng.random() * 10, 2),
+            )
+
+
+def _insert_rows(connection, table, rows):
+    """
+    Insert the given rows into the table in a single multi-row insert.
+    """
+    columns = [name for name, _ in TABLE_COLUMNS[table]]
+    placeholders = ', '.join(['%s'] * len(columns))
+    with closing(connection.cursor()) as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})',
+            rows,
+        )
+    connection.commit()
+
+
+def populate(
+        enterprise_count=1000,
+        enrollment_count=5000000,
+        engagement_count=50000000,
+        skew=1.1,
+        seed=42,
+        batch_size=10000,
+        course_count=2000,
+):
+    """
+    Populate the admin analytics tables with synthetic data.
+
+    Rows are written in batches as they are generated, so memory usage does not depend on the dataset size.
+
+    Arguments:
+        enterprise_count (int): Number of enterprises to generate.
+        enrollment_count (int): Total number of enrollments across all enterprises.
+        engagement_count (int): Approximate total number of engagement days across all enterprises.
+        skew (float): Zipf exponent of the enterprise size distribution.
+        seed (int): Seed for the random number generator, the same seed always produces the same dataset.
+        batch_size (int): Number of rows per insert statement.
+        course_count (int): Number of distinct courses shared by all enterprises.
+
+    Returns:
+        (dict): Number of rows written to each table.
+    """
+    rng = random.Random(seed)
+    end_date = date.today()
+    start_date = end_date - timedelta(days=3 * 365)
+    course_catalog = [
+        (f'Org{index % 50}+C{index}', f'Synthetic Course {index}', rng.choice(SUBJECTS), rng.choice(PRODUCT_LINES))
+        for index in range(course_count)
+    ]
+    skill_names = [f'Skill {index}' for index in range(500)]
+    engagement_days_per_enrollment = engagement_count / max(1, enrollment_count)
+
+    create_tables()
+    buffers = {table: [] for table in TABLE_COLUMNS}
+    counts = {table: 0 for table in TABLE_COLUMNS}
+
+    with closing(get_db_connection()) as connection:
+        def flush(table, force=False):
+            while len(buffers[table]) >= batch_size or (force and buffers[table]):
+                batch, buffers[table] = buffers[table][:batch_size], buffers[table][batch_size:]
+                _insert_rows(connection, table, batch)
+                counts[table] += len(batch)
+
+        for size in enterprise_sizes(enterprise_count, enrollment_count, skew, rng):
+            enterprise = SyntheticEnterprise(rng, size, course_catalog, start_date, end_date)
+            for enrollment in enterprise.enrollments():
+                buffers[FACT_ENROLLMENT_ADMIN_DASH].append(enrollment)
+                days = int(rng.expovariate(1 / engagement_days_per_enrollment)) if engagement_count else 0
+                buffers[FACT_ENGAGEMENT_ADMIN_DASH].extend(enterprise.engagements(enrollment, days))
+                buffers[SKILLS_DAILY_ROLLUP_ADMIN_DASH].extend(enterprise.skills(enrollment, skill_names))
+                for table in TABLE_COLUMNS:
+                    flush(table)
+            LOGGER.info('[Synthetic Data] Generated %s enrollments for enterprise %s', size, enterprise.uuid)
+
+        for table in TABLE_COLUMNS:
+            flush(table, force=True)
+
+    return counts
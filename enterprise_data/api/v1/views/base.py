@@ -10,7 +10,10 @@ from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.utils.urls import remove_query_param, replace_query_param
 
+from django.http import StreamingHttpResponse
+
 from enterprise_data.constants import ANALYTICS_API_VERSION_1
+from enterprise_data.renderers import JSONStreamingRenderer, NDJSONStreamingRenderer
 
 
 class EnterpriseViewSetMixin(PermissionRequiredMixin):
@@ -21,6 +24,8 @@ class EnterpriseViewSetMixin(PermissionRequiredMixin):
     pagination_class = DefaultPagination
     permission_required = 'can_access_enterprise'
     API_VERSION = ANALYTICS_API_VERSION_1
+    # Number of records fetched from the database at a time when streaming unpaginated responses.
+    streaming_chunk_size = 2000
 
     def paginate_queryset(self, queryset):
         """
@@ -30,6 +35,30 @@ class EnterpriseViewSetMixin(PermissionRequiredMixin):
             return None
         return super().paginate_queryset(queryset)
 
+    def stream_serialized_queryset(self, queryset):
+        """
+        Serialize the queryset in chunks of `streaming_chunk_size` records, yielding one record at a time.
+        """
+        serializer_class = self.get_serializer_class()
+        chunk = []
+        for instance in queryset.iterator(chunk_size=self.streaming_chunk_size):
+            chunk.append(instance)
+            if len(chunk) == self.streaming_chunk_size:
+                yield from serializer_class(chunk, many=True, context=self.get_serializer_context()).data
+                chunk = []
+        if chunk:
+            yield from serializer_class(chunk, many=True, context=self.get_serializer_context()).data
+
+    def get_streaming_response(self, records):
+        """
+        Stream the serialized records as a JSON array, or as NDJSON when `response_type=ndjson` is passed.
+        """
+        if self.request.query_params.get('response_type') == NDJSONStreamingRenderer.format:
+            renderer = NDJSONStreamingRenderer()
+        else:
+            renderer = JSONStreamingRenderer()
+        return StreamingHttpResponse(renderer.render(records), content_type=renderer.media_type)
+
 
 class AnalyticsPaginationMixin:
     """
@@ -8,7 +8,7 @@ from uuid import UUID
 
 from rest_framework import filters, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
@@ -19,6 +19,7 @@ from django.db.models.fields import IntegerField
 from django.db.models.functions import Coalesce
 from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 from enterprise_data.api.v1 import serializers
 from enterprise_data.clients import EnterpriseApiClient
@@ -117,6 +118,8 @@ class EnterpriseLearnerEnrollmentViewSet(EnterpriseViewSetMixin, viewsets.ReadOn
         Override the list method to handle streaming CSV download and enrich
         the ``course_progress`` and ``course_passing_grade`` fields from
         Snowflake's internal LPR table and course-overviews table respectively.
+
+        Unpaginated (``no_page``) responses are streamed as JSON or NDJSON.
         """
         if request.accepted_renderer.format == 'csv':
             return StreamingHttpResponse(
@@ -125,6 +128,9 @@ class EnterpriseLearnerEnrollmentViewSet(EnterpriseViewSetMixin, viewsets.ReadOn
                 headers={"Content-Disposition": 'attachment; filename="learner_progress_report.csv"'},
             )
 
+        if 'no_page' in request.query_params:
+            return self.get_streaming_response(self._stream_serialized_data())
+
         response = super().list(request, *args, **kwargs)
         self._enrich_lpr_fields(response)
         return response
@@ -285,8 +291,41 @@ class EnterpriseLearnerEnrollmentViewSet(EnterpriseViewSetMixin, viewsets.ReadOn
         if search_enrollment in ("enrolled", "unenrolled"):
             queryset = self.filter_search_enrollment(queryset, search_enrollment)
 
+        changed_since_created = query_filters.get('changed_since_created')
+        changed_since_activity = query_filters.get('changed_since_activity')
+        if changed_since_created or changed_since_activity:
+            queryset = self.filter_changed_since(queryset, changed_since_created, changed_since_activity)
+
         return queryset
 
+    def filter_changed_since(self, queryset, changed_since_created, changed_since_activity):
+        """
+        Filters the enrollments changed since a previous report: created after `changed_since_created`, or
+        active on or after `changed_since_activity`.
+
+        Args:
+            queryset (QuerySet): The initial queryset to filter.
+            changed_since_created (str): ISO 8601 datetime, may be empty.
+            changed_since_activity (str): ISO 8601 date, may be empty.
+        """
+        def parse(param, value, parser):
+            try:
+                parsed = parser(value)
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise ValidationError({param: f'Invalid value: {value}'})
+            return parsed
+
+        changed = Q()
+        if changed_since_created:
+            changed |= Q(created__gt=parse('changed_since_created', changed_since_created, parse_datetime))
+        if changed_since_activity:
+            changed |= Q(
+                last_activity_date__gte=parse('changed_since_activity', changed_since_activity, parse_date),
+            )
+        return queryset.filter(changed)
+
     def filter_by_group_uuid(self, queryset, group_uuid):
         """
         Filters the queryset based on the provided group_uuid. If no records are found,
@@ -564,8 +603,7 @@ class EnterpriseLearnerViewSet(EnterpriseViewSetMixin, viewsets.ReadOnlyModelVie
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
-        serializer = self.get_serializer(users, many=True)
-        return Response(serializer.data)
+        return self.get_streaming_response(self.stream_serialized_queryset(users))
 
 
 class EnterpriseLearnerCompletedCoursesViewSet(EnterpriseViewSetMixin, viewsets.ReadOnlyModelViewSet):
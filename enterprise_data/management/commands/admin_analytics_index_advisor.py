@@ -0,0 +1,78 @@
+"""
+Management command for checking the admin analytics tables against the covering indexes their queries need.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from enterprise_data.admin_analytics.database import indexes
+from enterprise_data.admin_analytics.database.tables import FactEnrollmentAdminDashTable
+
+
+class Command(BaseCommand):
+    """
+    Propose, or apply, the composite covering indexes needed by the admin analytics queries.
+
+    With `--explain`, the main queries are explained for an enterprise and the command fails if MySQL does not
+    pick the expected index for any of them.
+
+    Example usage:
+        $ ./manage.py admin_analytics_index_advisor
+        $ ./manage.py admin_analytics_index_advisor --apply --explain
+    """
+    help = 'Propose or apply the covering indexes used by the admin analytics queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Create the missing indexes instead of only printing the DDL statements.',
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Verify with EXPLAIN that the main queries use the covering indexes.',
+        )
+        parser.add_argument(
+            '--enterprise-customer-uuid',
+            help='Enterprise used to build the explained queries. Defaults to the largest enterprise.',
+        )
+
+    def _explain(self, enterprise_customer_uuid):
+        """
+        Explain the main queries and return the names of those not using their covering index.
+        """
+        failures = []
+        for name, index_name, query, params in indexes.get_explain_queries(enterprise_customer_uuid):
+            used_indexes = indexes.explain(query, params)
+            if index_name in used_indexes:
+                self.stdout.write(f'{name}: uses {index_name}')
+            else:
+                self.stderr.write(f'{name}: expected {index_name}, got {used_indexes}')
+                failures.append(name)
+        return failures
+
+    def handle(self, *args, **options):
+        missing_indexes = indexes.get_missing_indexes()
+        if not missing_indexes:
+            self.stdout.write('All covering indexes are present.')
+
+        for spec in missing_indexes:
+            if options['apply']:
+                self.stdout.write(f'Creating index {spec.name} on {spec.table}')
+                try:
+                    indexes.create_index(spec)
+                except Exception as exc:
+                    raise CommandError(f'Error trying to create index {spec.name}: {exc}') from exc
+            else:
+                self.stdout.write(indexes.create_index_sql(spec))
+
+        if options['explain']:
+            enterprise_customer_uuid = options['enterprise_customer_uuid']
+            if not enterprise_customer_uuid:
+                top_enterprises = FactEnrollmentAdminDashTable().get_top_enterprises(count=1)
+                if not top_enterprises:
+                    raise CommandError('No enterprise found to explain the queries for.')
+                enterprise_customer_uuid = top_enterprises[0]
+
+            failures = self._explain(enterprise_customer_uuid)
+            if failures:
+                raise CommandError(f'Queries not using their covering index: {", ".join(failures)}')
@@ -0,0 +1,132 @@
+"""
+Management command for benchmarking the admin analytics tables, API endpoints and CSV exports.
+"""
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from enterprise_data.admin_analytics import benchmark
+from enterprise_data.admin_analytics.database import synthetic
+from enterprise_data.admin_analytics.database.tables import FactEnrollmentAdminDashTable
+
+
+class Command(BaseCommand):
+    """
+    Time every admin analytics table method, API endpoint and CSV export against the reporting database.
+
+    Optionally populates the reporting database with a synthetic dataset first. Results can be stored as a
+    baseline and later runs compared against it, the command fails when a case regressed past the threshold.
+
+    Example usage:
+        $ ./manage.py benchmark_admin_analytics --generate-data --save-baseline baseline.json
+        $ ./manage.py benchmark_admin_analytics --baseline baseline.json --threshold 0.2
+    """
+    help = 'Benchmark the admin analytics tables, API endpoints and CSV exports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--generate-data',
+            action='store_true',
+            help='Populate the reporting database with synthetic data before benchmarking.',
+        )
+        parser.add_argument('--enterprises', type=int, default=1000, help='Number of synthetic enterprises.')
+        parser.add_argument('--enrollments', type=int, default=5000000, help='Number of synthetic enrollments.')
+        parser.add_argument(
+            '--engagement-days', type=int, default=50000000, help='Number of synthetic engagement days.',
+        )
+        parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of the enterprise sizes.')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the synthetic data.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per insert statement.')
+        parser.add_argument(
+            '--enterprise-customer-uuid',
+            action='append',
+            dest='enterprise_customer_uuids',
+            help='Enterprise to benchmark, may be repeated. Defaults to the largest enterprises.',
+        )
+        parser.add_argument('--top', type=int, default=1, help='Number of largest enterprises to benchmark.')
+        parser.add_argument('--iterations', type=int, default=5, help='Measured calls per case.')
+        parser.add_argument('--warmup', type=int, default=1, help='Unmeasured calls per case.')
+        parser.add_argument('--skip-endpoints', action='store_true', help='Do not benchmark the API endpoints.')
+        parser.add_argument('--skip-csv', action='store_true', help='Do not benchmark the CSV exports.')
+        parser.add_argument(
+            '--skip-renderers', action='store_true', help='Do not benchmark the CSV renderers on synthetic rows.',
+        )
+        parser.add_argument(
+            '--renderer-rows', type=int, default=1000000, help='Number of rows rendered by the CSV renderer cases.',
+        )
+        parser.add_argument('--save-baseline', help='Path of the file to store the results in.')
+        parser.add_argument('--baseline', help='Path of a stored baseline to compare the results with.')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Allowed p95 slowdown compared to the baseline, as a fraction.',
+        )
+
+    def _cases(self, enterprise_customer_uuid, options):
+        """
+        Return the (name, callable) benchmark cases for the given enterprise.
+        """
+        start_date, _ = FactEnrollmentAdminDashTable().get_enrollment_date_range(enterprise_customer_uuid)
+        end_date = date.today()
+        cases = benchmark.table_cases(enterprise_customer_uuid, start_date, end_date)
+        if not options['skip_endpoints']:
+            cases += benchmark.endpoint_cases(enterprise_customer_uuid, start_date, end_date)
+        if not options['skip_csv']:
+            cases += benchmark.csv_cases(enterprise_customer_uuid, start_date, end_date)
+        return cases
+
+    def _run(self, name, func, options, cold=True):
+        """
+        Run a single benchmark case and print its summary.
+        """
+        try:
+            summary = benchmark.run_case(func, iterations=options['iterations'], warmup=options['warmup'], cold=cold)
+        except Exception as exc:
+            raise CommandError(f'Benchmark {name} failed: {exc}') from exc
+        self.stdout.write(
+            '{name:<60} p50={p50:>10.3f}ms p95={p95:>10.3f}ms p99={p99:>10.3f}ms'.format(name=name, **summary)
+        )
+        return summary
+
+    def handle(self, *args, **options):
+        if options['generate_data']:
+            counts = synthetic.populate(
+                enterprise_count=options['enterprises'],
+                enrollment_count=options['enrollments'],
+                engagement_count=options['engagement_days'],
+                skew=options['skew'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+            )
+            self.stdout.write(f'Generated synthetic data: {json.dumps(counts)}')
+
+        enterprise_customer_uuids = (
+            options['enterprise_customer_uuids'] or FactEnrollmentAdminDashTable().get_top_enterprises(options['top'])
+        )
+        if not enterprise_customer_uuids:
+            raise CommandError('No enterprise found to benchmark.')
+
+        results = {}
+        for enterprise_customer_uuid in enterprise_customer_uuids:
+            for name, func in self._cases(enterprise_customer_uuid, options):
+                key = name if len(enterprise_customer_uuids) == 1 else f'{enterprise_customer_uuid}:{name}'
+                results[key] = self._run(key, func, options)
+
+        if not options['skip_renderers']:
+            for name, func in benchmark.renderer_cases(options['renderer_rows']):
+                results[name] = self._run(name, func, options, cold=False)
+
+        if options['save_baseline']:
+            benchmark.save_baseline(results, options['save_baseline'])
+            self.stdout.write(f'Baseline saved to {options["save_baseline"]}')
+
+        if options['baseline']:
+            regressions = benchmark.compare_to_baseline(
+                results, benchmark.load_baseline(options['baseline']), threshold=options['threshold'],
+            )
+            for name, previous, current in regressions:
+                self.stderr.write(f'Regression in {name}: p95 {previous:.3f}ms -> {current:.3f}ms')
+            if regressions:
+                raise CommandError(f'{len(regressions)} benchmark(s) regressed past the threshold.')
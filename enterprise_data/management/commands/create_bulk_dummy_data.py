@@ -0,0 +1,199 @@
+"""
+Management command for creating large volumes of learner progress report and admin analytics data.
+"""
+import random
+from datetime import date, datetime, timedelta, timezone
+from uuid import UUID
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from enterprise_data.admin_analytics.database import synthetic
+from enterprise_data.models import EnterpriseGroupMembership, EnterpriseLearner, EnterpriseLearnerEnrollment
+
+COURSE_MODES = ('verified', 'audit', 'professional')
+PROGRESS_STATUSES = ('Passed', 'In Progress', 'Failed')
+PAID_BY = ('Subscription', 'Offer', 'Learner Credit', None)
+
+
+class Command(BaseCommand):
+    """
+    Create millions of enterprise learners, enrollments and group memberships using `bulk_create`.
+
+    Enrollments are split across enterprises following a Zipf distribution, so a few enterprises are very large
+    and most are tiny. The same seed always produces the same dataset on an empty database.
+
+    Example usage:
+        $ ./manage.py create_bulk_dummy_data --enterprises 1000 --enrollments 5000000
+        $ ./manage.py create_bulk_dummy_data --enrollments 100000 --admin-dash-facts
+    """
+    help = 'Create a large skewed dataset of enterprise learners, enrollments and group memberships.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enterprises', type=int, default=1000, help='Number of enterprises.')
+        parser.add_argument('--enrollments', type=int, default=1000000, help='Total number of enrollments.')
+        parser.add_argument(
+            '--enrollments-per-learner', type=int, default=3, help='Average number of enrollments per learner.',
+        )
+        parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent of the enterprise sizes.')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the random number generator.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert.')
+        parser.add_argument(
+            '--group-membership-ratio',
+            type=float,
+            default=0.3,
+            help='Fraction of learners that belong to a group.',
+        )
+        parser.add_argument(
+            '--admin-dash-facts',
+            action='store_true',
+            help='Also populate the admin analytics fact tables in the reporting database.',
+        )
+        parser.add_argument(
+            '--engagement-days',
+            type=int,
+            default=None,
+            help='Number of admin analytics engagement days, defaults to ten per enrollment.',
+        )
+
+    @staticmethod
+    def _next_id(model, field):
+        """
+        Return the first free integer value of the given field, so that repeated runs do not collide.
+        """
+        return (model.objects.aggregate(value=Max(field))['value'] or 0) + 1
+
+    @staticmethod
+    def _bulk_create(model, objects, batch_size):
+        """
+        Insert the given objects and return how many were inserted.
+        """
+        model.objects.bulk_create(objects, batch_size=batch_size)
+        return len(objects)
+
+    def _create_enterprise(self, rng, enrollment_count, options, ids, counts):
+        """
+        Create the learners, group memberships and enrollments of a single enterprise.
+        """
+        batch_size = options['batch_size']
+        enterprise_customer_uuid = UUID(int=rng.getrandbits(128), version=4)
+        enterprise_name = f'Bulk Enterprise {enterprise_customer_uuid.hex[:8]}'
+        today = date.today()
+        now = datetime.now(timezone.utc)
+
+        learners = []
+        for _ in range(max(1, enrollment_count // options['enrollments_per_learner'])):
+            created = now - timedelta(days=rng.randint(0, 3 * 365))
+            learners.append(EnterpriseLearner(
+                enterprise_user_id=ids['enterprise_user_id'],
+                enterprise_customer_uuid=enterprise_customer_uuid,
+                enterprise_user_created=created,
+                enterprise_user_modified=created,
+                enterprise_user_active=True,
+                lms_user_id=ids['enterprise_user_id'],
+                is_linked=rng.random() < 0.95,
+                user_username=f'learner{ids["enterprise_user_id"]}',
+                user_email=f'learner{ids["enterprise_user_id"]}@{enterprise_customer_uuid.hex[:8]}.example.com',
+                lms_user_created=created,
+                lms_last_login=created + timedelta(days=rng.randint(0, 30)),
+                lms_user_country='US',
+                last_activity_date=(created + timedelta(days=rng.randint(0, 30))).date(),
+                created_at=created,
+            ))
+            ids['enterprise_user_id'] += 1
+        for start in range(0, len(learners), batch_size):
+            counts['learners'] += self._bulk_create(EnterpriseLearner, learners[start:start + batch_size], batch_size)
+
+        groups = [UUID(int=rng.getrandbits(128), version=4) for _ in range(2)]
+        memberships = [
+            EnterpriseGroupMembership(
+                group_membership_unique_id=f'{enterprise_customer_uuid.hex}-{learner.enterprise_user_id}',
+                enterprise_customer_id=enterprise_customer_uuid,
+                enterprise_group_name=f'Group {groups.index(group_uuid)}',
+                enterprise_group_uuid=group_uuid,
+                group_type='flex',
+                activated_at=learner.created_at,
+                enterprise_customer_user_id=learner.enterprise_user_id,
+                membership_status='accepted',
+                enterprise_group_membership_uuid=UUID(int=rng.getrandbits(128), version=4),
+            )
+            for learner in learners
+            if rng.random() < options['group_membership_ratio']
+            for group_uuid in [rng.choice(groups)]
+        ]
+        for start in range(0, len(memberships), batch_size):
+            counts['group_memberships'] += self._bulk_create(
+                EnterpriseGroupMembership, memberships[start:start + batch_size], batch_size,
+            )
+
+        enrollments = []
+        for _ in range(enrollment_count):
+            learner = rng.choice(learners)
+            course_number = rng.randrange(2000)
+            enrollment_date = today - timedelta(days=rng.randint(0, 3 * 365))
+            progress_status = rng.choice(PROGRESS_STATUSES)
+            has_passed = progress_status == 'Passed'
+            enrollments.append(EnterpriseLearnerEnrollment(
+                lpr_unique_id=ids['lpr_unique_id'],
+                enterprise_enrollment_id=ids['lpr_unique_id'],
+                enrollment_id=ids['lpr_unique_id'],
+                is_consent_granted=rng.random() < 0.9,
+                paid_by=rng.choice(PAID_BY),
+                user_current_enrollment_mode=rng.choice(COURSE_MODES),
+                enrollment_date=enrollment_date,
+                course_key=f'Org{course_number % 50}+C{course_number}',
+                courserun_key=f'course-v1:Org{course_number % 50}+C{course_number}+1T2024',
+                course_title=f'Bulk Course {course_number}',
+                course_pacing_type='self_paced',
+                course_start_date=enrollment_date,
+                course_end_date=enrollment_date + timedelta(weeks=8),
+                course_list_price=float(rng.choice((0, 49, 99, 199))),
+                course_primary_subject=rng.choice(synthetic.SUBJECTS),
+                course_product_line=rng.choice(synthetic.PRODUCT_LINES),
+                has_passed=has_passed,
+                passed_date=enrollment_date + timedelta(days=rng.randint(7, 60)) if has_passed else None,
+                last_activity_date=enrollment_date + timedelta(days=rng.randint(0, 60)),
+                total_learning_time_seconds=rng.randint(0, 100000),
+                progress_status=progress_status,
+                current_grade=round(rng.random(), 2),
+                enterprise_user_id=learner.enterprise_user_id,
+                user_email=learner.user_email,
+                user_username=learner.user_username,
+                enterprise_name=enterprise_name,
+                enterprise_customer_uuid=enterprise_customer_uuid,
+                created=now,
+            ))
+            ids['lpr_unique_id'] += 1
+            if len(enrollments) >= batch_size:
+                counts['enrollments'] += self._bulk_create(EnterpriseLearnerEnrollment, enrollments, batch_size)
+                enrollments = []
+        if enrollments:
+            counts['enrollments'] += self._bulk_create(EnterpriseLearnerEnrollment, enrollments, batch_size)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        counts = {'learners': 0, 'group_memberships': 0, 'enrollments': 0}
+        ids = {
+            'enterprise_user_id': self._next_id(EnterpriseLearner, 'enterprise_user_id'),
+            'lpr_unique_id': self._next_id(EnterpriseLearnerEnrollment, 'lpr_unique_id'),
+        }
+        try:
+            for enrollment_count in synthetic.enterprise_sizes(
+                    options['enterprises'], options['enrollments'], options['skew'], rng,
+            ):
+                self._create_enterprise(rng, enrollment_count, options, ids, counts)
+
+            if options['admin_dash_facts']:
+                engagement_days = options['engagement_days']
+                counts.update(synthetic.populate(
+                    enterprise_count=options['enterprises'],
+                    enrollment_count=options['enrollments'],
+                    engagement_count=10 * options['enrollments'] if engagement_days is None else engagement_days,
+                    skew=options['skew'],
+                    seed=options['seed'],
+                    batch_size=options['batch_size'],
+                ))
+        except Exception as exc:
+            raise CommandError(f'Error trying to create bulk dummy data: {exc}') from exc
+
+        self.stdout.write(', '.join(f'{name}: {count}' for name, count in counts.items()))
@@ -0,0 +1,141 @@
+"""
+Tests for `./manage.py admin_analytics_index_advisor` management command.
+"""
+from io import StringIO
+from unittest import TestCase
+
+from mock import MagicMock, patch
+from pytest import mark, raises
+
+from django.core.management import CommandError, call_command
+
+from enterprise_data.admin_analytics.database import indexes
+from enterprise_data.admin_analytics.database.indexes import COVERING_INDEXES
+
+
+def statistics_rows(specs):
+    """
+    Return information_schema.statistics rows for the given index specs.
+    """
+    return [(spec.name, column) for spec in specs for column in spec.columns]
+
+
+@mark.django_db
+class Test(TestCase):
+    """
+    Tests to validate the behavior of `./manage.py admin_analytics_index_advisor` management command.
+    """
+    def setUp(self):
+        """
+        Setup method.
+        """
+        super().setUp()
+        self.enterprise_uuid = 'ee5e6b3a069a4947bb8dd2dbc323396c'
+
+        run_query_patcher = patch('enterprise_data.admin_analytics.database.indexes.run_query')
+        self.mock_run_query = run_query_patcher.start()
+        self.addCleanup(run_query_patcher.stop)
+
+    def _run_query(self, existing_specs, explain_key=None):
+        """
+        Fake run_query returning the given indexes from the schema and the given key from EXPLAIN.
+        """
+        def run_query(query, params=None, as_dict=False):  # pylint: disable=unused-argument
+            if query.startswith('EXPLAIN'):
+                expected = [index_name for _, index_name, explained, _ in self._explain_queries() if explained in query]
+                return [{'table': 'fact', 'key': explain_key or expected[0]}]
+            return statistics_rows([spec for spec in existing_specs if spec.table == params['table']])
+        return run_query
+
+    def _explain_queries(self):
+        """
+        Return the (name, index name, query, params) tuples explained by the command.
+        """
+        return [
+            (name, index_name, query.strip().rstrip(';'), params)
+            for name, index_name, query, params in indexes.get_explain_queries(self.enterprise_uuid)
+        ]
+
+    def test_proposes_missing_indexes(self):
+        """
+        Validate that the DDL of every missing index is printed and nothing is created.
+        """
+        self.mock_run_query.side_effect = self._run_query(COVERING_INDEXES[:2])
+        out = StringIO()
+
+        call_command('admin_analytics_index_advisor', stdout=out)
+
+        output = out.getvalue()
+        assert 'ix_fead_enterprise_enrollment_date' not in output
+        for spec in COVERING_INDEXES[2:]:
+            assert f'CREATE INDEX {spec.name} ON {spec.table}' in output
+
+    def test_longer_existing_index_covers_spec(self):
+        """
+        Validate that an existing index starting with the spec columns is enough.
+        """
+        self.mock_run_query.side_effect = lambda query, params=None, as_dict=False: [
+            (f'{spec.name}_wide', column) for spec in COVERING_INDEXES if spec.table == params['table']
+            for column in spec.columns + ('extra_column',)
+        ]
+        out = StringIO()
+
+        call_command('admin_analytics_index_advisor', stdout=out)
+
+        assert out.getvalue().strip() == 'All covering indexes are present.'
+
+    @patch('enterprise_data.admin_analytics.database.indexes.get_db_connection')
+    def test_apply(self, mock_get_db_connection):
+        """
+        Validate that the missing indexes are created with --apply.
+        """
+        self.mock_run_query.side_effect = self._run_query([])
+        cursor = mock_get_db_connection.return_value.cursor.return_value
+
+        call_command('admin_analytics_index_advisor', '--apply', stdout=StringIO())
+
+        executed = [call[0][0] for call in cursor.execute.call_args_list]
+        assert len(executed) == len(COVERING_INDEXES)
+        assert all(statement.startswith('CREATE INDEX') for statement in executed)
+
+    def test_explain_plans_use_covering_indexes(self):
+        """
+        Validate that the EXPLAIN plan of every main query is checked for its covering index.
+        """
+        self.mock_run_query.side_effect = self._run_query(COVERING_INDEXES)
+        out = StringIO()
+
+        call_command(
+            'admin_analytics_index_advisor', '--explain', '--enterprise-customer-uuid', self.enterprise_uuid,
+            stdout=out,
+        )
+
+        explained = [call for call in self.mock_run_query.call_args_list if call[1]['query'].startswith('EXPLAIN')]
+        assert len(explained) == len(self._explain_queries())
+        for name, index_name, _, _ in self._explain_queries():
+            assert f'{name}: uses {index_name}' in out.getvalue()
+
+    def test_explain_plan_without_covering_index(self):
+        """
+        Validate that the command fails when a query does not use its covering index.
+        """
+        self.mock_run_query.side_effect = self._run_query(COVERING_INDEXES, explain_key='PRIMARY')
+
+        with raises(CommandError):
+            call_command(
+                'admin_analytics_index_advisor', '--explain', '--enterprise-customer-uuid', self.enterprise_uuid,
+                stdout=StringIO(), stderr=StringIO(),
+            )
+
+    @patch(
+        'enterprise_data.admin_analytics.database.tables.FactEnrollmentAdminDashTable.get_top_enterprises',
+        MagicMock(return_value=[]),
+    )
+    def test_explain_without_enterprises(self):
+        """
+        Validate that the command fails when there is no enterprise to explain the queries for.
+        """
+        self.mock_run_query.side_effect = self._run_query(COVERING_INDEXES)
+
+        with raises(CommandError):
+            call_command('admin_analytics_index_advisor', '--explain', stdout=StringIO())
@@ -0,0 +1,92 @@
+"""
+Tests for `./manage.py benchmark_admin_analytics` management command.
+"""
+import json
+import os
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+
+from mock import MagicMock, patch
+from pytest import mark, raises
+
+from django.core.management import CommandError, call_command
+
+
+@mark.django_db
+@patch('enterprise_data.admin_analytics.data_loaders.run_query', MagicMock(return_value=[]))
+@patch(
+    'enterprise_data.admin_analytics.database.tables.fact_engagement_admin_dash.run_query',
+    MagicMock(return_value=[]),
+)
+@patch(
+    'enterprise_data.admin_analytics.database.tables.fact_enrollment_admin_dash.run_query',
+    MagicMock(return_value=[]),
+)
+@patch(
+    'enterprise_data.admin_analytics.database.tables.skills_daily_rollup_admin_dash.run_query',
+    MagicMock(return_value=[]),
+)
+@patch(
+    'enterprise_data.admin_analytics.database.tables.FactEnrollmentAdminDashTable.get_enrollment_date_range',
+    MagicMock(return_value=(datetime(2024, 1, 1), datetime(2024, 12, 31))),
+)
+class Test(TestCase):
+    """
+    Tests to validate the behavior of `./manage.py benchmark_admin_analytics` management command.
+    """
+    def setUp(self):
+        """
+        Setup method.
+        """
+        super().setUp()
+        self.enterprise_uuid = 'ee5e6b3a-069a-4947-bb8d-d2dbc323396c'
+        self.baseline_path = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+
+    def test_benchmark_and_save_baseline(self):
+        """
+        Validate that every table method, endpoint and CSV export is benchmarked and stored in the baseline.
+        """
+        call_command(
+            'benchmark_admin_analytics',
+            '--enterprise-customer-uuid', self.enterprise_uuid,
+            '--iterations', '2',
+            '--warmup', '0',
+            '--renderer-rows', '100',
+            '--save-baseline', self.baseline_path,
+        )
+        with open(self.baseline_path, encoding='utf-8') as baseline_file:
+            results = json.load(baseline_file)
+
+        assert 'enrollments.get_all_enrollments' in results
+        assert 'leaderboard' in results
+        assert 'enrollments_csv' in results
+        assert 'renderer.EnrollmentsCSVRenderer.flat' in results
+        assert all(summary['count'] == 2 for summary in results.values())
+
+    def test_regression_against_baseline(self):
+        """
+        Validate that the command fails when a case is slower than the baseline.
+        """
+        with open(self.baseline_path, 'w', encoding='utf-8') as baseline_file:
+            json.dump({'enrollments.get_enrollment_count': {'p95': 0.0}}, baseline_file)
+
+        with raises(CommandError):
+            call_command(
+                'benchmark_admin_analytics',
+                '--enterprise-customer-uuid', self.enterprise_uuid,
+                '--skip-endpoints',
+                '--skip-csv',
+                '--skip-renderers',
+                '--baseline', self.baseline_path,
+                '--threshold', '-1',
+            )
+
+    @patch('enterprise_data.admin_analytics.database.tables.FactEnrollmentAdminDashTable.get_top_enterprises')
+    def test_no_enterprises(self, mock_get_top_enterprises):
+        """
+        Validate that the command fails when there is no enterprise to benchmark.
+        """
+        mock_get_top_enterprises.return_value = []
+        with raises(CommandError):
+            call_command('benchmark_admin_analytics')
@@ -0,0 +1,68 @@
+"""
+Tests for create_bulk_dummy_data management command
+"""
+from unittest import TestCase
+
+from mock import patch
+from pytest import mark
+
+from django.core.management import call_command
+
+from enterprise_data.models import EnterpriseGroupMembership, EnterpriseLearner, EnterpriseLearnerEnrollment
+
+
+@mark.django_db
+class TestCreateBulkDummyDataCommand(TestCase):
+    """
+    Tests to validate the behavior of `./manage.py create_bulk_dummy_data` management command.
+    """
+
+    def _enrollment_counts(self):
+        """
+        Return the number of enrollments of every enterprise, largest first.
+        """
+        counts = {}
+        for enterprise_customer_uuid in EnterpriseLearnerEnrollment.objects.values_list(
+                'enterprise_customer_uuid', flat=True,
+        ):
+            counts[enterprise_customer_uuid] = counts.get(enterprise_customer_uuid, 0) + 1
+        return sorted(counts.values(), reverse=True)
+
+    def test_create_bulk_dummy_data(self):
+        """
+        Management command should create skewed learners, enrollments and group memberships.
+        """
+        call_command('create_bulk_dummy_data', '--enterprises', '10', '--enrollments', '500', '--batch-size', '100')
+
+        enrollment_counts = self._enrollment_counts()
+        assert len(enrollment_counts) == 10
+        assert sum(enrollment_counts) == EnterpriseLearnerEnrollment.objects.count()
+        assert enrollment_counts[0] > 5 * enrollment_counts[-1]
+        assert EnterpriseLearner.objects.count() > 0
+        assert EnterpriseGroupMembership.objects.count() > 0
+        assert not EnterpriseLearnerEnrollment.objects.filter(enterprise_user__isnull=True).exists()
+
+    def test_same_seed_same_data(self):
+        """
+        Running the command twice with the same seed should generate the same enterprise sizes.
+        """
+        call_command('create_bulk_dummy_data', '--enterprises', '5', '--enrollments', '100', '--seed', '3')
+        first_counts = self._enrollment_counts()
+        EnterpriseLearnerEnrollment.objects.all().delete()
+        EnterpriseLearner.objects.all().delete()
+        EnterpriseGroupMembership.objects.all().delete()
+
+        call_command('create_bulk_dummy_data', '--enterprises', '5', '--enrollments', '100', '--seed', '3')
+        assert self._enrollment_counts() == first_counts
+
+    @patch('enterprise_data.management.commands.create_bulk_dummy_data.synthetic.populate')
+    def test_admin_dash_facts(self, mock_populate):
+        """
+        Management command should populate the admin analytics tables when asked to.
+        """
+        mock_populate.return_value = {}
+        call_command('create_bulk_dummy_data', '--enterprises', '2', '--enrollments', '10', '--admin-dash-facts')
+
+        mock_populate.assert_called_once_with(
+            enterprise_count=2, enrollment_count=10, engagement_count=100, skew=1.1, seed=42, batch_size=5000,
+        )
@@ -1,11 +1,153 @@
 """
 Renderers for enterprise data views.
 """
-
+import codecs
+import csv
+import json
+from io import StringIO
+from operator import itemgetter
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
 from rest_framework_csv.renderers import CSVStreamingRenderer
 
+from django.conf import settings
+
+# Number of bytes buffered by the streaming renderers before a chunk is yielded.
+STREAMING_CHUNK_SIZE = 64 * 1024
+
+
+class FlatCSVStreamingRenderer(CSVStreamingRenderer):
+    """
+    Streaming csv renderer for rows that are flat dicts with a fixed header.
+
+    `CSVStreamingRenderer` flattens every row through its generic nested-key logic and yields one chunk per row.
+    Rows rendered here are already flat, so their values are picked with `operator.itemgetter` and written
+    through a single `csv.writer` into chunks of roughly `chunk_size` bytes. The output is identical to
+    `CSVStreamingRenderer` for flat rows. Rendering falls back to `CSVStreamingRenderer` when there is no header.
+    """
+    chunk_size = STREAMING_CHUNK_SIZE
+
+    def render(self, data, media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        header = renderer_context.get('header', self.header)
+        if not header or data is None:
+            yield from super().render(data, media_type, renderer_context)
+            return
+
+        writer_opts = renderer_context.get('writer_opts', self.writer_opts or {})
+        labels = renderer_context.get('labels', self.labels)
+        encoding = renderer_context.get('encoding', settings.DEFAULT_CHARSET)
+        if renderer_context.get('bom', False) and encoding == settings.DEFAULT_CHARSET:
+            yield codecs.BOM_UTF8
+        if isinstance(data, dict):
+            data = [data]
+
+        get_row = itemgetter(*header) if len(header) > 1 else lambda item: (item[header[0]],)
+        csv_buffer = StringIO()
+        csv_writer = csv.writer(csv_buffer, **writer_opts)
+        csv_writer.writerow([labels.get(field, field) for field in header] if labels else header)
+        for item in data:
+            try:
+                row = get_row(item)
+            except KeyError:
+                row = [item.get(field) for field in header]
+            csv_writer.writerow(row)
+            if csv_buffer.tell() >= self.chunk_size:
+                yield csv_buffer.getvalue().encode(encoding)
+                csv_buffer.seek(0)
+                csv_buffer.truncate()
+        yield csv_buffer.getvalue().encode(encoding)
+
+
+class JSONStreamingRenderer(BaseRenderer):
+    """
+    Streaming renderer writing an iterable of records as a JSON array.
+
+    Records are encoded one at a time, so memory usage does not depend on the number of records. The output is
+    identical to the one `rest_framework.renderers.JSONRenderer` produces for the same list of records.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    chunk_size = STREAMING_CHUNK_SIZE
+
+    def __init__(self):
+        separators = json.JSONEncoder.item_separator, json.JSONEncoder.key_separator
+        if api_settings.COMPACT_JSON:
+            separators = (',', ':')
+        self.item_separator = separators[0].encode('utf-8')
+        self.encoder = encoders.JSONEncoder(
+            ensure_ascii=not api_settings.UNICODE_JSON,
+            allow_nan=not api_settings.STRICT_JSON,
+            separators=separators,
+        )
+
+    def encode(self, record):
+        """
+        Encode a single record the same way `JSONRenderer` does.
+        """
+        return self.encoder.encode(record).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
+
+    def prefix(self):
+        """
+        Bytes written before the first record.
+        """
+        return b'['
+
+    def separator(self):
+        """
+        Bytes written between two records.
+        """
+        return self.item_separator
+
+    def suffix(self):
+        """
+        Bytes written after the last record.
+        """
+        return b']'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Yield the encoded records in chunks of roughly `chunk_size` bytes.
+        """
+        buffer = [self.prefix()]
+        buffered_size = len(buffer[0])
+        for index, record in enumerate(data):
+            if index:
+                buffer.append(self.separator())
+            encoded = self.encode(record)
+            buffer.append(encoded)
+            buffered_size += len(encoded)
+            if buffered_size >= self.chunk_size:
+                yield b''.join(buffer)
+                buffer, buffered_size = [], 0
+        buffer.append(self.suffix())
+        yield b''.join(buffer)
+
+
+class NDJSONStreamingRenderer(JSONStreamingRenderer):
+    """
+    Streaming renderer writing an iterable of records as newline delimited JSON, one record per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def prefix(self):
+        return b''
+
+    def separator(self):
+        return b''
+
+    def encode(self, record):
+        return super().encode(record) + b'\n'
+
+    def suffix(self):
+        return b''
+
 
-class EnrollmentsCSVRenderer(CSVStreamingRenderer):
+class EnrollmentsCSVRenderer(FlatCSVStreamingRenderer):
     """
     Custom streaming csv renderer for EnterpriseLearnerEnrollment data.
     """
@@ -33,7 +175,7 @@ class EnrollmentsCSVRenderer(CSVStreamingRenderer):
     ]
 
 
-class IndividualEnrollmentsCSVRenderer(CSVStreamingRenderer):
+class IndividualEnrollmentsCSVRenderer(FlatCSVStreamingRenderer):
     """
     Custom streaming csv renderer for advance analytics individual enrollments data.
     """
@@ -47,7 +189,7 @@ class IndividualEnrollmentsCSVRenderer(CSVStreamingRenderer):
     ]
 
 
-class IndividualCompletionsCSVRenderer(CSVStreamingRenderer):
+class IndividualCompletionsCSVRenderer(FlatCSVStreamingRenderer):
     """
     Custom streaming csv renderer for advance analytics individual completions data.
     """
@@ -61,7 +203,7 @@ class IndividualCompletionsCSVRenderer(CSVStreamingRenderer):
     ]
 
 
-class IndividualEngagementsCSVRenderer(CSVStreamingRenderer):
+class IndividualEngagementsCSVRenderer(FlatCSVStreamingRenderer):
     """
     Custom streaming csv renderer for advance analytics individual engagements data.
     """
@@ -79,7 +221,7 @@ class IndividualEngagementsCSVRenderer(CSVStreamingRenderer):
     ]
 
 
-class LeaderboardCSVRenderer(CSVStreamingRenderer):
+class LeaderboardCSVRenderer(FlatCSVStreamingRenderer):
     """
     Custom streaming csv renderer for advance analytics leaderboard data.
     """
@@ -0,0 +1,89 @@
+"""
+Tests for the admin analytics benchmark helpers and synthetic data generator.
+"""
+import random
+from unittest import TestCase
+
+from mock import MagicMock, patch
+
+from enterprise_data.admin_analytics import benchmark
+from enterprise_data.admin_analytics.database import synthetic
+
+
+class TestBenchmark(TestCase):
+    """
+    Tests for `enterprise_data.admin_analytics.benchmark`.
+    """
+
+    def test_summarize(self):
+        """
+        Validate that durations are summarized as milliseconds percentiles.
+        """
+        summary = benchmark.summarize([index / 1000 for index in range(1, 101)])
+        assert summary['count'] == 100
+        assert summary['min'] == 1.0
+        assert summary['max'] == 100.0
+        assert summary['mean'] == 50.5
+        assert summary['p50'] == 50.5
+        assert summary['p95'] == 95.05
+        assert summary['p99'] == 99.01
+
+    def test_summarize_empty(self):
+        """
+        Validate that an empty list of durations does not raise.
+        """
+        assert benchmark.summarize([])['p95'] == 0.0
+
+    @patch('enterprise_data.admin_analytics.benchmark.TieredCache.dangerous_clear_all_tiers')
+    def test_run_case(self, mock_clear_cache):
+        """
+        Validate that warmup calls are not measured and the cache is cleared before every call.
+        """
+        func = MagicMock()
+        summary = benchmark.run_case(func, iterations=3, warmup=2)
+        assert func.call_count == 5
+        assert mock_clear_cache.call_count == 5
+        assert summary['count'] == 3
+
+    def test_compare_to_baseline(self):
+        """
+        Validate that only cases slower than the threshold are reported.
+        """
+        baseline = {'fast': {'p95': 10.0}, 'slow': {'p95': 10.0}, 'removed': {'p95': 1.0}}
+        results = {'fast': {'p95': 11.0}, 'slow': {'p95': 13.0}, 'new': {'p95': 100.0}}
+        assert benchmark.compare_to_baseline(results, baseline, threshold=0.2) == [('slow', 10.0, 13.0)]
+
+
+class TestSyntheticData(TestCase):
+    """
+    Tests for `enterprise_data.admin_analytics.database.synthetic`.
+    """
+
+    def test_enterprise_sizes(self):
+        """
+        Validate that the enterprise sizes are skewed and every enterprise has at least one enrollment.
+        """
+        sizes = synthetic.enterprise_sizes(100, 100000, 1.1, random.Random(1))
+        assert len(sizes) == 100
+        assert min(sizes) >= 1
+        assert max(sizes) > 10 * (sum(sizes) / len(sizes))
+
+    @patch('enterprise_data.admin_analytics.database.synthetic.get_db_connection')
+    def test_populate(self, mock_get_db_connection):
+        """
+        Validate that the rows are written in batches matching the table columns.
+        """
+        cursor = mock_get_db_connection.return_value.cursor.return_value
+        counts = synthetic.populate(
+            enterprise_count=5, enrollment_count=200, engagement_count=1000, seed=7, batch_size=50,
+        )
+        assert counts[synthetic.FACT_ENROLLMENT_ADMIN_DASH] == sum(
+            synthetic.enterprise_sizes(5, 200, 1.1, random.Random(7))
+        )
+        assert counts[synthetic.SKILLS_DAILY_ROLLUP_ADMIN_DASH] == 2 * counts[synthetic.FACT_ENROLLMENT_ADMIN_DASH]
+        assert counts[synthetic.FACT_ENGAGEMENT_ADMIN_DASH] > 0
+        for call in cursor.executemany.call_args_list:
+            query, rows = call[0]
+            table = query.split()[2]
+            assert len(rows) <= 50
+            assert all(len(row) == len(synthetic.TABLE_COLUMNS[table]) for row in rows)
@@ -3,6 +3,7 @@ Tests for views in the `enterprise_data` module.
 """
 
 import datetime
+import json
 import os
 from unittest import mock
 from uuid import UUID, uuid4
@@ -16,7 +17,7 @@ from rest_framework.test import APITransactionTestCase
 from django.utils import timezone
 
 from enterprise_data.api.v1.serializers import EnterpriseOfferSerializer
-from enterprise_data.api.v1.views.enterprise_learner import EnterpriseLearnerEnrollmentViewSet
+from enterprise_data.api.v1.views.enterprise_learner import EnterpriseLearnerEnrollmentViewSet, EnterpriseLearnerViewSet
 from enterprise_data.models import EnterpriseLearnerEnrollment, EnterpriseOffer
 from enterprise_data.tests.factories import (
     EnterpriseAdminLearnerProgressFactory,
@@ -237,6 +238,46 @@ class TestEnterpriseLearnerEnrollmentViewSet(JWTTestMixin, APITransactionTestCas
         self.assertEqual(response.data['results'][0]['enrollment_id'], enrollment.enrollment_id)
         self.assertEqual(response.data['results'][0]['course_progress'], 0.87)
 
+    def test_filter_changed_since(self):
+        """
+        Test that only the enrollments created after, or active since, the given watermark are returned.
+        """
+        enterprise_learner = EnterpriseLearnerFactory(enterprise_customer_uuid=self.enterprise_id)
+        watermark = timezone.now() - datetime.timedelta(days=3)
+        enrollments = {
+            name: EnterpriseLearnerEnrollmentFactory(
+                enterprise_customer_uuid=self.enterprise_id,
+                enterprise_user_id=enterprise_learner.enterprise_user_id,
+                created=created,
+                last_activity_date=last_activity_date,
+            )
+            for name, created, last_activity_date in (
+                ('unchanged', watermark, watermark.date() - datetime.timedelta(days=1)),
+                ('created', watermark + datetime.timedelta(hours=1), watermark.date() - datetime.timedelta(days=1)),
+                ('active', watermark - datetime.timedelta(days=1), watermark.date()),
+            )
+        }
+        url = reverse('v1:enterprise-learner-enrollment-list', kwargs={'enterprise_id': self.enterprise_id})
+
+        response = self.client.get(url, data={
+            'changed_since_created': watermark.isoformat(),
+            'changed_since_activity': watermark.date().isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(
+            [result['enrollment_id'] for result in response.json()['results']],
+            [enrollments['created'].enrollment_id, enrollments['active'].enrollment_id],
+        )
+
+        response = self.client.get(url, data={'changed_since_created': watermark.isoformat()})
+        self.assertEqual(
+            [result['enrollment_id'] for result in response.json()['results']],
+            [enrollments['created'].enrollment_id],
+        )
+
+        response = self.client.get(url, data={'changed_since_activity': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_list_excludes_enrollments_of_unlinked_learners(self):
         """
         Test that the enrollment list endpoint excludes enrollments belonging to unlinked learners.
@@ -406,6 +447,49 @@ class TestEnterpriseLearnerEnrollmentViewSet(JWTTestMixin, APITransactionTestCas
         self.assertIn('course_progress', content)
         self.assertIn('0.87', content)
 
+    @mock.patch('enterprise_data.api.v1.views.enterprise_learner.SnowflakeCoursePassingGradeSource')
+    @mock.patch('enterprise_data.api.v1.views.enterprise_learner.SnowflakeCourseProgressSource')
+    @ddt.data(
+        ({'no_page': 'true'}, 'application/json'),
+        ({'no_page': 'true', 'response_type': 'ndjson'}, 'application/x-ndjson'),
+    )
+    @ddt.unpack
+    def test_no_page_streams_enrollments(self, params, content_type, mock_progress_cls, mock_grade_cls):
+        """
+        Unpaginated enrollments should be streamed with the Snowflake enrichment applied.
+        """
+        mock_progress_cls.return_value.get_course_progress_map.return_value = {
+            ('johndoe@example.com', 'course-v1:edX+Demo+2024'): 0.87,
+        }
+        mock_grade_cls.return_value.get_passing_grade_map.return_value = {}
+        enterprise_learner = EnterpriseLearnerFactory(
+            enterprise_customer_uuid=self.enterprise_id,
+            user_email='johndoe@example.com',
+        )
+        for courserun_key in ('course-v1:edX+Demo+2024', 'course-v1:edX+Other+2024'):
+            EnterpriseLearnerEnrollmentFactory(
+                enterprise_customer_uuid=self.enterprise_id,
+                is_consent_granted=True,
+                enterprise_user_id=enterprise_learner.enterprise_user_id,
+                user_email='johndoe@example.com',
+                courserun_key=courserun_key,
+            )
+
+        url = reverse('v1:enterprise-learner-enrollment-list', kwargs={'enterprise_id': self.enterprise_id})
+        response = self.client.get(url, params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], content_type)
+        content = b''.join(response.streaming_content)
+        if content_type == 'application/json':
+            results = json.loads(content)
+        else:
+            results = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(results), 2)
+        progress = {result['courserun_key']: result['course_progress'] for result in results}
+        self.assertEqual(progress['course-v1:edX+Demo+2024'], 0.87)
+
     def test_course_passing_grade_field_in_response(self):
         """Test that course_passing_grade field is included in the API response"""
         enterprise_learner = EnterpriseLearnerFactory(
@@ -496,6 +580,75 @@ class TestEnterpriseLearnerEnrollmentViewSet(JWTTestMixin, APITransactionTestCas
         ])
 
 
+@ddt.ddt
+@mark.django_db
+class TestEnterpriseLearnerViewSet(JWTTestMixin, APITransactionTestCase):
+    """
+    Tests for EnterpriseLearnerViewSet.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = UserFactory(is_staff=True)
+        role, __ = EnterpriseDataFeatureRole.objects.get_or_create(name=ENTERPRISE_DATA_ADMIN_ROLE)
+        self.role_assignment = EnterpriseDataRoleAssignment.objects.create(
+            role=role,
+            user=self.user
+        )
+        self.client.force_authenticate(user=self.user)
+        self.enterprise_id = 'ee5e6b3a-069a-4947-bb8d-d2dbc323396c'
+        self.set_jwt_cookie()
+        for index in range(5):
+            learner = EnterpriseLearnerFactory(
+                enterprise_customer_uuid=self.enterprise_id,
+                user_email=f'learner{index}@example.com',
+            )
+            EnterpriseLearnerEnrollmentFactory(
+                enterprise_customer_uuid=self.enterprise_id,
+                enterprise_user_id=learner.enterprise_user_id,
+            )
+        self.url = reverse('v1:enterprise-learner-list', kwargs={'enterprise_id': self.enterprise_id})
+
+    def test_paginated_list(self):
+        """
+        Paginated responses should not be streamed.
+        """
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.json()['count'], 5)
+
+    @ddt.data(1, 2, 5, 2000)
+    def test_no_page_streams_json_array(self, streaming_chunk_size):
+        """
+        Unpaginated responses should be streamed as a JSON array matching the non streamed serialization.
+        """
+        paginated = self.client.get(self.url, {'page_size': 100}).json()['results']
+
+        with mock.patch.object(EnterpriseLearnerViewSet, 'streaming_chunk_size', streaming_chunk_size):
+            response = self.client.get(self.url, {'no_page': 'true'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), paginated)
+
+    def test_no_page_streams_ndjson(self):
+        """
+        Unpaginated responses should be streamed as NDJSON when requested.
+        """
+        response = self.client.get(self.url, {'no_page': 'true', 'response_type': 'ndjson'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(
+            [json.loads(line)['user_email'] for line in lines],
+            [f'learner{index}@example.com' for index in range(5)],
+        )
+
+
 @ddt.ddt
 @mark.django_db
 class TestEnterpriseOffersViewSet(JWTTestMixin, APITransactionTestCase):
@@ -0,0 +1,144 @@
+"""
+Tests for the renderers in the `enterprise_data` module.
+"""
+import json
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+from unittest import TestCase
+from uuid import UUID
+
+import ddt
+from rest_framework.renderers import JSONRenderer
+from rest_framework_csv.renderers import CSVStreamingRenderer
+
+from enterprise_data.renderers import (
+    FlatCSVStreamingRenderer,
+    JSONStreamingRenderer,
+    LeaderboardCSVRenderer,
+    NDJSONStreamingRenderer,
+)
+
+
+@ddt.ddt
+class TestJSONStreamingRenderers(TestCase):
+    """
+    Tests for `JSONStreamingRenderer` and `NDJSONStreamingRenderer`.
+    """
+    records = [
+        OrderedDict([
+            ('user_email', f'learner{index}@example.com'),
+            ('enrollment_date', date(2024, 1, index + 1)),
+            ('enterprise_customer_uuid', UUID(int=index)),
+            ('course_list_price', Decimal('10.50')),
+            ('course_title', 'Line separator \u2028 é'),
+            ('current_grade', None),
+        ])
+        for index in range(20)
+    ]
+
+    @ddt.data([], records[:1], records)
+    def test_json_matches_json_renderer(self, records):
+        """
+        Validate that the streamed JSON array is identical to the output of `JSONRenderer`.
+        """
+        streamed = b''.join(JSONStreamingRenderer().render(iter(records)))
+        assert streamed == JSONRenderer().render(records)
+
+    def test_json_is_chunked(self):
+        """
+        Validate that records are yielded in chunks instead of one response body.
+        """
+        renderer = JSONStreamingRenderer()
+        renderer.chunk_size = 200
+        chunks = list(renderer.render(iter(self.records)))
+        assert len(chunks) > 1
+        assert json.loads(b''.join(chunks))[-1]['user_email'] == 'learner19@example.com'
+
+    def test_ndjson(self):
+        """
+        Validate that every record is written on its own line.
+        """
+        streamed = b''.join(NDJSONStreamingRenderer().render(iter(self.records)))
+        lines = streamed.splitlines()
+        assert len(lines) == len(self.records)
+        assert [json.loads(line) for line in lines] == json.loads(JSONRenderer().render(self.records))
+
+    def test_ndjson_empty(self):
+        """
+        Validate that no records produce an empty body.
+        """
+        assert b''.join(NDJSONStreamingRenderer().render(iter([]))) == b''
+
+
+@ddt.ddt
+class TestFlatCSVStreamingRenderer(TestCase):
+    """
+    Tests for `FlatCSVStreamingRenderer`.
+    """
+    header = ['email', 'learning_time_hours', 'session_count', 'average_session_length', 'course_completion_count']
+    records = [
+        {
+            'email': f'learner{index}@example.com',
+            'learning_time_hours': index * 1.5,
+            'session_count': 'comma, "quote"\nnewline',
+            'average_session_length': None,
+            'course_completion_count': index % 2 == 0,
+        }
+        for index in range(50)
+    ]
+
+    def generic_csv(self, records, **renderer_context):
+        """
+        Render the records with the generic `CSVStreamingRenderer`.
+        """
+        renderer_context.setdefault('header', self.header)
+        return b''.join(CSVStreamingRenderer().render(
+            (record for record in records),
+            renderer_context=renderer_context,
+        ))
+
+    @ddt.data(0, 1, 50)
+    def test_matches_generic_renderer(self, count):
+        """
+        Validate that the output is identical to `CSVStreamingRenderer` for flat rows.
+        """
+        records = self.records[:count]
+        flat = b''.join(LeaderboardCSVRenderer().render(record for record in records))
+        assert flat == self.generic_csv(records)
+
+    def test_missing_keys_and_labels(self):
+        """
+        Validate that missing keys are written as empty values and labels replace the header.
+        """
+        records = [{'email': 'learner@example.com'}, self.records[0]]
+        labels = {'email': 'Email Address'}
+        flat = b''.join(FlatCSVStreamingRenderer().render(
+            iter(records), renderer_context={'header': self.header, 'labels': labels},
+        ))
+        assert flat == self.generic_csv(records, labels=labels)
+        assert flat.startswith(b'Email Address,')
+
+    def test_single_column(self):
+        """
+        Validate that a header with a single column is supported.
+        """
+        flat = b''.join(FlatCSVStreamingRenderer().render(iter(self.records), renderer_context={'header': ['email']}))
+        assert flat == self.generic_csv(self.records, header=['email'])
+
+    def test_is_chunked(self):
+        """
+        Validate that rows are buffered into chunks instead of one chunk per row.
+        """
+        renderer = LeaderboardCSVRenderer()
+        renderer.chunk_size = 500
+        chunks = list(renderer.render(iter(self.records)))
+        assert 1 < len(chunks) < len(self.records)
+        assert b''.join(chunks) == self.generic_csv(self.records)
+
+    def test_without_header_falls_back_to_generic_renderer(self):
+        """
+        Validate that rows are flattened by the generic renderer when there is no header.
+        """
+        records = [{'a': {'b': 1}, 'c': 2}]
+        assert b''.join(FlatCSVStreamingRenderer().render(records)) == b'a.b,c\r\n1,2\r\n'
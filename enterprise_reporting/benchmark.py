@@ -0,0 +1,222 @@
+#!/usr/bin/python3
+"""
+Benchmark the hot paths of report generation against their previous implementation, checking their outputs match.
+
+    python -m enterprise_reporting.benchmark flatten --items 100000
+    python -m enterprise_reporting.benchmark rows --items 1000000
+"""
+
+import argparse
+import csv
+import datetime
+import io
+import json
+import random
+import time
+from itertools import islice
+
+from enterprise_reporting.utils import DictFlattener, flatten_dict, iter_row_batches
+
+CONTENT_TYPES = ('course', 'courserun', 'program')
+
+
+def _course_run(rng, index):
+    """Return the content metadata of a course run, shaped like the transformed catalog API output."""
+    return {
+        'key': f'course-v1:edX+Demo{index}+{rng.randint(2019, 2025)}',
+        'enrollment_start': '2024-01-01T00:00:00Z',
+        'enrollment_end': None,
+        'go_live_date': None,
+        'start': '2024-02-01T00:00:00Z',
+        'end': '2024-06-01T00:00:00Z',
+        'modified': '2024-01-15T12:00:00Z',
+        'availability': rng.choice(['Current', 'Upcoming', 'Archived']),
+        'status': 'published',
+        'pacing_type': rng.choice(['self_paced', 'instructor_paced']),
+        'enrollment_mode': 'verified',
+        'min_effort': rng.randint(1, 5),
+        'max_effort': rng.randint(5, 10),
+        'weeks_to_complete': rng.randint(4, 12),
+        'estimated_hours': rng.randint(10, 100),
+        'first_enrollable_paid_seat_price': rng.randint(50, 500),
+        'is_enrollable': rng.random() < 0.9,
+    }
+
+
+def generate_catalog(item_count, seed=0):
+    """
+    Return `item_count` synthetic catalog content metadata items, with nested dicts and lists of varying length.
+    """
+    rng = random.Random(seed)
+    items = []
+    for index in range(item_count):
+        content_type = CONTENT_TYPES[index % len(CONTENT_TYPES)]
+        if content_type == 'courserun':
+            item = dict(_course_run(rng, index), content_type='courserun', seat_types=['audit', 'verified'])
+        else:
+            item = {
+                'active': True,
+                'aggregation_key': f'{content_type}:edX+Demo{index}',
+                'card_image_url': f'https://example.com/{index}.png',
+                'content_type': content_type,
+                'course_ends': 'Future',
+                'course_runs': [_course_run(rng, index) for _ in range(rng.randint(1, 3))],
+                'end_date': None,
+                'enrollment_url': f'https://example.com/enroll/{index}',
+                'full_description': 'A course. ' * 20,
+                'image_url': {'src': f'https://example.com/{index}.jpg', 'width': 378, 'height': 225},
+                'key': f'edX+Demo{index}',
+                'languages': ['en'],
+                'organizations': ['edX'],
+                'seat_types': ['audit', 'verified'][:rng.randint(1, 2)],
+                'short_description': 'A course.',
+                'skill_names': ['Python', 'Data'][:rng.randint(0, 2)],
+                'subjects': ['Computer Science'],
+                'title': f'Demo {index}',
+                'uuid': f'00000000-0000-0000-0000-{index:012d}',
+            }
+        items.append(item)
+    return items
+
+
+def _time(func):
+    """Return the result of `func()` and its duration in seconds."""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def run_flatten_benchmark(item_count, seed=0):
+    """
+    Flatten the keys and values of a synthetic catalog with both implementations and check their outputs match.
+
+    Returns:
+        (dict): Item count, the duration in seconds of each implementation, and the speedup of the compiled plans.
+    """
+    items = generate_catalog(item_count, seed)
+
+    def reference():
+        return [(flatten_dict(item, target='key'), flatten_dict(item, target='value')) for item in items]
+
+    def compiled():
+        flatteners = {content_type: DictFlattener() for content_type in CONTENT_TYPES}
+        rows = []
+        for item in items:
+            rows.append(flatteners[item['content_type']].flatten(item))
+        return rows
+
+    expected, reference_duration = _time(reference)
+    actual, compiled_duration = _time(compiled)
+    if actual != expected:
+        raise AssertionError('The compiled flattening plans do not match flatten_dict')
+    return _results(item_count, 'flatten_dict', reference_duration, 'flatten_plan', compiled_duration)
+
+
+class _FakeCursor:
+    """
+    Database cursor serving the given rows, through both `iterate` and `fetchmany`.
+    """
+
+    def __init__(self, rows):
+        """Initialize with the rows of the executed query."""
+        self._rows = iter(rows)
+
+    def iterate(self):
+        """Yield the remaining rows one by one."""
+        return self._rows
+
+    def fetchmany(self, size):
+        """Return the next `size` rows."""
+        return list(islice(self._rows, size))
+
+
+def generate_rows(row_count, seed=0):
+    """
+    Return `row_count` synthetic rows of the progress report query, with datetime, text and numeric columns.
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2020, 1, 1)
+    rows = []
+    for index in range(row_count):
+        enrolled = start + datetime.timedelta(seconds=rng.randint(0, 10 ** 8))
+        rows.append((
+            index,
+            f'user{index}@example.com',
+            enrolled,
+            f'course-v1:edX+Demo{index % 100}+2024',
+            rng.randint(1, 10),
+            enrolled + datetime.timedelta(days=rng.randint(1, 100)) if rng.random() < 0.5 else None,
+            rng.random() < 0.5,
+            round(rng.random() * 100, 2),
+            enrolled + datetime.timedelta(days=rng.randint(1, 100)),
+            'verified',
+        ))
+    return rows
+
+
+def run_rows_benchmark(row_count, seed=0):
+    """
+    Write the rows of a synthetic query to CSV row by row, formatting every cell, and in batches of formatted columns.
+
+    Returns:
+        (dict): Row count, the duration in seconds of each implementation, and the speedup of the batches.
+    """
+    rows = generate_rows(row_count, seed)
+
+    def per_row():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        for row in _FakeCursor(rows).iterate():
+            formatted_row = []
+            for value in row:
+                if isinstance(value, datetime.datetime):
+                    formatted_row.append(value.strftime('%Y-%m-%d %H:%M:%S'))
+                else:
+                    formatted_row.append(value)
+            writer.writerow(formatted_row)
+        return output.getvalue()
+
+    def batched():
+        output = io.StringIO()
+        writer = csv.writer(output)
+        for batch in iter_row_batches(_FakeCursor(rows)):
+            writer.writerows(batch)
+        return output.getvalue()
+
+    expected, per_row_duration = _time(per_row)
+    actual, batched_duration = _time(batched)
+    if actual != expected:
+        raise AssertionError('The batched rows do not match the rows formatted one by one')
+    return _results(row_count, 'per_row', per_row_duration, 'batched', batched_duration)
+
+
+def _results(count, reference_name, reference_duration, name, duration):
+    """Return the results of a benchmark, as a dict."""
+    return {
+        'items': count,
+        f'{reference_name}_seconds': round(reference_duration, 3),
+        f'{name}_seconds': round(duration, 3),
+        'speedup': round(reference_duration / duration, 2) if duration else None,
+    }
+
+
+BENCHMARKS = {
+    'flatten': run_flatten_benchmark,
+    'rows': run_rows_benchmark,
+}
+
+
+def main():
+    """
+    Run the benchmark from the command line and print its results as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmark', nargs='?', choices=sorted(BENCHMARKS), default='flatten')
+    parser.add_argument('--items', type=int, default=100000, help='Number of catalog items or rows to process.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data.')
+    args = parser.parse_args()
+    print(json.dumps(BENCHMARKS[args.benchmark](args.items, args.seed), indent=4))
+
+
+if __name__ == '__main__':
+    main()
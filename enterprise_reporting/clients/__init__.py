@@ -3,18 +3,94 @@ Clients used to access third party systems.
 """
 
 import logging
+import math
 import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from functools import wraps
 from urllib.parse import parse_qs, urljoin, urlparse
 
 import requests
 from edx_rest_api_client.client import get_oauth_access_token
+from requests.adapters import HTTPAdapter
 
 from enterprise_reporting.utils import retry_on_exception
 
 LOGGER = logging.getLogger(__name__)
 
+# Number of keep-alive connections per host of the HTTP session shared by the clients.
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', default=16))
+# Seconds before its expiry from which a shared access token is replaced by a new one.
+ACCESS_TOKEN_REFRESH_MARGIN_IN_SECONDS = int(os.getenv('ACCESS_TOKEN_REFRESH_MARGIN_IN_SECONDS', default=300))
+
+
+class ClientRegistry:
+    """
+    OAuth access tokens and keep-alive HTTP session shared by all the API clients of a process.
+
+    Tokens are cached per client id and OAuth host, and replaced `ACCESS_TOKEN_REFRESH_MARGIN_IN_SECONDS` ahead of
+    their expiry, so that the clients of a run authenticate once rather than once per client. Forked processes, such
+    as report jobs, keep the tokens but open their own connections.
+    """
+
+    def __init__(self, pool_maxsize=HTTP_POOL_MAXSIZE, refresh_margin=ACCESS_TOKEN_REFRESH_MARGIN_IN_SECONDS):
+        """Initialize without any token or session."""
+        self.pool_maxsize = pool_maxsize
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._session = None
+
+    @property
+    def session(self):
+        """
+        Return the shared `requests.Session`, created on first use.
+        """
+        with self._lock:
+            if self._session is None:
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_maxsize, pool_maxsize=self.pool_maxsize)
+                self._session.mount('http://', adapter)
+                self._session.mount('https://', adapter)
+            return self._session
+
+    def get_access_token(self, url, client_id, client_secret):
+        """
+        Return an access token and its expiry for the given client credentials, requesting one from `url` if there
+        is none cached or if it expires within the refresh margin.
+
+        Clients needing the same token at the same time wait for a single request.
+        """
+        key = (client_id, urlparse(url).netloc)
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None or datetime.utcnow() > token[1] - self.refresh_margin:
+                token = self._tokens[key] = tuple(get_oauth_access_token(url, client_id, client_secret))
+            return token
+
+    def clear(self):
+        """
+        Forget the cached tokens and close the shared session.
+        """
+        with self._lock:
+            self._tokens = {}
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+    def _reset_session(self):
+        """
+        Drop the session inherited by a forked process, whose connections are still used by its parent.
+        """
+        self._lock = threading.Lock()
+        self._session = None
+
+
+CLIENT_REGISTRY = ClientRegistry()
+os.register_at_fork(after_in_child=CLIENT_REGISTRY._reset_session)  # pylint: disable=protected-access
+
 
 class EdxOAuth2APIMixin:
     """
@@ -46,6 +122,8 @@ class EdxOAuth2APIClient(EdxOAuth2APIMixin):
     LMS_OAUTH_HOST = os.getenv('LMS_OAUTH_HOST', default='')
     API_BASE_URL = LMS_ROOT_URL + '/api/'
     ACCESS_TOKEN_EXPIRY_THRESHOLD_IN_SECONDS = 60
+    # Maximum number of pages of a paginated response requested at the same time.
+    PAGE_FETCH_WINDOW = int(os.getenv('PAGE_FETCH_WINDOW', default=4))
 
     DEFAULT_VALUE_SAFEGUARD = object()
 
@@ -58,13 +136,22 @@ class EdxOAuth2APIClient(EdxOAuth2APIMixin):
         self.expires_at = datetime.utcnow()
         self.access_token = None
 
+    @property
+    def session(self):
+        """
+        Return the keep-alive HTTP session shared by all the clients.
+        """
+        return CLIENT_REGISTRY.session
+
     @retry_on_exception(max_retries=3, delay=2, backoff=2)
     def connect(self):
         """
         Connect to the REST API, authenticating with an access token retrieved with our client credentials.
+
+        The token is shared with the other clients using the same credentials, see `ClientRegistry`.
         """
         url = urljoin(f'{self.LMS_OAUTH_HOST}/', 'oauth2/access_token')
-        self.access_token, self.expires_at = get_oauth_access_token(url, self.client_id, self.client_secret)
+        self.access_token, self.expires_at = CLIENT_REGISTRY.get_access_token(url, self.client_id, self.client_secret)
 
     def token_expired(self):
         """
@@ -75,7 +162,7 @@ class EdxOAuth2APIClient(EdxOAuth2APIMixin):
     @EdxOAuth2APIMixin.refresh_token
     def _requests(self, url, querystring):
         headers = {'Authorization': "JWT {}".format(self.access_token)}
-        response = requests.get(
+        response = self.session.get(
             url,
             headers=headers,
             params=querystring
@@ -84,6 +171,24 @@ class EdxOAuth2APIClient(EdxOAuth2APIMixin):
         data = response.json()
         return data
 
+    @retry_on_exception(max_retries=3, delay=1, backoff=2)
+    def _request_page(self, url, querystring):
+        """
+        Request a single page of a paginated response, retrying it on its own if it fails.
+        """
+        return self._requests(url, querystring) or {}
+
+    def _build_url(self, resource, detail_resource=None, resource_id=None):
+        """
+        Return the URL of the given endpoint resource.
+        """
+        path = resource
+        if resource_id:
+            path += '/' + resource_id
+        if detail_resource:
+            path += '/' + detail_resource
+        return urljoin(f'{self.API_BASE_URL}/', path)
+
     def _load_data(
             self,
             resource,
@@ -108,15 +213,8 @@ class EdxOAuth2APIClient(EdxOAuth2APIMixin):
             (JSON): Data returned by the API.
         """
         default_val = default if default is not self.DEFAULT_VALUE_SAFEGUARD else {}
-        querystring = querystring or {}
-        path = resource
-        if resource_id:
-            path += '/' + resource_id
-        if detail_resource:
-            path += '/' + detail_resource
-
-        url = urljoin(f'{self.API_BASE_URL}/', path)
-        data = self._requests(url, querystring)
+        url = self._build_url(resource, detail_resource, resource_id)
+        data = self._requests(url, querystring or {})
 
         if should_traverse_pagination:
             results = self.traverse_pagination(data, url)
@@ -144,13 +242,87 @@ class EdxOAuth2APIClient(EdxOAuth2APIMixin):
             list of dict.
         """
         results = data.get('results', [])
+        for page in self._iter_following_pages(data, url):
+            results += page
+        return results
+
+    @staticmethod
+    def _get_page_count(data, querystring):
+        """
+        Return the number of pages of a page-number paginated response, or None if it cannot be known upfront.
+        """
+        if 'page' not in querystring:
+            return None
+        if data.get('num_pages'):
+            return int(data['num_pages'])
+        page_size = len(data.get('results') or [])
+        if data.get('count') and page_size:
+            return math.ceil(data['count'] / page_size)
+        return None
+
+    def _iter_following_pages(self, data, url):
+        """
+        Yield the "results" of the pages following the given first page of a paginated response, in order.
 
+        When the first page tells how many pages there are, up to `PAGE_FETCH_WINDOW` of the following pages are
+        requested concurrently over the pooled session. Otherwise, and for any page added while traversing, the
+        `next` links are followed one page at a time.
+        """
         next_page = data.get('next')
-        while next_page:
+        if not next_page:
+            return
+        querystring = parse_qs(urlparse(next_page).query, True)
+        page_count = self._get_page_count(data, querystring)
+
+        if page_count and self.PAGE_FETCH_WINDOW > 1:
+            first_page = int(querystring['page'][0])
+            with ThreadPoolExecutor(max_workers=self.PAGE_FETCH_WINDOW) as executor:
+                in_flight = deque()
+                for page in range(first_page, page_count + 1):
+                    if len(in_flight) >= self.PAGE_FETCH_WINDOW:
+                        data = in_flight.popleft().result()
+                        yield data.get('results', [])
+                    in_flight.append(executor.submit(self._request_page, url, dict(querystring, page=[str(page)])))
+                while in_flight:
+                    data = in_flight.popleft().result()
+                    yield data.get('results', [])
+            next_page = data.get('next')
+            if not next_page:
+                return
             querystring = parse_qs(urlparse(next_page).query, True)
-            request_data = self._requests(url, querystring)
 
-            results += request_data.get('results', [])
-            next_page = request_data.get('next')
+        while True:
+            data = self._request_page(url, querystring)
+            yield data.get('results', [])
+            next_page = data.get('next')
+            if not next_page:
+                return
+            querystring = parse_qs(urlparse(next_page).query, True)
 
-        return results
+    def iter_pages(self, resource, detail_resource=None, resource_id=None, querystring=None):
+        """
+        Lazily traverse a paginated API response, one page at a time.
+
+        Unlike `_load_data(..., should_traverse_pagination=True)`, the pages are not accumulated: only the page being
+        consumed and at most `PAGE_FETCH_WINDOW` prefetched pages are held in memory.
+
+        Arguments:
+            resource: The endpoint resource name.
+            detail_resource: The sub-resource to append to the path.
+            resource_id: The resource ID for the specific detail to get from the endpoint.
+            querystring: Optional query string parameters of the first page.
+
+        Yields:
+            list of dict: The "results" of every page.
+        """
+        url = self._build_url(resource, detail_resource, resource_id)
+        data = self._requests(url, querystring or {}) or {}
+        yield data.get('results', [])
+        yield from self._iter_following_pages(data, url)
+
+    def iter_results(self, resource, detail_resource=None, resource_id=None, querystring=None):
+        """
+        Lazily yield every result of a paginated API response, see `iter_pages`.
+        """
+        for page in self.iter_pages(resource, detail_resource, resource_id, querystring):
+            yield from page
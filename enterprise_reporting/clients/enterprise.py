@@ -6,12 +6,14 @@ Client for connecting to the LMS Enterprise endpoints.
 import logging
 import os
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 
 from requests.exceptions import ConnectionError, Timeout  # pylint: disable=redefined-builtin
 
 from enterprise_reporting import utils
 from enterprise_reporting.clients import EdxOAuth2APIClient
+from enterprise_reporting.content_cache import get_content_metadata_cache
 
 LOGGER = logging.getLogger(__name__)
 
@@ -29,6 +31,9 @@ class EnterpriseCatalogAPIClient(EdxOAuth2APIClient):
 
     PAGE_SIZE = os.getenv('PAGE_SIZE', default=1000)
 
+    # Maximum number of catalogs whose content metadata is fetched at the same time.
+    CATALOG_FETCH_CONCURRENCY = int(os.getenv('CATALOG_FETCH_CONCURRENCY', default=4))
+
     @staticmethod
     def _get_formatted_subjects(item):
         """
@@ -53,6 +58,72 @@ class EnterpriseCatalogAPIClient(EdxOAuth2APIClient):
                 raise error
         return formatted_subjects
 
+    def transform_content_metadata_item(self, item):
+        """
+        Format an item of the enterprise-catalog service's `get_content_metadata` endpoint like the items of the old
+        platform endpoint, see `transform_get_content_metadata`.
+        """
+        # Check if the item is a courserun
+        if item.get('content_type') == 'courserun':
+            # Courserun content metadata needs no massaging as it's the same in platform as it is in the
+            # enterprise catalog service
+            formatted_metadata = item
+        else:
+            # Course content metadata differs slightly between platform and the catalog service, so we need to
+            # massage the response ie filter out new, not expected fields
+            item_crs = item.get('course_runs', [])
+            formatted_course_runs = []
+            for cr in item_crs:
+                # While courseruns as a content metadata item did not change between old and new api endpoints,
+                # the courserun attribute of a course did, so we need to do some formatting.
+                formatted_course_run = {
+                    'key': cr.get('key'),
+                    'enrollment_start': cr.get('enrollment_start'),
+                    'enrollment_end': cr.get('enrollment_end'),
+                    'go_live_date': cr.get('go_live_date'),
+                    'start': cr.get('start'),
+                    'end': cr.get('end'),
+                    'modified': cr.get('modified'),
+                    'availability': cr.get('availability'),
+                    'status': cr.get('status'),
+                    'pacing_type': cr.get('pacing_type'),
+                    # New endpoint uses `type` instead of enrollment mode
+                    'enrollment_mode': cr.get('type'),
+                    'min_effort': cr.get('min_effort'),
+                    'max_effort': cr.get('max_effort'),
+                    'weeks_to_complete': cr.get('weeks_to_complete'),
+                    'estimated_hours': cr.get('estimated_hours'),
+                    'first_enrollable_paid_seat_price': cr.get('first_enrollable_paid_seat_price'),
+                    'is_enrollable': cr.get('is_enrollable'),
+                }
+                formatted_course_runs.append(formatted_course_run)
+
+            formatted_subjects = self._get_formatted_subjects(item)
+            formatted_metadata = {
+                'active': item.get('active'),
+                'aggregation_key': item.get('aggregation_key'),
+                'card_image_url': item.get('card_image_url'),
+                'content_type': item.get('content_type'),
+                'course_ends': item.get('course_ends'),
+                'course_runs': formatted_course_runs,
+                'end_date': item.get('end_date'),
+                'enrollment_url': item.get('enrollment_url'),
+                'full_description': item.get('full_description'),
+                'image_url': item.get('image_url'),
+                'key': item.get('key'),
+                'languages': item.get('languages'),
+                'organizations': item.get('organizations'),
+                'seat_types': item.get('seat_types'),
+                'short_description': item.get('short_description'),
+                'skill_names': item.get('skill_names'),
+                'skills': item.get('skills'),
+                'subjects': formatted_subjects,
+                'title': item.get('title'),
+                'uuid': item.get('uuid'),
+            }
+
+        return formatted_metadata
+
     def transform_get_content_metadata(self, traversed_metadata):
         """
         Helper method to transform a response (already traversed pagination) from the enterprise-catalog service's `get_content_metadata`.
@@ -64,85 +135,72 @@ class EnterpriseCatalogAPIClient(EdxOAuth2APIClient):
         """
         content_metadata = OrderedDict()
         for item in traversed_metadata:
-            content_id = utils.get_content_metadata_item_id(item)
-
-            # Check if the item is a courserun
-            if item.get('content_type') == 'courserun':
-                # Courserun content metadata needs no massaging as it's the same in platform as it is in the
-                # enterprise catalog service
-                formatted_metadata = item
-            else:
-                # Course content metadata differs slightly between platform and the catalog service, so we need to
-                # massage the response ie filter out new, not expected fields
-                item_crs = item.get('course_runs', [])
-                formatted_course_runs = []
-                for cr in item_crs:
-                    # While courseruns as a content metadata item did not change between old and new api endpoints,
-                    # the courserun attribute of a course did, so we need to do some formatting.
-                    formatted_course_run = {
-                        'key': cr.get('key'),
-                        'enrollment_start': cr.get('enrollment_start'),
-                        'enrollment_end': cr.get('enrollment_end'),
-                        'go_live_date': cr.get('go_live_date'),
-                        'start': cr.get('start'),
-                        'end': cr.get('end'),
-                        'modified': cr.get('modified'),
-                        'availability': cr.get('availability'),
-                        'status': cr.get('status'),
-                        'pacing_type': cr.get('pacing_type'),
-                        # New endpoint uses `type` instead of enrollment mode
-                        'enrollment_mode': cr.get('type'),
-                        'min_effort': cr.get('min_effort'),
-                        'max_effort': cr.get('max_effort'),
-                        'weeks_to_complete': cr.get('weeks_to_complete'),
-                        'estimated_hours': cr.get('estimated_hours'),
-                        'first_enrollable_paid_seat_price': cr.get('first_enrollable_paid_seat_price'),
-                        'is_enrollable': cr.get('is_enrollable'),
-                    }
-                    formatted_course_runs.append(formatted_course_run)
-
-                formatted_subjects = self._get_formatted_subjects(item)
-                formatted_metadata = {
-                    'active': item.get('active'),
-                    'aggregation_key': item.get('aggregation_key'),
-                    'card_image_url': item.get('card_image_url'),
-                    'content_type': item.get('content_type'),
-                    'course_ends': item.get('course_ends'),
-                    'course_runs': formatted_course_runs,
-                    'end_date': item.get('end_date'),
-                    'enrollment_url': item.get('enrollment_url'),
-                    'full_description': item.get('full_description'),
-                    'image_url': item.get('image_url'),
-                    'key': item.get('key'),
-                    'languages': item.get('languages'),
-                    'organizations': item.get('organizations'),
-                    'seat_types': item.get('seat_types'),
-                    'short_description': item.get('short_description'),
-                    'skill_names': item.get('skill_names'),
-                    'skills': item.get('skills'),
-                    'subjects': formatted_subjects,
-                    'title': item.get('title'),
-                    'uuid': item.get('uuid'),
-                }
-
-            content_metadata[content_id] = formatted_metadata
+            content_metadata[utils.get_content_metadata_item_id(item)] = self.transform_content_metadata_item(item)
 
         return content_metadata
 
-    def get_content_metadata(self, enterprise_customer_catalogs):
-        """Return all content metadata contained in the catalogs associated with a reporting config."""
-        content_metadata = OrderedDict()
-        for catalog in enterprise_customer_catalogs.get('results', []):
-            traversed_metadata = self._load_data(
+    def _iter_catalog_content_metadata(self, catalog, cache=None):
+        """
+        Yield the (content id, transformed item) pairs of a catalog as its pages arrive, or from `cache` if it holds
+        the current catalog version.
+        """
+        modified = catalog.get('modified')
+        if cache:
+            cached = cache.iter_items(catalog['uuid'], modified)
+            if cached is not None:
+                LOGGER.info(f'Using the cached content metadata of catalog {catalog["uuid"]}')
+                yield from cached
+                return
+
+        items = (
+            (utils.get_content_metadata_item_id(item), self.transform_content_metadata_item(item))
+            for item in self.iter_results(
                 self.GET_CONTENT_METADATA_ENDPOINT.format(catalog['uuid']),
-                should_traverse_pagination=True,
                 querystring={'page_size': self.PAGE_SIZE},
             )
-            transformed_metadata = self.transform_get_content_metadata(traversed_metadata.get('results'))
-            content_metadata.update(transformed_metadata)
+        )
+        yield from cache.store(catalog['uuid'], modified, items) if cache else items
+
+    def _get_catalog_content_metadata(self, catalog, cache=None):
+        """
+        Return the transformed content metadata of a catalog, keyed by content id.
+        """
+        return OrderedDict(self._iter_catalog_content_metadata(catalog, cache))
+
+    def _merge_content_metadata(self, enterprise_customer_catalogs):
+        """
+        Return the transformed content metadata of the given catalogs merged in order, keyed by content id.
+
+        The catalogs are fetched concurrently, and reused from the content metadata cache of the run if there is one.
+        Content found in several catalogs keeps the position of its first copy, and the value of its last one.
+        """
+        catalogs = enterprise_customer_catalogs.get('results', [])
+        cache = get_content_metadata_cache()
+        workers = max(1, min(self.CATALOG_FETCH_CONCURRENCY, len(catalogs)))
+        content_metadata = OrderedDict()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for catalog_metadata in executor.map(
+                lambda catalog: self._get_catalog_content_metadata(catalog, cache),
+                catalogs,
+            ):
+                content_metadata.update(catalog_metadata)
+        return content_metadata
+
+    def iter_content_metadata(self, enterprise_customer_catalogs):
+        """
+        Yield the content metadata contained in the catalogs associated with a reporting config, one item at a time.
 
+        The items and their order are the same as `get_content_metadata`. As the last copy of content found in
+        several catalogs is the one kept, all the catalogs are fetched before the first item is yielded.
+        """
+        yield from self._merge_content_metadata(enterprise_customer_catalogs).values()
+
+    def get_content_metadata(self, enterprise_customer_catalogs):
+        """
+        Return all content metadata contained in the catalogs associated with a reporting config.
+        """
         # We only made this a dictionary to help filter out duplicates by a common key. We just want values now.
-        return list(content_metadata.values())
+        return list(self._merge_content_metadata(enterprise_customer_catalogs).values())
 
     def get_customer_catalogs(self, enterprise_customer_uuid):
         """Return all catalog uuids owned by an Enterprise Customer."""
@@ -166,12 +224,20 @@ class EnterpriseAPIClient(EdxOAuth2APIClient):
 
     PAGE_SIZE = os.getenv('PAGE_SIZE', default=1000)
 
-    def get_all_enterprise_reporting_configs(self, **kwargs):
+    def get_all_enterprise_reporting_configs(self, active=None, data_type=None, **kwargs):
         """
         Query the enterprise customer reporting endpoint for all available configs.
+
+        Configs can be filtered by the endpoint on whether they are active and on their data type.
         """
+        querystring = dict(kwargs.pop('querystring', None) or {})
+        if active is not None:
+            querystring['active'] = str(active).lower()
+        if data_type:
+            querystring['data_type'] = data_type
         return self._load_data(
             self.ENTERPRISE_REPORTING_ENDPOINT,
+            querystring=querystring,
             should_traverse_pagination=True,
             **kwargs
         )
@@ -205,6 +271,21 @@ class EnterpriseDataApiClient(EdxOAuth2APIClient):
             querystring={'page_size': self.PAGE_SIZE},
         )
 
+    def iter_enterprise_enrollments(self, enterprise_customer_uuid, querystring=None):
+        """
+        Lazily yield the enrollments of the given enterprise, holding a single page in memory at a time.
+
+        Arguments:
+            enterprise_customer_uuid (str): The enterprise customer.
+            querystring (dict): Optional filters of the enrollments endpoint.
+        """
+        return self.iter_results(
+            'enterprise',
+            resource_id=enterprise_customer_uuid,
+            detail_resource='enrollments',
+            querystring=dict(querystring or {}, page_size=self.PAGE_SIZE),
+        )
+
 
 class EnterpriseDataV1ApiClient(EnterpriseDataApiClient):
     """
@@ -230,3 +311,14 @@ class AnalyticsDataApiClient(EdxOAuth2APIClient):
             should_traverse_pagination=True,
             querystring={'page_size': self.PAGE_SIZE},
         )
+
+    def iter_enterprise_engagements(self, enterprise_customer_uuid):
+        """
+        Lazily yield the engagements of the given enterprise, holding a single page in memory at a time.
+        """
+        return self.iter_results(
+            'enterprise',
+            resource_id=enterprise_customer_uuid,
+            detail_resource='engagements',
+            querystring={'page_size': self.PAGE_SIZE},
+        )
@@ -2,7 +2,40 @@
 Client for connecting to AWS S3.
 """
 
+import os
+import threading
+
 import boto3
+from boto3.s3.transfer import TransferConfig
+
+S3_BUCKET_NAME = 'edx-enterprise-reporting'
+
+# Number of threads downloading the parts of a report at the same time, and size of every part, in bytes.
+S3_MAX_CONCURRENCY = int(os.environ.get('S3_MAX_CONCURRENCY', 10))
+S3_MULTIPART_CHUNK_SIZE = int(os.environ.get('S3_MULTIPART_CHUNK_SIZE', 16 * 1024 * 1024))
+
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_CHUNK_SIZE,
+    multipart_chunksize=S3_MULTIPART_CHUNK_SIZE,
+    max_concurrency=S3_MAX_CONCURRENCY,
+    use_threads=S3_MAX_CONCURRENCY > 1,
+)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Return the boto3 S3 client shared by the whole process, created on first use.
+
+    boto3 clients are thread safe, so every report, and every thread of a transfer, reuses its connection pool.
+    """
+    global _client  # pylint: disable=global-statement
+    with _client_lock:
+        if _client is None:
+            _client = boto3.client('s3')
+        return _client
 
 
 class S3Client:
@@ -10,15 +43,24 @@ class S3Client:
     Client for connecting to AWS S3.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, bucket_name=S3_BUCKET_NAME, client=None):
+        """Initialize with the bucket of the reports, and the shared S3 client unless another one is given."""
+        self.bucket_name = bucket_name
+        self.client = client or get_s3_client()
 
     def get_enterprise_report(self, report_name, file_handler):
         """
-        Download a report file from S3
+        Download a report file from S3, in parts downloaded concurrently
         report_name <string>: name of the report on S3
         file_handler <file>: file object opened in binary mode
         """
-        bucket_name = 'edx-enterprise-reporting'
-        s3 = boto3.client('s3')
-        s3.download_fileobj(bucket_name, report_name, file_handler)
+        self.client.download_fileobj(self.bucket_name, report_name, file_handler, Config=TRANSFER_CONFIG)
+
+    def open_enterprise_report(self, report_name):
+        """
+        Open a report file on S3 for reading, without downloading it first
+        report_name <string>: name of the report on S3
+        Returns a binary file object streaming the body of the report, to close once read.
+        """
+        response = self.client.get_object(Bucket=self.bucket_name, Key=report_name)
+        return response['Body']
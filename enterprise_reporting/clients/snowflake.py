@@ -2,12 +2,14 @@
 Client for connecting to a Snowflake database.
 """
 
-import datetime
 import logging
+from itertools import chain
 from types import SimpleNamespace
 
 from django.conf import settings
 
+from enterprise_reporting.utils import FETCH_BATCH_SIZE, iter_row_batches
+
 LOGGER = logging.getLogger(__name__)
 
 try:
@@ -102,15 +104,15 @@ class SnowflakeClient:
         self.cursor = None
         self.connection = None
 
+    def stream_batches(self, query, batch_size=FETCH_BATCH_SIZE):
+        """
+        Streams the results for a query using the current connection, in batches of rows with formatted datetimes.
+        """
+        self.cursor.execute(query)
+        yield from iter_row_batches(self.cursor, batch_size)
+
     def stream_results(self, query):
         """
         Streams the results for a query using the current connection.
         """
-        for row in self.cursor.execute(query):
-            formatted_row = []
-            for value in row:
-                if isinstance(value, datetime.datetime):
-                    formatted_row.append(value.strftime('%Y-%m-%d %H:%M:%S'))
-                else:
-                    formatted_row.append(value)
-            yield formatted_row
+        return map(list, chain.from_iterable(self.stream_batches(query)))
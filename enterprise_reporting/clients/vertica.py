@@ -3,12 +3,14 @@ Client for connecting to a Vertica database.
 """
 
 
-import datetime
 import os
+from itertools import chain
 from logging import getLogger
 
 import vertica_python
 
+from enterprise_reporting.utils import FETCH_BATCH_SIZE, iter_row_batches
+
 LOGGER = getLogger(__name__)
 
 
@@ -44,25 +46,26 @@ class VerticaClient:
         self.connection.close()
         self.connection = None
 
-    def stream_results(self, query):
+    def stream_batches(self, query, batch_size=FETCH_BATCH_SIZE):
         """
-        Streams the results for a query using the current connection.
+        Streams the results for a query using the current connection, in batches of rows with formatted datetimes.
         """
         cursor = self.connection.cursor()
         cursor.execute(query)
-        for row in cursor.iterate():
-            formatted_row = []
-            for value in row:
-                if isinstance(value, datetime.datetime):
-                    formatted_row.append(value.strftime('%Y-%m-%d %H:%M:%S'))
-                else:
-                    formatted_row.append(value)
-            yield formatted_row
+        yield from iter_row_batches(cursor, batch_size)
 
-    def fetch_results(self, query):
+    def stream_results(self, query):
         """
-        Fetches all of the results for a query using the current connection.
+        Streams the results for a query using the current connection.
+        """
+        return map(list, chain.from_iterable(self.stream_batches(query)))
+
+    def fetch_results(self, query, batch_size=FETCH_BATCH_SIZE):
+        """
+        Fetches all of the raw results for a query using the current connection, `batch_size` rows at a time.
+
+        Reports should iterate `stream_batches` instead, which does not hold all the rows at once.
         """
         cursor = self.connection.cursor()
         cursor.execute(query)
-        return cursor.fetchall()
+        return list(chain.from_iterable(iter_row_batches(cursor, batch_size, format_datetimes=False)))
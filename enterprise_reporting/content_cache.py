@@ -0,0 +1,189 @@
+"""
+On-disk cache of catalog content metadata, shared by the report jobs of a run.
+
+Many enterprises share catalogs, so the content metadata of a catalog is fetched once per run and kept in a sqlite
+database, keyed by the catalog UUID and its modified timestamp. The path of the database is handed down to the
+report jobs, which may run in separate processes, through the `CONTENT_METADATA_CACHE` environment variable.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from collections import deque
+from contextlib import closing, contextmanager
+
+LOGGER = logging.getLogger(__name__)
+
+CONTENT_METADATA_CACHE_ENV = 'CONTENT_METADATA_CACHE'
+
+# Seconds for which content metadata of a catalog without modified timestamp is reused, if the cache outlives a run.
+CONTENT_METADATA_CACHE_MAX_AGE = int(os.environ.get('CONTENT_METADATA_CACHE_MAX_AGE', 12 * 60 * 60))
+
+# Number of items written to the cache at a time.
+STORE_BATCH_SIZE = 500
+
+# Seconds a connection waits for the database to be unlocked.
+CONNECTION_TIMEOUT = 60
+
+
+class ContentMetadataCache:
+    """
+    Transformed content metadata of catalogs, stored in a sqlite database one item per row.
+
+    Items are stored as they stream from the catalog API under a staging key private to the job storing them, and
+    are published as the catalog version at once, when all of them have been stored. Jobs storing the same catalog
+    version at the same time therefore never mix their items, and a catalog version is only served complete.
+    """
+
+    def __init__(self, path, max_age=CONTENT_METADATA_CACHE_MAX_AGE):
+        """
+        Initialize with the path of the database, created if it does not exist yet.
+
+        The database is kept in write-ahead log mode, so that jobs reading a cached catalog, which keep a read open
+        while writing its report, do not block the jobs storing other catalogs.
+        """
+        self.path = path
+        self.max_age = max_age
+        with closing(sqlite3.connect(self.path, timeout=CONNECTION_TIMEOUT)) as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS catalogs ('
+                'catalog_uuid TEXT NOT NULL, modified TEXT NOT NULL, fetched_at REAL NOT NULL, '
+                'PRIMARY KEY (catalog_uuid, modified))'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS content_metadata ('
+                'catalog_uuid TEXT NOT NULL, modified TEXT NOT NULL, position INTEGER NOT NULL, '
+                'content_id TEXT NOT NULL, data TEXT NOT NULL, '
+                'PRIMARY KEY (catalog_uuid, modified, position))'
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Yield a connection to the database within a transaction, every thread and process using its own."""
+        with closing(sqlite3.connect(self.path, timeout=CONNECTION_TIMEOUT)) as connection:
+            with connection:
+                yield connection
+
+    def _iter_rows(self, catalog_uuid, modified):
+        """Yield the stored (content id, item) pairs of a catalog version, in their original order."""
+        with closing(sqlite3.connect(self.path, timeout=CONNECTION_TIMEOUT)) as connection:
+            rows = connection.execute(
+                'SELECT content_id, data FROM content_metadata WHERE catalog_uuid = ? AND modified = ? '
+                'ORDER BY position',
+                (catalog_uuid, modified),
+            )
+            for content_id, data in rows:
+                yield content_id, json.loads(data)
+
+    def iter_items(self, catalog_uuid, modified=None):
+        """
+        Return an iterator over the cached (content id, item) pairs of the given catalog version, or None if the
+        catalog version is not cached.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT fetched_at FROM catalogs WHERE catalog_uuid = ? AND modified = ?',
+                (catalog_uuid, modified or ''),
+            ).fetchone()
+        if row is None or (not modified and time.time() - row[0] > self.max_age):
+            return None
+        return self._iter_rows(catalog_uuid, modified or '')
+
+    def get(self, catalog_uuid, modified=None):
+        """
+        Return the cached (content id, item) pairs of the given catalog version, or None if it is not cached.
+        """
+        items = self.iter_items(catalog_uuid, modified)
+        return None if items is None else [list(item) for item in items]
+
+    def store(self, catalog_uuid, modified, content_metadata):
+        """
+        Yield the given (content id, item) pairs of a catalog version, storing them as they are consumed.
+
+        The catalog version is published, replacing any previous copy, once the pairs are exhausted. The pairs
+        stored so far are discarded if the iteration is abandoned.
+        """
+        key = (catalog_uuid, modified or '')
+        staging_key = (catalog_uuid, f'staging:{uuid.uuid4().hex}')
+
+        def write(rows):
+            with self._connect() as connection:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO content_metadata (catalog_uuid, modified, position, content_id, data) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    rows,
+                )
+
+        published = False
+        try:
+            rows = []
+            for position, (content_id, item) in enumerate(content_metadata):
+                rows.append(staging_key + (position, content_id, json.dumps(item)))
+                if len(rows) == STORE_BATCH_SIZE:
+                    write(rows)
+                    rows = []
+                yield content_id, item
+            write(rows)
+            with self._connect() as connection:
+                connection.execute('DELETE FROM content_metadata WHERE catalog_uuid = ? AND modified = ?', key)
+                connection.execute(
+                    'UPDATE content_metadata SET modified = ? WHERE catalog_uuid = ? AND modified = ?',
+                    (key[1],) + staging_key,
+                )
+                connection.execute(
+                    'INSERT OR REPLACE INTO catalogs (catalog_uuid, modified, fetched_at) VALUES (?, ?, ?)',
+                    key + (time.time(),),
+                )
+            published = True
+        finally:
+            if not published:
+                with self._connect() as connection:
+                    connection.execute(
+                        'DELETE FROM content_metadata WHERE catalog_uuid = ? AND modified = ?', staging_key
+                    )
+
+    def set(self, catalog_uuid, modified, content_metadata):
+        """
+        Store all the given (content id, item) pairs of a catalog version.
+        """
+        deque(self.store(catalog_uuid, modified, content_metadata), maxlen=0)
+
+
+def get_content_metadata_cache():
+    """
+    Return the content metadata cache of the current run, or None if there is none.
+    """
+    path = os.environ.get(CONTENT_METADATA_CACHE_ENV)
+    return ContentMetadataCache(path) if path else None
+
+
+@contextmanager
+def content_metadata_cache_for_run(directory=None):
+    """
+    Provide a content metadata cache to the report jobs started within the block.
+
+    A cache configured through `CONTENT_METADATA_CACHE` is kept as is, otherwise a temporary one is created in
+    `directory` and removed at the end of the block.
+    """
+    if os.environ.get(CONTENT_METADATA_CACHE_ENV):
+        yield os.environ[CONTENT_METADATA_CACHE_ENV]
+        return
+
+    file_descriptor, path = tempfile.mkstemp(prefix='content_metadata_', suffix='.sqlite3', dir=directory)
+    os.close(file_descriptor)
+    os.environ[CONTENT_METADATA_CACHE_ENV] = path
+    try:
+        yield path
+    finally:
+        del os.environ[CONTENT_METADATA_CACHE_ENV]
+        for suffix in ('', '-journal', '-wal', '-shm'):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
@@ -2,15 +2,18 @@
 Classes that handle sending reports for enterprise customers with specific delivery methods.
 """
 
+import io
 import logging
 import os
 from smtplib import SMTPException
 
-import paramiko
-
+from enterprise_reporting import telemetry
 from enterprise_reporting.constants import SFTP_OPS_GENIE_EMAIL_ALERT_EMAILS, SFTP_OPS_GENIE_EMAIL_ALERT_FROM_EMAIL
+from enterprise_reporting.sftp import SFTPUploader
+from enterprise_reporting.streaming import write_compressed
 from enterprise_reporting.utils import (
     compress_and_encrypt,
+    compressed_file_name,
     decrypt_string,
     retry_on_exception,
     send_email_with_attachment,
@@ -34,8 +37,32 @@ class DeliveryMethod:
         self.pgp_encryption_key = reporting_config.get('pgp_encryption_key')
         self.enable_compression = reporting_config.get('enable_compression')
 
+    @property
+    def can_stream(self):
+        """
+        Return True if the delivered file can be streamed, instead of being built on disk before it is sent.
+
+        Password protected zip files are still created on disk by pyminizip.
+        """
+        return bool(self.enable_compression and not self.encrypted_password)
+
+    def get_stream_file_name(self, files):
+        """Return the name of the file streamed with `write_stream` for the given files."""
+        zip_file_name = os.path.basename(compressed_file_name(files))
+        return f'{zip_file_name}.pgp' if self.pgp_encryption_key else zip_file_name
+
+    def write_stream(self, files, fileobj):
+        """Compress, and encrypt if configured, the given files into a binary file object."""
+        LOGGER.info(f'Streaming compressed data report for {self.enterprise_customer_name}')
+        write_compressed(files, fileobj, self.pgp_encryption_key, os.path.basename(compressed_file_name(files)))
+
     def send(self, files):
         """Base method for sending files, to perform common sending logic."""
+        if self.can_stream:
+            delivery_file = os.path.join(os.path.dirname(files[0].name), self.get_stream_file_name(files))
+            with open(delivery_file, 'wb') as fileobj:
+                self.write_stream(files, fileobj)
+            return [delivery_file]
         if self.enable_compression:
             LOGGER.info(f'Encrypting data report for {self.enterprise_customer_name}')
             zip_password = decrypt_string(
@@ -74,23 +101,38 @@ class SMTPDeliveryMethod(DeliveryMethod):
         self._email = value if isinstance(value, list) else [value]
 
     def send(self, files):
-        """Send the given files through SMTP."""
-        attachment_data = {file: None for file in super().send(files)}
+        """
+        Send the given files through SMTP.
+
+        Streamed reports are compressed and encrypted into memory, as the raw email holding them is built in memory
+        anyway.
+        """
+        if self.can_stream:
+            attachment = io.BytesIO()
+            self.write_stream(files, attachment)
+            attachment_data = {self.get_stream_file_name(files): attachment.getvalue()}
+        else:
+            attachment_data = {file: None for file in super().send(files)}
         LOGGER.info(f'Emailing encrypted data to {self.enterprise_customer_name}')
         try:
-            send_email_with_attachment(
-                self.REPORT_EMAIL_SUBJECT.format(enterprise_name=self.enterprise_customer_name),
-                self.REPORT_EMAIL_BODY.format(type=self.data_type),
-                self.REPORT_EMAIL_FROM_EMAIL,
-                self.email,
-                attachment_data
-            )
+            with telemetry.stage('transfer'):
+                send_email_with_attachment(
+                    self.REPORT_EMAIL_SUBJECT.format(enterprise_name=self.enterprise_customer_name),
+                    self.REPORT_EMAIL_BODY.format(type=self.data_type),
+                    self.REPORT_EMAIL_FROM_EMAIL,
+                    self.email,
+                    attachment_data
+                )
         except SMTPException:
             LOGGER.exception('Failed to send email report to {} for {}'.format(
                 self.email,
                 self.enterprise_customer_name
             ))
         else:
+            telemetry.count('bytes_transferred', sum(len(data) for data in attachment_data.values() if data))
+            telemetry.count_file_sizes(
+                'bytes_transferred', [name for name, data in attachment_data.items() if data is None]
+            )
             LOGGER.info('Email report successfully sent to {} for {}'.format(
                 self.email,
                 self.enterprise_customer_name
@@ -112,37 +154,33 @@ class SFTPDeliveryMethod(DeliveryMethod):
         self.username = reporting_config['sftp_username']
         self.file_path = reporting_config['sftp_file_path']
 
-    @retry_on_exception(max_retries=3, delay=2, backoff=2)
+    @property
+    def uploader(self):
+        """Return the uploader to the SFTP account of the enterprise, over the pooled connection."""
+        return SFTPUploader(self.hostname, self.port, self.username, self.password)
+
     def send_over_sftp(self, data_reports):
         """
-        Send the reports via SFTP, retry on exception.
+        Send the reports via SFTP in parallel, resuming interrupted uploads.
         """
-        LOGGER.info('Connecting via SFTP to remote host {} for {}'.format(
-            self.hostname,
-            self.enterprise_customer_name
-        ))
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(
-            hostname=self.hostname,
-            port=self.port,
-            username=self.username,
-            password=self.password,
-        )
-        sftp = ssh.open_sftp()
-        for report in data_reports:
-            sftp.put(
-                report,
-                os.path.join(self.file_path, os.path.basename(report))
-            )
-        sftp.close()
-        ssh.close()
+        with telemetry.stage('transfer'):
+            self.uploader.upload_all(data_reports, self.file_path)
+
+    @retry_on_exception(max_retries=3, delay=2, backoff=2)
+    def stream_over_sftp(self, files):
+        """
+        Compress, and encrypt if configured, the given files straight into the remote file, retry on exception.
+        """
+        with self.uploader.open(os.path.join(self.file_path, self.get_stream_file_name(files))) as remote_file:
+            self.write_stream(files, telemetry.CountingWriter(remote_file))
 
     def send(self, files):
         """Send the given files through SFTP."""
         try:
-            data_reports = super().send(files)
-            self.send_over_sftp(data_reports)
+            if self.can_stream:
+                self.stream_over_sftp(files)
+            else:
+                self.send_over_sftp(super().send(files))
         except Exception:  # pylint: disable=broad-except
             email_subject = f'SFTP transmission failed for {self.enterprise_customer_name}'
             email_body = f'Failed to send {self.data_type} report for {self.enterprise_customer_name}'
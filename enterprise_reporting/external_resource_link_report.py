@@ -3,13 +3,16 @@ External Resource Link Report Generation Code.
 """
 
 
+import io
 import logging
 import operator
 import os
 import re
 import sys
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
+from itertools import islice
 from urllib.parse import urlparse
 
 from py2neo import Graph
@@ -21,6 +24,93 @@ LOGGER = logging.getLogger(__name__)
 
 AGGREGATE_REPORT_CSV_HEADER_ROW = 'Course Key,Course Title,Partner,External Domain,Count\n'
 
+# Maximum size in bytes of the CSV attached to every email. Attachments grow by about 37% once base64 encoded, so
+# the default keeps every email under the 10 MB limit of SES.
+ATTACHMENT_MAX_BYTES = int(os.environ.get('EXTERNAL_LINK_REPORT_ATTACHMENT_MAX_BYTES', 7000000))
+
+LINK_PATTERN = re.compile('https?://.*?[" <]')
+IGNORED_LINK_SUFFIXES = ('.png"', '.jpg"', '.jpeg"', '.gif"')
+
+# Number of courses whose html blocks are fetched from coursegraph per query.
+COURSEGRAPH_PAGE_SIZE = int(os.environ.get('COURSEGRAPH_PAGE_SIZE', 200))
+
+# Number of html blocks extracted at a time, number of them sent to a process at once, and number of those processes.
+LINK_EXTRACTION_BATCH_SIZE = 1000
+LINK_EXTRACTION_CHUNK_SIZE = 50
+LINK_EXTRACTION_PROCESSES = int(os.environ.get('LINK_EXTRACTION_PROCESSES', os.cpu_count() or 1))
+
+COURSE_KEYS_QUERY = '''MATCH
+                (c:course)
+              WHERE c.course_key STARTS WITH 'course-'
+              RETURN
+                c.course_key AS course_key
+              ORDER BY course_key'''
+
+HTML_BLOCKS_QUERY = '''MATCH
+                (c:course)-[:PARENT_OF*]->(h:html)
+              WHERE c.course_key IN $course_keys AND (
+                h.data CONTAINS 'https://'
+                OR
+                h.data CONTAINS 'http://'
+              )
+              RETURN
+                c.display_name as course_title,
+                c.org as organization,
+                h.course_key,
+                h.data'''
+
+
+def write_csv(output, processed_results, header_row, additional_columns):
+    """
+    writes the csv of the processed results to the text file object output,
+    one course at a time, starting with header_row
+
+    see create_csv_string for the arguments
+    """
+    output.write(header_row)
+    for course_key, data in processed_results.items():
+        output.write(create_csv_row(course_key, data, additional_columns))
+
+
+def create_csv_row(course_key, data, additional_columns):
+    """
+    generates the csv rows of a single course, see create_csv_string
+    """
+    return '{},"{}",{},{}\n'.format(
+        course_key,
+        data['course_title'],
+        data['organization'],
+        additional_columns(data),
+    )
+
+
+def iter_csv_chunks(processed_results, header_row, additional_columns, max_bytes=ATTACHMENT_MAX_BYTES):
+    """
+    generates the csv of the processed results as utf-8 encoded chunks, each
+    starting with header_row and packing as many courses as fit in max_bytes,
+    so that every chunk can be sent as the attachment of its own email
+
+    a course whose rows alone exceed max_bytes gets a chunk of its own, and
+    a single chunk holding only header_row is generated when there are no
+    courses. see create_csv_string for the other arguments
+
+    Yields (bytes) chunks, one at a time
+    """
+    header = header_row.encode('utf-8')
+    chunk = io.BytesIO()
+    chunk.write(header)
+    course_count = 0
+    for course_key, data in processed_results.items():
+        row = create_csv_row(course_key, data, additional_columns).encode('utf-8')
+        if course_count and chunk.tell() + len(row) > max_bytes:
+            yield chunk.getvalue()
+            chunk = io.BytesIO()
+            chunk.write(header)
+            course_count = 0
+        chunk.write(row)
+        course_count += 1
+    yield chunk.getvalue()
+
 
 def create_csv_string(processed_results, header_row, additional_columns):
     """
@@ -37,14 +127,9 @@ def create_csv_string(processed_results, header_row, additional_columns):
 
     Returns (unicode) string
     """
-    for course_key, data in list(processed_results.items()):
-        header_row += '{},"{}",{},{}\n'.format(
-            course_key,
-            data['course_title'],
-            data['organization'],
-            additional_columns(data),
-        )
-    return header_row
+    output = io.StringIO()
+    write_csv(output, processed_results, header_row, additional_columns)
+    return output.getvalue()
 
 
 def create_columns_for_aggregate_report(data):
@@ -63,135 +148,110 @@ def create_columns_for_aggregate_report(data):
     return '\n,,,'.join(stringified_urls_and_counts)
 
 
-def gather_links_from_html(html_string):
+def gather_links_and_domains_from_html(html_string):
     """
     Takes some html blob as a string and extracts any external links, and
-    returns them as a set
+    returns them as a list of (link, domain) pairs
     """
-    pattern = 'https?://.*?[" <]'
-
     links = []
-    for link in re.findall(pattern, html_string,):
+    for link in LINK_PATTERN.findall(html_string):
         link = link[0:-1].strip()
-        if (link.lower().endswith('.png"') or
-            link.lower().endswith('.jpg"') or
-            link.lower().endswith('.jpeg"') or
-            link.lower().endswith('.gif"') or
-            '.edx.org' in link):
+        lowered_link = link.lower()
+        if lowered_link.endswith(IGNORED_LINK_SUFFIXES) or '.edx.org' in link:
             continue
 
         # Want to verify the link captured is a proper url
         # If not, toss it out and throw a log message
         try:
-            urlparse(link)
+            uri = urlparse(link)
         except ValueError:
             LOGGER.warning(
                 "Unparsable URL found. Not including in report: %s" % link
             )
             continue
 
-        links.append(link)
+        links.append((link, f'{uri.scheme}://{uri.netloc}'))
     return links
 
 
-def process_coursegraph_results(raw_results):
+def gather_links_from_html(html_string):
+    """
+    Takes some html blob as a string and extracts any external links, and
+    returns them as a list
+    """
+    return [link for link, _ in gather_links_and_domains_from_html(html_string)]
+
+
+def add_course_links(processed_results, entry, links_and_domains):
+    """
+    Adds the external links found in the html block of a coursegraph entry,
+    and the counts of their domains, to processed_results
+    """
+    course_key = entry['h.course_key']
+    if course_key not in processed_results:
+        processed_results[course_key] = {
+            'course_title': entry['course_title'],
+            'organization': entry['organization'],
+            'external_links': set(),
+            'domain_count': {},
+        }
+    course_results = processed_results[course_key]
+    course_results['external_links'].update(link for link, _ in links_and_domains)
+
+    domain_count = course_results['domain_count']
+    for domain, count in Counter(domain for _, domain in links_and_domains).items():
+        domain_count[domain] = domain_count.get(domain, 0) + count
+
+
+def process_coursegraph_results(raw_results, executor=None):
     """
-    Takes the data from a coursegraph query
+    Takes the data from a coursegraph query, as any iterable of entries, and
+    aggregates it as it is consumed
+
+    The links of the html blocks are extracted by executor, such as a process
+    pool, when given
 
     Returns a dict with course keys as the key and dict data about that course
     as value
     """
     processed_results = {}
-    for entry in raw_results:
-        course_key = entry['h.course_key']
-        # Only want new style course keys to exclude archived courses
-        if not course_key.startswith('course-'):
-            continue
-
-        external_links = gather_links_from_html(entry['h.data'])
-
-        if not external_links:
-            continue
-
-        # Create entry in processed_results and keep external_links up to date
-        if course_key not in processed_results:
-            processed_results[course_key] = {
-                'course_title': entry['course_title'],
-                'organization': entry['organization'],
-                'external_links': set(external_links),
-                'domain_count': {},
-            }
+    # Only want new style course keys to exclude archived courses
+    entries = (entry for entry in raw_results if entry['h.course_key'].startswith('course-'))
+    while True:
+        batch = list(islice(entries, LINK_EXTRACTION_BATCH_SIZE))
+        if not batch:
+            return processed_results
+        html_blocks = [entry['h.data'] for entry in batch]
+        if executor:
+            links = executor.map(
+                gather_links_and_domains_from_html, html_blocks, chunksize=LINK_EXTRACTION_CHUNK_SIZE
+            )
         else:
-            processed_results[course_key]['external_links'].update(external_links)
-
-        # Now use external links to create the domains and counts
-        domains = [
-            '{uri.scheme}://{uri.netloc}'.format(uri=urlparse(link))
-            for link in external_links
-        ]
-        # calculate the unique counts for all the urls
-        domains_with_counts = dict(Counter(domains))
-
-        for domain, count in list(domains_with_counts.items()):
-            if domain in processed_results[course_key]['domain_count']:
-                processed_results[course_key]['domain_count'][domain] += count
-            else:
-                processed_results[course_key]['domain_count'][domain] = count
-
-    return processed_results
+            links = map(gather_links_and_domains_from_html, html_blocks)
+        for entry, links_and_domains in zip(batch, links):
+            if links_and_domains:
+                add_course_links(processed_results, entry, links_and_domains)
 
 
-def query_coursegraph():
+def query_coursegraph(graph=None, page_size=COURSEGRAPH_PAGE_SIZE):
     """
-    Calls coursegraph with cypher query and returns query data
+    Calls coursegraph with cypher queries and yields query data
 
-    The data is a list of dicts where each dict contains keys that correspond
-    to what is being returned in the query
+    The html blocks are queried page_size courses at a time. The data is an
+    iterator of dicts where each dict contains keys that correspond to what
+    is being returned in the query
     """
-    graph = Graph(
-        bolt=True,
-        http_port=os.environ.get('COURSEGRAPH_PORT'),
-        host=os.environ.get('COURSEGRAPH_HOST'),
-        secure=True,
-    )
-    query = '''MATCH
-                (c:course)-[:PARENT_OF*]->(h:html) 
-              WHERE (
-                h.data CONTAINS 'https://'
-                OR
-                h.data CONTAINS 'http://'
-              )
-              RETURN
-                c.display_name as course_title,
-                c.org as organization,
-                h.course_key, 
-                h.data'''
-    results = graph.run(query)
-    return results.data()
-
-
-def split_up_results(processed_results_part1):
-    """
-    Splits up a dictionary of processed_results into a list of
-    two smaller dictionaries.
-    """
-    # NOTE: we are splitting this into 2 dicts because it is 1) easy to do
-    # and 2) we have about 8 MB of overhead for newly added strings to this
-    # report before it becomes a problem again... which should not be for
-    # a veeeery long time.
-    #
-    # If emails fail due to size in the future, implement a solution that
-    # dynamically chooses chunk size and email quantity based on size of
-    # string data included in each of the dictionary entries being
-    # iterated over.
-    processed_results_part2 = {}
-
-    original_len = len(processed_results_part1)
-    while len(processed_results_part1) > (original_len / 2):
-        k, v = processed_results_part1.popitem()
-        processed_results_part2[k] = v
-
-    return [processed_results_part1, processed_results_part2]
+    if graph is None:
+        graph = Graph(
+            bolt=True,
+            http_port=os.environ.get('COURSEGRAPH_PORT'),
+            host=os.environ.get('COURSEGRAPH_HOST'),
+            secure=True,
+        )
+    course_keys = [record['course_key'] for record in graph.run(COURSE_KEYS_QUERY)]
+    for start in range(0, len(course_keys), page_size):
+        for record in graph.run(HTML_BLOCKS_QUERY, course_keys=course_keys[start:start + page_size]):
+            yield record.data()
 
 
 def generate_and_email_report():
@@ -213,29 +273,23 @@ Sincerely,
 The Enterprise Team'''
 
     LOGGER.info("Querying Course Graph DB...")
-    raw_results = query_coursegraph()
+    with ProcessPoolExecutor(max_workers=LINK_EXTRACTION_PROCESSES) as executor:
+        processed_results = process_coursegraph_results(query_coursegraph(), executor)
 
     # Results are too large to send in 1 email (~10MB is the limit) so
-    # we split up the results into two parts
-    processed_results = process_coursegraph_results(raw_results)
-    result_dicts = split_up_results(processed_results)
-
-    for index, result in enumerate(result_dicts):
+    # we split them up into as many parts as needed
+    chunks = iter_csv_chunks(
+        processed_results,
+        AGGREGATE_REPORT_CSV_HEADER_ROW,
+        create_columns_for_aggregate_report
+    )
+    for index, chunk in enumerate(chunks):
         readable_number = index + 1
-
-        LOGGER.info(
-            "Generating aggregate external links spreadsheet part %s..." % readable_number
-        )
-        aggregate_report_data = create_csv_string(
-            result,
-            AGGREGATE_REPORT_CSV_HEADER_ROW,
-            create_columns_for_aggregate_report
-        )
         filename = 'external-resource-domain-report-part{}-{}.csv'.format(
             readable_number,
             today,
         )
-        attachment_data = {filename: aggregate_report_data.encode('utf-8')}
+        attachment_data = {filename: chunk}
 
         LOGGER.info(
             "Emailing aggregate spreadsheet part %s..." % readable_number
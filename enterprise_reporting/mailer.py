@@ -0,0 +1,139 @@
+"""
+Send report emails with attachments through Amazon SES.
+
+The raw MIME message is serialized once, base64 encoding the attachments straight from disk, and every recipient
+gets its own copy, with its own `To` header, sent concurrently within the SES maximum send rate.
+"""
+
+import base64
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.base import MIMEBase
+from email.mime.text import MIMEText
+from email.policy import SMTP
+
+import boto3
+
+LOGGER = logging.getLogger(__name__)
+
+# Maximum number of emails sent per second, and at the same time, which must stay within the SES account limits.
+SES_MAX_SEND_RATE = float(os.environ.get('SES_MAX_SEND_RATE', 14))
+SES_SEND_CONCURRENCY = int(os.environ.get('SES_SEND_CONCURRENCY', 4))
+
+# Size of the chunks attachments are encoded in, a multiple of the 57 bytes encoded on every 76 character line.
+ENCODE_CHUNK_SIZE = 57 * 1024
+
+PREAMBLE = b'Multipart message.\r\n'
+
+
+class RateLimiter:
+    """
+    Space out calls made from any number of threads to at most `rate` per second.
+    """
+
+    def __init__(self, rate):
+        """Initialize with the maximum number of calls per second."""
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Block until the next call is allowed."""
+        with self._lock:
+            now = time.monotonic()
+            scheduled = max(now, self._next)
+            self._next = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+def _headers(part):
+    """Return the serialized headers of a MIME part, followed by the blank line ending them."""
+    return b''.join(SMTP.fold_binary(name, value) for name, value in part.items()) + b'\r\n'
+
+
+def _write_attachment(output, boundary, filename, data):
+    """
+    Write an attachment part, encoding `data`, or the content of the file at `filename` if None, in chunks.
+    """
+    part = MIMEBase('application', 'zip', policy=SMTP)
+    part['Content-Transfer-Encoding'] = 'base64'
+    part.add_header('Content-Disposition', 'attachment', filename=os.path.basename(filename))
+    output.write(b'--' + boundary + b'\r\n' + _headers(part))
+
+    if data is None:
+        source = open(filename, 'rb')  # pylint: disable=consider-using-with
+    else:
+        source = io.BytesIO(data.encode('utf-8') if isinstance(data, str) else data)
+    with source:
+        for chunk in iter(lambda: source.read(ENCODE_CHUNK_SIZE), b''):
+            output.write(base64.encodebytes(chunk).replace(b'\n', b'\r\n'))
+
+
+def build_raw_message(subject, body, from_email, attachment_data):
+    """
+    Serialize a multipart message with the given text body and attachments, without any `To` header.
+
+    Arguments:
+        subject (str): Subject of the email.
+        body (str): Text of the email.
+        from_email (str): Sender of the email.
+        attachment_data (dict): File names mapped to the attachment content, or None to read it from the file.
+
+    Returns:
+        (bytes): The raw message.
+    """
+    boundary = f'==============={uuid.uuid4().hex}=='.encode('ascii')
+    message = MIMEBase('multipart', 'mixed', policy=SMTP, boundary=boundary.decode('ascii'))
+    message['Subject'] = subject
+    message['From'] = from_email
+
+    output = io.BytesIO()
+    output.write(_headers(message) + PREAMBLE)
+    output.write(b'--' + boundary + b'\r\n' + MIMEText(body).as_bytes(policy=SMTP) + b'\r\n')
+    for filename, data in attachment_data.items():
+        _write_attachment(output, boundary, filename, data)
+    output.write(b'--' + boundary + b'--\r\n')
+    return output.getvalue()
+
+
+def address(raw_message, email):
+    """
+    Return the given raw message with a `To` header for `email`.
+    """
+    return SMTP.fold_binary('To', SMTP.header_store_parse('To', email)[1]) + raw_message
+
+
+def send_raw_email(subject, body, from_email, to_email, attachment_data, region_name):
+    """
+    Send an email with attachments to each of the given recipients, independently.
+
+    Raises the first error met, once every recipient has been attempted.
+    """
+    client = boto3.client('ses', region_name=region_name)
+    raw_message = build_raw_message(subject, body, from_email, attachment_data)
+    rate_limiter = RateLimiter(SES_MAX_SEND_RATE)
+
+    def send(email):
+        rate_limiter.wait()
+        result = client.send_raw_email(
+            RawMessage={'Data': address(raw_message, email)},
+            Source=from_email,
+            Destinations=[email],
+        )
+        LOGGER.debug(result)
+
+    if len(to_email) <= 1 or SES_SEND_CONCURRENCY <= 1:
+        for email in to_email:
+            send(email)
+        return
+
+    with ThreadPoolExecutor(max_workers=min(SES_SEND_CONCURRENCY, len(to_email))) as executor:
+        futures = [executor.submit(send, email) for email in to_email]
+    for future in futures:
+        future.result()
@@ -7,9 +7,11 @@ import datetime
 import json
 import logging
 import os
-from collections import OrderedDict
+from functools import partial
+from itertools import chain
 from uuid import UUID
 
+from enterprise_reporting import telemetry
 from enterprise_reporting.clients.enterprise import (
     AnalyticsDataApiClient,
     EnterpriseAPIClient,
@@ -20,11 +22,16 @@ from enterprise_reporting.clients.enterprise import (
 from enterprise_reporting.clients.s3 import S3Client
 from enterprise_reporting.clients.vertica import VerticaClient
 from enterprise_reporting.delivery_method import SFTPDeliveryMethod, SMTPDeliveryMethod
+from enterprise_reporting.exporters import export_progress_v3_csv, is_direct_export_enabled
+from enterprise_reporting.incremental import WatermarkTracker, changed_since_params
+from enterprise_reporting.streaming import StreamedReportFile
 from enterprise_reporting.utils import (
+    SortedColumnsCSVWriter,
     decrypt_string,
     extract_catalog_uuids_from_reporting_config,
-    generate_data,
     retry_on_exception,
+    write_csv_records,
+    write_json_records,
 )
 
 LOGGER = logging.getLogger(__name__)
@@ -66,18 +73,27 @@ class EnterpriseReportSender:
 
     FILE_WRITE_DIRECTORY = '/tmp'
 
-    def __init__(self, reporting_config, delivery_method):
+    def __init__(self, reporting_config, delivery_method, file_write_directory=None, changed_since=None):
         """Initialize with an EnterpriseCustomerReportingConfiguration."""
         self.reporting_config = reporting_config
         self.delivery_method = delivery_method
+        self.file_write_directory = file_write_directory or self.FILE_WRITE_DIRECTORY
+        self.changed_since = changed_since
+        self.watermark = WatermarkTracker()
+        self.telemetry = telemetry.ReportTelemetry()
         self.enterprise_customer_uuid = reporting_config['enterprise_customer']['uuid']
         self.enterprise_customer_name = reporting_config['enterprise_customer']['name']
         self.data_type = reporting_config['data_type']
         self.report_type = reporting_config['report_type']
 
     @staticmethod
-    def create(reporting_config):
-        """Create the EnterpriseReportSender and all of its dependencies."""
+    def create(reporting_config, file_write_directory=None, changed_since=None):
+        """
+        Create the EnterpriseReportSender and all of its dependencies.
+
+        Report files are written to `file_write_directory` when given, `FILE_WRITE_DIRECTORY` otherwise. Progress
+        reports given a `changed_since` watermark only contain the enrollments changed since then.
+        """
         enterprise_customer_name = reporting_config['enterprise_customer']['name']
         delivery_method_str = reporting_config['delivery_method']
         if delivery_method_str == 'email':
@@ -101,14 +117,14 @@ class EnterpriseReportSender:
         else:
             raise ValueError(f'Invalid delivery method: {delivery_method_str}')
 
-        return EnterpriseReportSender(reporting_config, delivery_method)
+        return EnterpriseReportSender(reporting_config, delivery_method, file_write_directory, changed_since)
 
     @property
     def data_report_file_name(self):
         """Get the full path to the report file."""
         date_str = f"_{NOW}" if self.reporting_config.get('include_date') else ""
         return "{dir}/{enterprise_id}_{data}_{ext}{date_str}.{ext}".format(
-            dir=self.FILE_WRITE_DIRECTORY,
+            dir=self.file_write_directory,
             enterprise_id=self.enterprise_customer_uuid,
             data=self.data_type,
             date_str=date_str,
@@ -124,10 +140,14 @@ class EnterpriseReportSender:
     def send_enterprise_report(self):
         """Generate the report file of the appropriate type and send it through the configured delivery method."""
         LOGGER.info(f'Starting process to send report to {self.enterprise_customer_name}')
-        files = self._generate_enterprise_report()
-        if files:
-            self.delivery_method.send(files)
-        else:
+        with telemetry.recording(self.telemetry):
+            with telemetry.stage('generate'):
+                files = self._generate_enterprise_report()
+            telemetry.count_file_sizes('bytes_written', [file.name for file in files])
+            if files:
+                with telemetry.stage('delivery'):
+                    self.delivery_method.send(files)
+        if not files:
             LOGGER.warning('No {} {} reports were generated for {}! Moving on...'.format(
                 self.data_type,
                 self.report_type,
@@ -154,7 +174,8 @@ class EnterpriseReportSender:
                 enterprise_id=UUID(self.enterprise_customer_uuid).hex
             )
             LOGGER.debug(f'Executing this Vertica query: {query}')
-            data_report_file_writer.writerows(vertica_client.stream_results(query))
+            for rows in telemetry.fetched(vertica_client.stream_batches(query), batched=True):
+                data_report_file_writer.writerows(rows)
         vertica_client.close_connection()
         return [data_report_file]
 
@@ -177,90 +198,109 @@ class EnterpriseReportSender:
 
         return s3_csv_path
 
-    def _generate_enterprise_report_grade_csv(self):
-        """Query S3 and write output to csv file."""
+    def _get_s3_report(self, report_name):
+        """
+        Return the report file at the S3 CSV path.
+
+        When the delivery method streams its file, the report is streamed from S3 straight into the compression and
+        encryption of that file. Otherwise it is downloaded to disk, in parts downloaded concurrently.
+        """
         s3_client = S3Client()
+        s3_csv_path = self.get_s3_csv_path()
+        if self.delivery_method.can_stream:
+            LOGGER.debug(f'Streaming enterprise {report_name} report from S3')
+            return [StreamedReportFile(
+                self.data_report_file_name,
+                partial(s3_client.open_enterprise_report, s3_csv_path),
+            )]
         with open(self.data_report_file_name, 'wb') as data_report_file:
-            LOGGER.debug('Fetching enterprise grade report from S3')
-            s3_client.get_enterprise_report(self.get_s3_csv_path(), data_report_file)
+            LOGGER.debug(f'Fetching enterprise {report_name} report from S3')
+            s3_client.get_enterprise_report(s3_csv_path, data_report_file)
         return [data_report_file]
 
+    def _generate_enterprise_report_grade_csv(self):
+        """Query S3 and write output to csv file."""
+        return self._get_s3_report('grade')
+
     def _generate_enterprise_report_course_structure_csv(self):
         """Query S3 and write output to csv file."""
-        s3_client = S3Client()
-        with open(self.data_report_file_name, 'wb') as data_report_file:
-            LOGGER.debug('Fetching enterprise course structure report from S3')
-            s3_client.get_enterprise_report(self.get_s3_csv_path(), data_report_file)
-        return [data_report_file]
+        return self._get_s3_report('course structure')
 
     def _generate_enterprise_report_completion_csv(self):
         """Query S3 and write output to csv file."""
-        s3_client = S3Client()
-        with open(self.data_report_file_name, 'wb') as data_report_file:
-            LOGGER.debug('Fetching enterprise completion report from S3')
-            s3_client.get_enterprise_report(self.get_s3_csv_path(), data_report_file)
-        return [data_report_file]
+        return self._get_s3_report('completion')
 
-    def _generate_enterprise_report_progress_v2_csv(self):
-        """Query the Enterprise Data API to get progress data to be turned into a CSV."""
-        enrollments = EnterpriseDataApiClient().get_enterprise_enrollments(self.enterprise_customer_uuid)['results']
-        if not enrollments:
+    def _write_csv_report(self, records, sort_keys=False):
+        """
+        Stream the given records to the report CSV file, without creating the file when there are no records.
+        """
+        records = telemetry.fetched(records)
+        first_record = next(records, None)
+        if first_record is None:
             return []
         with open(self.data_report_file_name, 'w') as data_report_file:
-            writer = csv.writer(data_report_file)
-            writer.writerow(list(OrderedDict(sorted(enrollments[0].items())).keys()))
-            for enrollment in enrollments:
-                writer.writerow(list(OrderedDict(sorted(enrollment.items())).values()))
+            write_csv_records(data_report_file, chain([first_record], records), sort_keys=sort_keys)
         return [data_report_file]
 
-    def _generate_enterprise_report_progress_v3_csv(self):
-        """Query the Enterprise Data V1 API to get progress data to be turned into a CSV."""
-        enrollments = EnterpriseDataV1ApiClient().get_enterprise_enrollments(self.enterprise_customer_uuid)['results']
-        if not enrollments:
-            return []
+    def _write_json_report(self, records):
+        """
+        Stream the given records to the report JSON file.
+        """
         with open(self.data_report_file_name, 'w') as data_report_file:
-            writer = csv.writer(data_report_file)
-            csv_header = list(enrollments[0].keys())
-            writer.writerow(csv_header)
-            for enrollment in enrollments:
-                writer.writerow(list(enrollment.values()))
+            write_json_records(data_report_file, telemetry.fetched(records))
         return [data_report_file]
 
+    def _generate_enterprise_report_progress_v2_csv(self):
+        """Query the Enterprise Data API to get progress data to be turned into a CSV."""
+        enrollments = EnterpriseDataApiClient().iter_enterprise_enrollments(self.enterprise_customer_uuid)
+        return self._write_csv_report(enrollments, sort_keys=True)
+
+    def _iter_progress_v3_enrollments(self):
+        """Lazily yield the progress_v3 enrollments from the Enterprise Data V1 API, keeping their watermark."""
+        return self.watermark.track(EnterpriseDataV1ApiClient().iter_enterprise_enrollments(
+            self.enterprise_customer_uuid,
+            querystring=changed_since_params(self.changed_since),
+        ))
+
+    def _generate_enterprise_report_progress_v3_csv(self):
+        """
+        Query the Enterprise Data V1 API to get progress data to be turned into a CSV.
+
+        When direct export is enabled, the same data is read straight from the enterprise_data database instead.
+        """
+        if is_direct_export_enabled():
+            with open(self.data_report_file_name, 'w') as data_report_file:
+                count = export_progress_v3_csv(
+                    self.enterprise_customer_uuid,
+                    data_report_file,
+                    query_params=changed_since_params(self.changed_since),
+                    observe=self.watermark.observe,
+                )
+            telemetry.count('rows', count)
+            if not count:
+                os.remove(self.data_report_file_name)
+                return []
+            return [data_report_file]
+        return self._write_csv_report(self._iter_progress_v3_enrollments())
+
     def _generate_enterprise_report_engagement_csv(self):
         """Query the Analytics Data API to get engagement data to be turned into a CSV."""
-        engagements = AnalyticsDataApiClient().get_enterprise_engagements(self.enterprise_customer_uuid)['results']
-        if not engagements:
-            return []
-        with open(self.data_report_file_name, 'w') as data_report_file:
-            writer = csv.writer(data_report_file)
-            writer.writerow(list(OrderedDict(sorted(engagements[0].items())).keys()))
-            for engagement in engagements:
-                writer.writerow(list(OrderedDict(sorted(engagement.items())).values()))
-        return [data_report_file]
+        engagements = AnalyticsDataApiClient().iter_enterprise_engagements(self.enterprise_customer_uuid)
+        return self._write_csv_report(engagements, sort_keys=True)
 
     def _generate_enterprise_report_progress_v2_json(self):
         """
         Query the Enterprise Data API to get progress data to be turned into json.
         """
-        enrollments = EnterpriseDataApiClient().get_enterprise_enrollments(self.enterprise_customer_uuid)['results']
-        report_data = enrollments if enrollments else []
-
-        with open(self.data_report_file_name, 'w') as data_report_file:
-            json.dump(report_data, data_report_file, indent=4)
-
-        return [data_report_file]
+        return self._write_json_report(
+            EnterpriseDataApiClient().iter_enterprise_enrollments(self.enterprise_customer_uuid)
+        )
 
     def _generate_enterprise_report_progress_v3_json(self):
         """
         Query the Enterprise Data V1 API to get progress data to be turned into json.
         """
-        enrollments = EnterpriseDataV1ApiClient().get_enterprise_enrollments(self.enterprise_customer_uuid)['results']
-        report_data = enrollments if enrollments else []
-
-        with open(self.data_report_file_name, 'w') as data_report_file:
-            json.dump(report_data, data_report_file, indent=4)
-
-        return [data_report_file]
+        return self._write_json_report(self._iter_progress_v3_enrollments())
 
     def _generate_enterprise_report_catalog_csv(self):
         """
@@ -268,30 +308,26 @@ class EnterpriseReportSender:
 
         Note that at the current time, the CSV is unconventional. It is produced with multiple headers,
         one per each JSON object retrieved from the catalog API.
+
+        Items are written one at a time, once all the catalogs have been fetched, to one CSV file per content type,
+        opened on the first item of that type.
         """
-        content_metadata = self.__get_content_metadata()
-        LOGGER.debug('Grouping up content metadata by type...')
-        grouped_content_metadata = {}
-        for item in content_metadata:
-            content_type = item['content_type']
-            if content_type not in grouped_content_metadata:
-                grouped_content_metadata[content_type] = [item]
-            else:
-                grouped_content_metadata[content_type].append(item)
-
-        LOGGER.info('Beginning to write content metadata groups to CSVs...')
+        LOGGER.info('Beginning to write content metadata to CSVs by type...')
         files = []
-        for content_type, grouped_items in list(grouped_content_metadata.items()):
-            with open(self.data_report_file_name_with.format(content_type), 'w') as data_report_file:
-                writer = csv.writer(data_report_file)
-                if grouped_items:
-                    # Write single row of headers in csv.
-                    writer.writerow(generate_data(grouped_items[0], target='key'))
-
-                for item in grouped_items:
-                    writer.writerow(generate_data(item, target='value'))
-
-                files.append(data_report_file)
+        writers = {}
+        try:
+            for item in telemetry.fetched(self.__iter_content_metadata()):
+                content_type = item['content_type']
+                if content_type not in writers:
+                    data_report_file = open(  # pylint: disable=consider-using-with
+                        self.data_report_file_name_with.format(content_type), 'w'
+                    )
+                    files.append(data_report_file)
+                    writers[content_type] = SortedColumnsCSVWriter(data_report_file)
+                writers[content_type].writerow(item)
+        finally:
+            for data_report_file in files:
+                data_report_file.close()
         return files
 
     def _generate_enterprise_report_catalog_json(self):
@@ -301,13 +337,21 @@ class EnterpriseReportSender:
             json.dump(list(content_metadata), data_report_file, indent=4)
         return [data_report_file]
 
-    def __get_content_metadata(self):
-        """Get content metadata from the Enterprise Catalog API."""
+    def __get_customer_catalogs(self, enterprise_catalog_api_client):
+        """Return the catalogs of the reporting config, or all the catalogs of the enterprise if it has none."""
         customer_catalogs = extract_catalog_uuids_from_reporting_config(self.reporting_config)
-        enterprise_catalog_api_client = EnterpriseCatalogAPIClient()
-
         if not customer_catalogs.get('results'):
             customer_catalogs = enterprise_catalog_api_client.get_customer_catalogs(self.enterprise_customer_uuid)
+        return customer_catalogs
 
-        content_metadata = enterprise_catalog_api_client.get_content_metadata(customer_catalogs)
-        return content_metadata
+    def __get_content_metadata(self):
+        """Get content metadata from the Enterprise Catalog API."""
+        enterprise_catalog_api_client = EnterpriseCatalogAPIClient()
+        customer_catalogs = self.__get_customer_catalogs(enterprise_catalog_api_client)
+        return enterprise_catalog_api_client.get_content_metadata(customer_catalogs)
+
+    def __iter_content_metadata(self):
+        """Lazily yield content metadata from the Enterprise Catalog API, one item at a time."""
+        enterprise_catalog_api_client = EnterpriseCatalogAPIClient()
+        customer_catalogs = self.__get_customer_catalogs(enterprise_catalog_api_client)
+        return enterprise_catalog_api_client.iter_content_metadata(customer_catalogs)
@@ -6,45 +6,204 @@ Sends an Enterprise Customer's data file to a configured destination.
 
 import argparse
 import datetime
+import json
 import logging
+import multiprocessing
 import os
-import re
+import shutil
 import sys
+import tempfile
+import time
+from multiprocessing.connection import wait
 
 import pytz
 
 from enterprise_reporting.clients.enterprise import EnterpriseAPIClient
+from enterprise_reporting.content_cache import content_metadata_cache_for_run
+from enterprise_reporting.incremental import (
+    INCREMENTAL_DATA_TYPES,
+    get_changed_since,
+    merge_watermarks,
+    read_watermark,
+    write_watermark,
+)
 from enterprise_reporting.reporter import EnterpriseReportSender
-from enterprise_reporting.utils import is_current_time_in_schedule
+from enterprise_reporting.sharding import build_manifest, load_shard, parse_shard, write_manifest
+from enterprise_reporting.state import ReportStateStore
+from enterprise_reporting.telemetry import read_summary, send_to_statsd, write_summary
+from enterprise_reporting.utils import ScheduleIndex, decrypt_reporting_configs, is_current_time_in_schedule
 
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 DATA_TYPES = ['progress', 'progress_v2', 'progress_v3', 'catalog', 'grade', 'course_structure', 'completion', 'engagement']
 
 
-def send_data(config):
+def send_data(config, file_write_directory=None, changed_since=None):
     """
     Send data report to each enterprise.
 
+    Report files are written to a directory private to this job, so that concurrent jobs for the same
+    enterprise never see or delete each other's files. The directory is created and removed here unless
+    `file_write_directory` is given, in which case the caller owns it and the watermark of the sent report is
+    left in it.
+
     Args:
         config
+        file_write_directory (str): Directory to write the report files to.
+        changed_since (dict): Watermark of the previous report, to only send the enrollments changed since then.
     """
     enterprise_customer_name = config['enterprise_customer']['name']
     LOGGER.info(f'Kicking off job to send report for {enterprise_customer_name}')
 
+    job_directory = file_write_directory or make_job_directory()
     error_raised = False
+    reporter = None
     try:
-        reporter = EnterpriseReportSender.create(config)
+        reporter = EnterpriseReportSender.create(
+            config, file_write_directory=job_directory, changed_since=changed_since,
+        )
         reporter.send_enterprise_report()
+        if file_write_directory and reporter.watermark.value:
+            write_watermark(file_write_directory, reporter.watermark.value)
     except Exception:  # pylint: disable=broad-except
         error_raised = True
         LOGGER.exception(f'Data report failed to send for {enterprise_customer_name}')
+    if file_write_directory and reporter:
+        write_summary(file_write_directory, reporter.telemetry)
 
-    cleanup_files(config['enterprise_customer']['uuid'])
+    if not file_write_directory:
+        shutil.rmtree(job_directory, ignore_errors=True)
     LOGGER.info(f'Finished job to send report for {enterprise_customer_name}')
 
     return error_raised
 
+
+def make_job_directory():
+    """
+    Create and return a fresh directory for the files of a single report job.
+    """
+    return tempfile.mkdtemp(prefix='enterprise_report_', dir=EnterpriseReportSender.FILE_WRITE_DIRECTORY)
+
+
+def describe_job(config):
+    """
+    Return a short human readable name for the report job of the given reporting config.
+    """
+    return '{} ({} {})'.format(config['enterprise_customer']['name'], config['data_type'], config['report_type'])
+
+
+def directory_size(directory):
+    """
+    Return the total size in bytes of the report files in the given directory, ignoring hidden bookkeeping files.
+    """
+    return sum(
+        entry.stat().st_size for entry in os.scandir(directory) if entry.is_file() and not entry.name.startswith('.')
+    )
+
+
+def report_size(job_directory, telemetry=None):
+    """
+    Return the size in bytes of the report sent by a job, or None if it is not known.
+
+    The bytes written to the job directory, as counted by the telemetry of the job, are used first. Reports streamed
+    from their source into their delivery leave nothing in the job directory, so their size is the number of bytes
+    transferred.
+    """
+    telemetry = telemetry or {}
+    size = telemetry.get('bytes_written') or telemetry.get('bytes_transferred') or directory_size(job_directory)
+    return size or None
+
+
+def _run_job(config, file_write_directory, changed_since):
+    """
+    Entry point of a report job run in its own process, the exit code tells whether the report was sent.
+    """
+    sys.exit(1 if send_data(config, file_write_directory, changed_since) else 0)
+
+
+def run_reports(reporting_configs, concurrency=1, job_timeout=None, changed_since=None):
+    """
+    Send the reports of the given reporting configs, at most `concurrency` of them at a time.
+
+    With a concurrency of one and no timeout the reports are sent one after the other in this process. Otherwise
+    every report job runs in its own process so that a job running past `job_timeout` seconds can be terminated
+    without holding up the others.
+
+    Arguments:
+        reporting_configs (list): The reporting configs to send the reports of.
+        concurrency (int): Maximum number of reports sent at the same time.
+        job_timeout (int): Seconds after which a report job is terminated.
+        changed_since (dict): Reporting config UUID mapped to the watermark its report should start from.
+
+    Returns:
+        (dict): Lists of job names under `succeeded`, `failed` and `timed_out`. The size in bytes of the files
+            of the report of every successful job under `sizes`, see `report_size`, and the watermark of every successful incremental
+            capable report under `watermarks`, both keyed by reporting config UUID. The telemetry of every job which
+            left any, under `telemetry`.
+    """
+    summary = {'succeeded': [], 'failed': [], 'timed_out': [], 'sizes': {}, 'watermarks': {}, 'telemetry': []}
+    changed_since = changed_since or {}
+    reporting_configs = list(reporting_configs)
+    # Report job processes are forked from this one, and inherit the decrypted passwords.
+    decrypt_reporting_configs(reporting_configs)
+
+    def finish(config, job_directory, status):
+        telemetry = read_summary(job_directory)
+        if telemetry:
+            summary['telemetry'].append({
+                'uuid': config.get('uuid'),
+                'enterprise_customer': config['enterprise_customer']['name'],
+                'data_type': config['data_type'],
+                'report_type': config['report_type'],
+                'status': status,
+                'summary': telemetry,
+            })
+        if status == 'succeeded' and 'uuid' in config:
+            size = report_size(job_directory, telemetry)
+            if size:
+                summary['sizes'][config['uuid']] = size
+            watermark = read_watermark(job_directory)
+            if watermark:
+                summary['watermarks'][config['uuid']] = watermark
+        shutil.rmtree(job_directory, ignore_errors=True)
+        summary[status].append(describe_job(config))
+
+    if concurrency <= 1 and not job_timeout:
+        for config in reporting_configs:
+            job_directory = make_job_directory()
+            error_raised = send_data(config, job_directory, changed_since.get(config.get('uuid')))
+            finish(config, job_directory, 'failed' if error_raised else 'succeeded')
+        return summary
+
+    pending = list(reporting_configs)
+    running = {}
+    while pending or running:
+        while pending and len(running) < concurrency:
+            config = pending.pop(0)
+            job_directory = make_job_directory()
+            process = multiprocessing.Process(
+                target=_run_job, args=(config, job_directory, changed_since.get(config.get('uuid'))),
+            )
+            process.start()
+            running[process] = (config, job_directory, time.monotonic())
+
+        wait([process.sentinel for process in running], timeout=1)
+        for process, (config, job_directory, started) in list(running.items()):
+            if process.is_alive():
+                if not job_timeout or time.monotonic() - started < job_timeout:
+                    continue
+                LOGGER.error(f'Report job for {describe_job(config)} timed out after {job_timeout} seconds')
+                process.terminate()
+                process.join()
+                status = 'timed_out'
+            else:
+                process.join()
+                status = 'succeeded' if process.exitcode == 0 else 'failed'
+            finish(config, job_directory, status)
+            del running[process]
+    return summary
+
+
 def write_enterprise_ids_to_file(eligible_enterprise_customer_uuids):
     """
     Write eligible enterprise customer UUIDs to a file.
@@ -72,16 +231,6 @@ def write_enterprise_ids_to_file(eligible_enterprise_customer_uuids):
         LOGGER.error("WORKSPACE environment variable is not set. Skipping writing eligible enterprise IDs to file.")
         sys.exit(1)
 
-def cleanup_files(enterprise_id):
-    """
-    Clean up any files created by sending the enterprise report.
-    """
-    directory = EnterpriseReportSender.FILE_WRITE_DIRECTORY
-    pattern = fr'{enterprise_id}'
-    for f in os.listdir(directory):
-        if re.search(pattern, f):
-            os.remove(os.path.join(directory, f))
-
 
 def should_deliver_report(args, reporting_config, current_est_time):
     """Given CLI arguments and the reporting configuration, determine if delivery should happen."""
@@ -95,7 +244,7 @@ def should_deliver_report(args, reporting_config, current_est_time):
         reporting_config['day_of_month'],
         reporting_config['day_of_week']
     )
-    LOGGER.info("Report Delivery Logic. Active: [%s], ValidDataType: [%s], MeetSchedule: [%s], EnterpriseInArgs: [%s]",
+    LOGGER.debug("Report Delivery Logic. Active: [%s], ValidDataType: [%s], MeetSchedule: [%s], EnterpriseInArgs: [%s]",
         reporting_config['active'],
         valid_data_type,
         meets_schedule_requirement,
@@ -107,6 +256,26 @@ def should_deliver_report(args, reporting_config, current_est_time):
            (enterprise_customer_specified or meets_schedule_requirement)
 
 
+def get_eligible_reporting_configs(args, reporting_configs, current_est_time):
+    """
+    Return the reporting configs to deliver, in their original order.
+
+    Reports of an enterprise given in the CLI arguments are delivered whatever their schedule, the other ones are
+    looked up in a `ScheduleIndex` of the active configs of the requested data types.
+    """
+    if args.enterprise_customer:
+        return [
+            reporting_config for reporting_config in reporting_configs
+            if should_deliver_report(args, reporting_config, current_est_time)
+        ]
+    data_types = args.data_type or DATA_TYPES
+    schedule_index = ScheduleIndex(
+        reporting_config for reporting_config in reporting_configs
+        if reporting_config['active'] and reporting_config['data_type'] in data_types
+    )
+    return schedule_index.due(current_est_time)
+
+
 def process_reports():
     """
     Process and send reports based on the arguments passed.
@@ -122,13 +291,52 @@ def process_reports():
     parser.add_argument('--run-mode', required=False, type=str, default='worker', choices=['worker', 'master'],
                         help="The mode in which the report is run. 'worker' runs the job only on one worker instance," \
                         " while 'master' prepares the seed data for running the job on multiple workers.")
+    parser.add_argument('--concurrency', required=False, type=int, default=1,
+                        help="The number of reports sent at the same time in worker mode.")
+    parser.add_argument('--job-timeout', required=False, type=int, default=None,
+                        help="The number of seconds after which a single report job is terminated and counted as "
+                             "failed in worker mode.")
+    parser.add_argument('--shards', required=False, type=int, default=None,
+                        help="In master mode, also write a manifest splitting the eligible reports into this many "
+                             "shards of similar total size.")
+    parser.add_argument('--shard', required=False, type=str, default=None,
+                        help="In worker mode, only send the reports of shard 'i/N' of the manifest, with 0 <= i < N, "
+                             "instead of fetching the reporting configs.")
+    parser.add_argument('--manifest', required=False, type=str, default=None,
+                        help="Path of the shard manifest written in master mode and read in worker mode.")
+    parser.add_argument('--state-file', required=False, type=str, default=None,
+                        help="Path of the file keeping the report sizes and watermarks of previous runs.")
+    parser.add_argument('--incremental', required=False, action='store_true',
+                        help="Only send the enrollments changed since the previous delivery in progress_v3 reports.")
+    parser.add_argument('--full-snapshot-days', required=False, type=int, default=7,
+                        help="In incremental mode, send a full report when the last one is this many days old, "
+                             "0 to never force one.")
     args = parser.parse_args()
+    if (args.shards or args.shard) and not args.manifest:
+        parser.error('--manifest is required with --shards and --shard.')
+    if args.incremental and not args.state_file:
+        parser.error('--state-file is required with --incremental.')
+
+    state_store = ReportStateStore(args.state_file) if args.state_file else None
+
+    if args.run_mode == 'worker' and args.shard:
+        try:
+            shard_index, shard_count = parse_shard(args.shard)
+            eligible_reporting_configs = load_shard(args.manifest, shard_index, shard_count)
+        except (OSError, ValueError) as error:
+            LOGGER.error(f'Could not load shard {args.shard} from {args.manifest}: {error}')
+            sys.exit(1)
+        send_reports(eligible_reporting_configs, args, state_store)
+        return
 
     enterprise_api_client = EnterpriseAPIClient()
     if args.enterprise_customer:
         reporting_configs = enterprise_api_client.get_enterprise_reporting_configs(args.enterprise_customer)
     else:
-        reporting_configs = enterprise_api_client.get_all_enterprise_reporting_configs()
+        reporting_configs = enterprise_api_client.get_all_enterprise_reporting_configs(
+            active=True,
+            data_type=args.data_type,
+        )
 
     if args.enterprise_customer and not (reporting_configs and reporting_configs['results']):
         LOGGER.error(f'The enterprise {args.enterprise_customer} does not have a reporting configuration.')
@@ -140,33 +348,64 @@ def process_reports():
     est_timezone = pytz.timezone('US/Eastern')
     current_est_time = datetime.datetime.now(est_timezone)
 
-    error_raised = False
-    eligible_enterprise_customer_uuids = set()
-    for reporting_config in reporting_configs['results']:
-        LOGGER.info('Checking if {}\'s reporting config for {} data in {} format is ready for processing'.format(
-            reporting_config['enterprise_customer']['name'],
-            reporting_config['data_type'],
-            reporting_config['report_type'],
-        ))
-
-        if should_deliver_report(args, reporting_config, current_est_time):
-            if args.run_mode == 'worker':
-                if send_data(reporting_config):
-                    error_raised = True
-            else:
-                eligible_enterprise_customer_uuids.add(reporting_config['enterprise_customer']['uuid'])
-        else:
-            LOGGER.info('Not ready -- skipping this report.')
+    eligible_reporting_configs = get_eligible_reporting_configs(args, reporting_configs['results'], current_est_time)
+    eligible_enterprise_customer_uuids = {
+        reporting_config['enterprise_customer']['uuid'] for reporting_config in eligible_reporting_configs
+    }
+    LOGGER.info(f'{len(eligible_reporting_configs)} of {len(reporting_configs["results"])} reporting configs are '
+                f'ready for processing')
     if args.run_mode == 'master':
         write_enterprise_ids_to_file(eligible_enterprise_customer_uuids)
+        if args.shards:
+            write_manifest(build_manifest(eligible_reporting_configs, args.shards, state_store), args.manifest)
+        return
 
-    if error_raised:
+    send_reports(eligible_reporting_configs, args, state_store)
+
+
+def send_reports(reporting_configs, args, state_store=None):
+    """
+    Send the given reports as configured by the CLI arguments and exit with an error status if any was not sent.
+    """
+    now = datetime.datetime.now(pytz.utc)
+    changed_since = {}
+    if args.incremental:
+        for config in reporting_configs:
+            if config['data_type'] in INCREMENTAL_DATA_TYPES:
+                changed_since[config['uuid']] = get_changed_since(
+                    state_store.get(config['uuid']), args.full_snapshot_days, now,
+                )
+
+    with content_metadata_cache_for_run(EnterpriseReportSender.FILE_WRITE_DIRECTORY):
+        summary = run_reports(reporting_configs, args.concurrency, args.job_timeout, changed_since)
+    if state_store:
+        state_store.record_sizes(summary['sizes'])
+    if args.incremental:
+        state_store.update({
+            config_id: {
+                'watermark': merge_watermarks(state_store.get(config_id).get('watermark'), watermark),
+                **({} if changed_since.get(config_id) else {'last_full_snapshot': now.isoformat()}),
+            }
+            for config_id, watermark in summary['watermarks'].items()
+        })
+    LOGGER.info('Report jobs finished: {} succeeded, {} failed, {} timed out'.format(
+        len(summary['succeeded']),
+        len(summary['failed']),
+        len(summary['timed_out']),
+    ))
+    for job in summary['failed'] + summary['timed_out']:
+        LOGGER.error(f'Report not sent: {job}')
+    LOGGER.info('Report telemetry: {}'.format(json.dumps(summary['telemetry'], sort_keys=True)))
+    send_to_statsd(summary['telemetry'])
+
+    if summary['failed'] or summary['timed_out']:
         LOGGER.error(
             'One or more reports in this job were not successfully sent to customers. '
             'Please check these jenkins logs for more information.'
         )
         sys.exit(1)
 
+
 if __name__ == "__main__":
     process_reports()
     sys.exit(0)
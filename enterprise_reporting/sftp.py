@@ -0,0 +1,209 @@
+"""
+SFTP transport layer shared by the report deliveries of a run.
+
+Authenticated SSH transports are pooled per host, so that the reports sent one after the other by a process reuse
+the same connection. The files of a report are uploaded in parallel, each over its own SFTP channel of the shared
+transport, and an upload interrupted by a failure resumes from the bytes it wrote to the remote file.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import paramiko
+
+from enterprise_reporting import telemetry
+
+LOGGER = logging.getLogger(__name__)
+
+# Flow control window and maximum packet size of the SSH channels, larger than the paramiko defaults of 2MB and
+# 32KB so that the pipelined writes of an upload are not throttled waiting for window adjustments.
+SFTP_WINDOW_SIZE = int(os.environ.get('SFTP_WINDOW_SIZE', 64 * 1024 * 1024))
+SFTP_MAX_PACKET_SIZE = int(os.environ.get('SFTP_MAX_PACKET_SIZE', 256 * 1024))
+
+# Maximum number of files of a report uploaded at the same time.
+SFTP_UPLOAD_CONCURRENCY = int(os.environ.get('SFTP_UPLOAD_CONCURRENCY', 4))
+
+# Size of the chunks files are uploaded in, the largest SFTP write request paramiko sends.
+UPLOAD_CHUNK_SIZE = 32 * 1024
+
+
+class SFTPConnectionPool:
+    """
+    Authenticated SSH transports, reused by all the deliveries of the process to the same account.
+    """
+
+    def __init__(self):
+        """Initialize without any connection."""
+        self._transports = {}
+        self._lock = threading.Lock()
+
+    def get(self, hostname, port, username, password):
+        """
+        Return an active transport authenticated to the given account, connecting if there is none yet.
+        """
+        key = (hostname, port, username, password)
+        with self._lock:
+            transport = self._transports.get(key)
+            if transport is None or not transport.is_active():
+                if transport is not None:
+                    transport.close()
+                LOGGER.info(f'Connecting via SFTP to remote host {hostname}')
+                transport = paramiko.Transport(
+                    (hostname, port),
+                    default_window_size=SFTP_WINDOW_SIZE,
+                    default_max_packet_size=SFTP_MAX_PACKET_SIZE,
+                )
+                try:
+                    transport.connect(username=username, password=password)
+                except Exception:
+                    transport.close()
+                    raise
+                self._transports[key] = transport
+            return transport
+
+    def close_all(self):
+        """
+        Close every pooled transport.
+        """
+        with self._lock:
+            transports = list(self._transports.values())
+            self._transports.clear()
+        for transport in transports:
+            transport.close()
+
+
+CONNECTION_POOL = SFTPConnectionPool()
+atexit.register(CONNECTION_POOL.close_all)
+
+
+class UploadProgress:
+    """
+    Number of bytes the attempts of an upload wrote to the remote file, None until one of them opened it.
+    """
+
+    def __init__(self):
+        """Initialize before any attempt."""
+        self.written = None
+
+
+def upload_file(sftp, local_path, remote_path, progress=None):
+    """
+    Upload a local file, continuing from where a previous attempt of the same upload stopped, if any.
+
+    Only the bytes written by the previous attempts, as recorded in `progress`, are kept. A remote file left by an
+    earlier delivery, or by an attempt which failed before opening it, is overwritten from scratch.
+
+    Arguments:
+        sftp (paramiko.SFTPClient): SFTP session to upload over.
+        local_path (str): Path of the file to upload.
+        remote_path (str): Path of the remote file.
+        progress (UploadProgress): Progress of the attempts of this upload, updated as bytes are written.
+
+    Returns:
+        (int): Number of bytes sent.
+    """
+    progress = progress or UploadProgress()
+    local_size = os.path.getsize(local_path)
+    offset = 0
+    if progress.written:
+        try:
+            # Pipelined writes in flight when the previous attempt failed may not have reached the remote file.
+            offset = min(sftp.stat(remote_path).st_size, progress.written, local_size)
+        except OSError:
+            offset = 0
+
+    with open(local_path, 'rb') as local_file, sftp.open(remote_path, 'r+b' if offset else 'wb') as remote_file:
+        progress.written = offset
+        if offset:
+            LOGGER.info(f'Resuming the upload of {remote_path} from byte {offset}')
+            local_file.seek(offset)
+            remote_file.seek(offset)
+        remote_file.set_pipelined(True)
+        for chunk in iter(lambda: local_file.read(UPLOAD_CHUNK_SIZE), b''):
+            remote_file.write(chunk)
+            progress.written += len(chunk)
+
+    remote_size = sftp.stat(remote_path).st_size
+    if remote_size != local_size:
+        raise OSError(f'Size mismatch in upload of {remote_path}: {remote_size} != {local_size}')
+    return local_size - offset
+
+
+class SFTPUploader:
+    """
+    Upload files to an SFTP account through the shared connection pool.
+    """
+
+    def __init__(self, hostname, port, username, password, pool=None, max_retries=3, delay=2, backoff=2):
+        """
+        Initialize with the SFTP account, and the exponential backoff of retried uploads.
+        """
+        self.account = (hostname, port, username, password)
+        self.pool = pool or CONNECTION_POOL
+        self.max_retries = max_retries
+        self.delay = delay
+        self.backoff = backoff
+
+    def _open_sftp(self):
+        """Return a new SFTP session over the pooled transport."""
+        return paramiko.SFTPClient.from_transport(
+            self.pool.get(*self.account),
+            window_size=SFTP_WINDOW_SIZE,
+            max_packet_size=SFTP_MAX_PACKET_SIZE,
+        )
+
+    def upload(self, local_path, remote_path):
+        """
+        Upload a file, retrying with exponential backoff from where a failed attempt stopped.
+
+        The pool reconnects on the next attempt if the failure closed the transport.
+        """
+        progress = UploadProgress()
+        for attempt in range(self.max_retries + 1):
+            try:
+                sftp = self._open_sftp()
+                try:
+                    sent = upload_file(sftp, local_path, remote_path, progress)
+                    telemetry.count('bytes_transferred', sent)
+                    return sent
+                finally:
+                    sftp.close()
+            except Exception as error:  # pylint: disable=broad-except
+                if attempt == self.max_retries:
+                    raise
+                LOGGER.info('SFTP upload of %s failed, retrying: %s', remote_path, error)
+                time.sleep(self.delay * self.backoff ** attempt)
+        return None
+
+    def upload_all(self, local_paths, remote_directory):
+        """
+        Upload the given files to `remote_directory` in parallel, keeping their base names.
+        """
+        if not local_paths:
+            return
+        workers = max(1, min(SFTP_UPLOAD_CONCURRENCY, len(local_paths)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.upload, path, os.path.join(remote_directory, os.path.basename(path)))
+                for path in local_paths
+            ]
+        for future in futures:
+            future.result()
+
+    @contextmanager
+    def open(self, remote_path):
+        """
+        Yield the remote file at `remote_path` opened for pipelined writing.
+        """
+        sftp = self._open_sftp()
+        try:
+            with sftp.open(remote_path, 'wb') as remote_file:
+                remote_file.set_pipelined(True)
+                yield remote_file
+        finally:
+            sftp.close()
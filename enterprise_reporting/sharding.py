@@ -0,0 +1,100 @@
+"""
+Split the eligible reporting configs of a run into shards of similar total report size.
+"""
+
+import heapq
+import json
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# Size assumed for reporting configs without any report history, in bytes.
+DEFAULT_REPORT_SIZE = 1024 * 1024
+
+
+def parse_shard(value):
+    """
+    Parse a `i/N` shard specification, where `0 <= i < N`, into an `(index, count)` tuple.
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError as error:
+        raise ValueError(f'Invalid shard {value!r}, expected i/N') from error
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f'Invalid shard {value!r}, expected 0 <= i < N')
+    return index, count
+
+
+def balance(sizes, shard_count):
+    """
+    Assign items to `shard_count` shards so that the largest shard total is as small as possible.
+
+    Uses the longest-processing-time-first heuristic: the largest remaining item always goes to the shard with the
+    smallest total so far.
+
+    Arguments:
+        sizes (dict): Item mapped to its estimated size.
+        shard_count (int): Number of shards.
+
+    Returns:
+        (list<list>): The items of every shard.
+    """
+    shards = [[] for _ in range(shard_count)]
+    totals = [(0, index) for index in range(shard_count)]
+    for item in sorted(sizes, key=lambda item: (-sizes[item], item)):
+        total, index = heapq.heappop(totals)
+        shards[index].append(item)
+        heapq.heappush(totals, (total + sizes[item], index))
+    return shards
+
+
+def build_manifest(reporting_configs, shard_count, state_store=None):
+    """
+    Build the manifest distributing the given reporting configs across `shard_count` shards.
+
+    The configs are embedded in the manifest, so that workers do not need to fetch them again, and weighted by
+    the historical size of their reports kept in `state_store`.
+    """
+    configs = {config['uuid']: config for config in reporting_configs}
+    sizes = {
+        config_id: state_store.estimated_size(config_id, DEFAULT_REPORT_SIZE) if state_store else DEFAULT_REPORT_SIZE
+        for config_id in configs
+    }
+    return {
+        'version': MANIFEST_VERSION,
+        'shard_count': shard_count,
+        'shards': [
+            [{'id': config_id, 'estimated_size': sizes[config_id], 'config': configs[config_id]} for config_id in shard]
+            for shard in balance(sizes, shard_count)
+        ],
+    }
+
+
+def write_manifest(manifest, path):
+    """
+    Write the given manifest to `path`.
+    """
+    with open(path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+    for index, shard in enumerate(manifest['shards']):
+        LOGGER.info('Shard {}/{}: {} reports, estimated {} bytes'.format(
+            index,
+            manifest['shard_count'],
+            len(shard),
+            int(sum(entry['estimated_size'] for entry in shard)),
+        ))
+
+
+def load_shard(path, index, count):
+    """
+    Return the reporting configs assigned to shard `index` of the manifest stored at `path`.
+    """
+    with open(path) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f'Unsupported manifest version {manifest.get("version")}')
+    if manifest['shard_count'] != count:
+        raise ValueError(f'The manifest has {manifest["shard_count"]} shards, not {count}')
+    return [entry['config'] for entry in manifest['shards'][index]]
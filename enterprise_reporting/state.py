@@ -0,0 +1,96 @@
+"""
+Persistent state shared between runs of the enterprise reporting jobs.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+
+LOGGER = logging.getLogger(__name__)
+
+SIZE_HISTORY_LENGTH = 5
+
+
+class ReportStateStore:
+    """
+    JSON file holding what previous runs learned about every reporting config, keyed by the config's UUID.
+
+    Workers on different hosts may share the same file, so every update takes an exclusive lock, reloads the file
+    and atomically replaces it.
+    """
+
+    def __init__(self, path):
+        """Initialize with the path of the state file, which does not need to exist yet."""
+        self.path = path
+        self.state = self._read()
+
+    def _read(self):
+        """Return the content of the state file, or an empty state if there is none or it is unreadable."""
+        try:
+            with open(self.path) as state_file:
+                return json.load(state_file)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            LOGGER.warning(f'Ignoring the unreadable report state file {self.path}')
+            return {}
+
+    @contextmanager
+    def _modifying(self):
+        """
+        Reload the state under an exclusive lock for the duration of the block, then persist it.
+        """
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.state = self._read()
+                yield self.state
+                self._write()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self):
+        """Atomically replace the state file with the current state."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as state_file:
+            json.dump(self.state, state_file, indent=4, sort_keys=True)
+        os.replace(state_file.name, self.path)
+
+    def get(self, config_id):
+        """Return the stored state of the given reporting config."""
+        return self.state.get(config_id, {})
+
+    def update(self, updates):
+        """
+        Merge the given per-config values into the stored state and persist it.
+
+        Arguments:
+            updates (dict): Reporting config UUID mapped to a dict of values, `None` values are removed.
+        """
+        with self._modifying() as state:
+            for config_id, values in updates.items():
+                config_state = state.setdefault(config_id, {})
+                for key, value in values.items():
+                    if value is None:
+                        config_state.pop(key, None)
+                    else:
+                        config_state[key] = value
+
+    def record_sizes(self, sizes):
+        """
+        Append the given report sizes, in bytes, to the size history of their reporting configs.
+        """
+        with self._modifying() as state:
+            for config_id, size in sizes.items():
+                config_state = state.setdefault(config_id, {})
+                config_state['sizes'] = (config_state.get('sizes', []) + [size])[-SIZE_HISTORY_LENGTH:]
+
+    def estimated_size(self, config_id, default=None):
+        """
+        Return the average size of the recent reports of the given reporting config, or `default` if unknown.
+        """
+        history = self.get(config_id).get('sizes')
+        return sum(history) / len(history) if history else default
@@ -0,0 +1,270 @@
+"""
+Streaming compression and OpenPGP encryption of report files.
+
+Reports are deflated into a zip archive and, when the enterprise has a PGP key, encrypted on the fly into any
+writable file object, reading and writing a bounded amount of data at a time. Memory use is only bounded when that
+file object is, such as an SFTP upload; email attachments are held in memory whole.
+
+The encrypted session key packet is built by pgpy, pinned to 0.6.0 in the requirements, through its public API.
+"""
+
+import hashlib
+import os
+import shutil
+import time
+import warnings
+import zipfile
+from contextlib import closing
+
+import pgpy
+from cryptography.hazmat.decrepit.ciphers.modes import CFB
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms
+from pgpy.constants import SymmetricKeyAlgorithm
+
+COMPRESSION_LEVEL = 4
+
+# Size of the chunks report files are read in, in bytes.
+READ_CHUNK_SIZE = 64 * 1024
+
+# OpenPGP packet tags.
+PUBLIC_KEY_ENCRYPTED_SESSION_KEY_PACKET = 1
+LITERAL_DATA_PACKET = 11
+SYMMETRICALLY_ENCRYPTED_INTEGRITY_PROTECTED_DATA_PACKET = 18
+MODIFICATION_DETECTION_CODE_HEADER = b'\xd3\x14'
+
+# Size of every partial body chunk of the streamed OpenPGP packets, as a power of two.
+PARTIAL_BODY_LENGTH_EXPONENT = 16
+
+
+class _PartialBodyWriter:
+    """
+    Write an OpenPGP packet of unknown length, as a sequence of partial body chunks.
+    """
+
+    def __init__(self, write, tag):
+        """Initialize with the callable receiving the packet bytes and the tag of the packet."""
+        self._write = write
+        self._buffer = bytearray()
+        self._chunk_size = 1 << PARTIAL_BODY_LENGTH_EXPONENT
+        self._write(bytes([0xC0 | tag]))
+
+    def write(self, data):
+        """Append data to the packet body."""
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            self._write(bytes([224 + PARTIAL_BODY_LENGTH_EXPONENT]) + bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+
+    def close(self):
+        """Write the remaining data as the last chunk, which has a regular body length."""
+        length = len(self._buffer)
+        if length < 192:
+            header = bytes([length])
+        elif length < 8384:
+            header = bytes([((length - 192) >> 8) + 192, (length - 192) & 0xFF])
+        else:
+            header = b'\xff' + length.to_bytes(4, 'big')
+        self._write(header + bytes(self._buffer))
+        self._buffer = bytearray()
+
+
+def _iter_packets(data):
+    """
+    Yield the tag and the bytes, header included, of every OpenPGP packet of a serialized message.
+
+    Both the old and the new packet header formats of RFC 4880 are read, but not partial body lengths.
+    """
+    position = 0
+    while position < len(data):
+        start = position
+        header = data[position]
+        if not header & 0x80:
+            raise ValueError('Invalid OpenPGP packet header')
+        if header & 0x40:
+            tag = header & 0x3F
+            first_octet = data[position + 1]
+            if first_octet < 192:
+                length, position = first_octet, position + 2
+            elif first_octet < 224:
+                length, position = ((first_octet - 192) << 8) + data[position + 2] + 192, position + 3
+            elif first_octet == 255:
+                length, position = int.from_bytes(data[position + 2:position + 6], 'big'), position + 6
+            else:
+                raise ValueError('Partial OpenPGP packet body lengths are not supported')
+        else:
+            tag = (header >> 2) & 0x0F
+            length_size = {0: 1, 1: 2, 2: 4}.get(header & 0x03)
+            if length_size is None:
+                raise ValueError('Indeterminate OpenPGP packet lengths are not supported')
+            length = int.from_bytes(data[position + 1:position + 1 + length_size], 'big')
+            position += 1 + length_size
+        position += length
+        yield tag, data[start:position]
+
+
+class PGPEncryptingWriter:
+    """
+    Writable file object encrypting the data written to it into an OpenPGP message for the given public key.
+
+    The message is made of the public key encrypted session key packet built by pgpy, followed by a streamed
+    symmetrically encrypted and integrity protected data packet, holding a binary literal data packet, as described
+    in RFC 4880. It can be decrypted by gpg and pgpy like the messages `pgpy.PGPKey.encrypt` creates.
+    """
+
+    def __init__(self, fileobj, pgp_key, filename):
+        """
+        Write the encrypted session key to `fileobj`, and get ready to encrypt the content of `filename`.
+
+        Arguments:
+            fileobj: Binary file object receiving the message.
+            pgp_key (str): ASCII armored public key of the recipient.
+            filename (str): Name of the encrypted file, stored in the message.
+        """
+        self._fileobj = fileobj
+        session_key = os.urandom(32)
+        self._write_session_key(pgp_key, session_key)
+
+        block_size = algorithms.AES.block_size // 8
+        self._encryptor = Cipher(algorithms.AES(session_key), CFB(bytes(block_size))).encryptor()
+        self._digest = hashlib.sha1()
+        self._packet = _PartialBodyWriter(fileobj.write, SYMMETRICALLY_ENCRYPTED_INTEGRITY_PROTECTED_DATA_PACKET)
+        self._packet.write(b'\x01')
+        prefix = os.urandom(block_size)
+        self._encrypt(prefix + prefix[-2:])
+
+        self._literal = _PartialBodyWriter(self._encrypt, LITERAL_DATA_PACKET)
+        name = os.path.basename(filename).encode('utf-8')[:255]
+        self._literal.write(b'b' + bytes([len(name)]) + name + int(time.time()).to_bytes(4, 'big'))
+
+    def _write_session_key(self, pgp_key, session_key):
+        """
+        Write the packet holding the session key, encrypted with the public key by pgpy.
+
+        pgpy has no public API building the packet alone, so an empty message is encrypted with the session key, and
+        its public key encrypted session key packets are taken from its serialized form.
+        """
+        public_key, _ = pgpy.PGPKey.from_blob(pgp_key)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            message = public_key.encrypt(
+                pgpy.PGPMessage.new(b'', file=True),
+                cipher=SymmetricKeyAlgorithm.AES256,
+                sessionkey=session_key,
+            )
+        session_key_packets = [
+            packet for tag, packet in _iter_packets(bytes(message)) if tag == PUBLIC_KEY_ENCRYPTED_SESSION_KEY_PACKET
+        ]
+        if not session_key_packets:
+            raise ValueError('pgpy did not create any public key encrypted session key packet')
+        for session_key_packet in session_key_packets:
+            self._fileobj.write(session_key_packet)
+
+    def _encrypt(self, data):
+        """Encrypt plaintext of the integrity protected packet."""
+        self._digest.update(data)
+        self._packet.write(self._encryptor.update(data))
+
+    def write(self, data):
+        """Encrypt the given file content."""
+        self._literal.write(data)
+        return len(data)
+
+    def flush(self):
+        """Flush the underlying file object."""
+        self._fileobj.flush()
+
+    def close(self):
+        """Terminate the message, leaving the underlying file object open."""
+        if self._literal is None:
+            return
+        self._literal.close()
+        self._literal = None
+        self._digest.update(MODIFICATION_DETECTION_CODE_HEADER)
+        self._packet.write(
+            self._encryptor.update(MODIFICATION_DETECTION_CODE_HEADER + self._digest.digest()) +
+            self._encryptor.finalize()
+        )
+        self._packet.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _SequentialWriter:
+    """
+    Hide everything but `write` and `flush` of a file object, so that zip archives are written front to back.
+    """
+
+    def __init__(self, fileobj):
+        """Initialize with the wrapped file object."""
+        self._fileobj = fileobj
+
+    def write(self, data):
+        """Write to the wrapped file object."""
+        return self._fileobj.write(data)
+
+    def flush(self):
+        """Flush the wrapped file object."""
+        self._fileobj.flush()
+
+
+class StreamedReportFile:
+    """
+    Report file read from a stream, such as a download, instead of from the disk.
+
+    It stands in for the file objects of the reports written to disk: `name` is the path the report would have.
+    """
+
+    def __init__(self, name, open_stream):
+        """Initialize with the path of the report and a callable returning a new binary stream of its content."""
+        self.name = name
+        self._open_stream = open_stream
+
+    def open(self):
+        """Return a new binary stream of the content of the report, to close once read."""
+        return self._open_stream()
+
+
+def write_zip(files, fileobj):
+    """
+    Deflate the given files into a zip archive written sequentially to `fileobj`, storing their base names.
+    """
+    with zipfile.ZipFile(
+        _SequentialWriter(fileobj), 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESSION_LEVEL
+    ) as archive:
+        for file in files:
+            arcname = os.path.basename(file.name)
+            if isinstance(file, StreamedReportFile):
+                with closing(file.open()) as source, archive.open(arcname, 'w', force_zip64=True) as target:
+                    shutil.copyfileobj(source, target, READ_CHUNK_SIZE)
+            else:
+                archive.write(file.name, arcname)
+
+
+def copy_encrypted(source, fileobj, pgp_key):
+    """
+    Encrypt the file at path `source` with the given PGP public key into `fileobj`.
+    """
+    with open(source, 'rb') as source_file, PGPEncryptingWriter(fileobj, pgp_key, source) as encrypted:
+        for chunk in iter(lambda: source_file.read(READ_CHUNK_SIZE), b''):
+            encrypted.write(chunk)
+
+
+def write_compressed(files, fileobj, pgp_key=None, name=None):
+    """
+    Stream the given files, zipped and encrypted with `pgp_key` if any, into `fileobj`.
+
+    Arguments:
+        files (list): File objects of the reports, or `StreamedReportFile`s.
+        fileobj: Binary file object receiving the archive.
+        pgp_key (str): ASCII armored public key to encrypt the archive with.
+        name (str): Name of the zip archive, stored in the encrypted message.
+    """
+    if not pgp_key:
+        write_zip(files, fileobj)
+        return
+    with PGPEncryptingWriter(fileobj, pgp_key, name or 'report.zip') as encrypted:
+        write_zip(files, encrypted)
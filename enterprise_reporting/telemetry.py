@@ -0,0 +1,195 @@
+"""
+Timing, size and throughput telemetry of the report jobs.
+
+A `ReportTelemetry` is made current for the duration of a report job with `recording`, and the code generating and
+delivering the report adds to it through the functions of this module, which do nothing outside of a report job.
+Every job leaves its summary in its directory, like its watermark, for `run_reports` to gather. The summaries of a
+run are logged as JSON at its end, and sent to statsd when the `statsd` package is installed and `STATSD_HOST` set.
+
+Stages nest: `fetch` is the time spent waiting on the data sources within `generate`, and `compression`,
+`encryption` and `transfer` are part of `delivery`. Reports streamed into their delivery are compressed, encrypted
+and transferred at once, within `delivery`.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import statsd
+except ImportError:  # pragma: no cover
+    statsd = None
+
+LOGGER = logging.getLogger(__name__)
+
+TELEMETRY_FILE_NAME = '.telemetry.json'
+
+STATSD_PORT = int(os.environ.get('STATSD_PORT', 8125))
+STATSD_PREFIX = os.environ.get('STATSD_PREFIX', 'enterprise_reporting')
+
+
+class ReportTelemetry:
+    """
+    Durations of the stages of a report job, in seconds, and its counters: rows, bytes written and bytes transferred.
+    """
+
+    def __init__(self):
+        """Initialize without any stage or counter."""
+        self.durations = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_duration(self, stage_name, seconds):
+        """Add the given seconds to a stage, which may run several times, or in several threads at once."""
+        with self._lock:
+            self.durations[stage_name] = self.durations.get(stage_name, 0) + seconds
+
+    def add(self, counter, value):
+        """Add the given value to a counter."""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def summary(self):
+        """
+        Return the durations and counters as a JSON serializable dict, with the delivery throughput in bytes/second.
+        """
+        with self._lock:
+            summary = {
+                'durations': {stage_name: round(seconds, 3) for stage_name, seconds in self.durations.items()},
+                **self.counters,
+            }
+            delivery_seconds = self.durations.get('delivery')
+        if delivery_seconds and 'bytes_transferred' in summary:
+            summary['throughput'] = round(summary['bytes_transferred'] / delivery_seconds)
+        return summary
+
+
+_current = None
+
+
+@contextmanager
+def recording(telemetry):
+    """
+    Make the given telemetry the one the stages and counters of this process are added to, within the block.
+    """
+    global _current  # pylint: disable=global-statement
+    previous = _current
+    _current = telemetry
+    try:
+        yield telemetry
+    finally:
+        _current = previous
+
+
+@contextmanager
+def stage(stage_name):
+    """
+    Add the duration of the block to the given stage of the current report job.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        telemetry = _current
+        if telemetry is not None:
+            telemetry.add_duration(stage_name, time.perf_counter() - start)
+
+
+def count(counter, value):
+    """
+    Add the given value to a counter of the current report job.
+    """
+    telemetry = _current
+    if telemetry is not None:
+        telemetry.add(counter, value)
+
+
+def count_file_sizes(counter, paths):
+    """
+    Add the total size of the given files which exist to a counter of the current report job.
+    """
+    count(counter, sum(os.path.getsize(path) for path in paths if os.path.isfile(path)))
+
+
+def fetched(records, batched=False):
+    """
+    Yield the given records, adding the time spent waiting on them to the `fetch` stage and counting them as rows.
+
+    Arguments:
+        records (iterable): The records, or batches of rows if `batched`.
+        batched (bool): Whether every item is a batch of rows, rather than a single row.
+    """
+    records = iter(records)
+    while True:
+        with stage('fetch'):
+            record = next(records, StopIteration)
+        if record is StopIteration:
+            return
+        count('rows', len(record) if batched else 1)
+        yield record
+
+
+class CountingWriter:
+    """
+    Wrap a writable binary file object, counting the bytes written to it as transferred.
+    """
+
+    def __init__(self, fileobj):
+        """Initialize with the wrapped file object."""
+        self._fileobj = fileobj
+
+    def write(self, data):
+        """Write to the wrapped file object."""
+        count('bytes_transferred', len(data))
+        return self._fileobj.write(data)
+
+    def flush(self):
+        """Flush the wrapped file object."""
+        self._fileobj.flush()
+
+
+def write_summary(directory, telemetry):
+    """
+    Leave the telemetry summary of a report job in its directory, for the process running the job to pick up.
+    """
+    with open(os.path.join(directory, TELEMETRY_FILE_NAME), 'w') as telemetry_file:
+        json.dump(telemetry.summary(), telemetry_file)
+
+
+def read_summary(directory):
+    """
+    Return the telemetry summary left in the given report job directory, if any.
+    """
+    try:
+        with open(os.path.join(directory, TELEMETRY_FILE_NAME)) as telemetry_file:
+            return json.load(telemetry_file)
+    except (OSError, ValueError):
+        return None
+
+
+def send_to_statsd(reports):
+    """
+    Send the telemetry summaries of the given reports to statsd, if it is installed and `STATSD_HOST` is set.
+
+    Arguments:
+        reports (list): Dicts with the `data_type` of every report and its telemetry `summary`.
+
+    Returns:
+        (bool): Whether the metrics were sent.
+    """
+    host = os.environ.get('STATSD_HOST')
+    if statsd is None or not host:
+        return False
+    client = statsd.StatsClient(host, STATSD_PORT, prefix=STATSD_PREFIX)
+    with client.pipeline() as pipeline:
+        for report in reports:
+            prefix = 'report.{}'.format(report['data_type'])
+            for stage_name, seconds in report['summary'].get('durations', {}).items():
+                pipeline.timing(f'{prefix}.{stage_name}', seconds * 1000)
+            for counter in ('rows', 'bytes_written', 'bytes_transferred'):
+                if counter in report['summary']:
+                    pipeline.incr(f'{prefix}.{counter}', report['summary'][counter])
+    return True
@@ -1,16 +1,22 @@
 """
 Tests for clients in enterprise_reporting.
 """
+import io
 from datetime import datetime, timedelta
 from unittest.mock import MagicMock, Mock, patch
 from urllib.parse import urljoin
 
+import boto3
 import responses
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
 
 from django.conf import settings
 from django.test import TestCase, override_settings
 
+from enterprise_reporting.clients import ClientRegistry, s3
 from enterprise_reporting.clients.enterprise import EnterpriseAPIClient, EnterpriseCatalogAPIClient
+from enterprise_reporting.content_cache import content_metadata_cache_for_run
 
 
 class TestEnterpriseAPIClient(TestCase):
@@ -49,6 +55,25 @@ class TestEnterpriseAPIClient(TestCase):
         results = self.client.get_all_enterprise_reporting_configs()
         assert results['results'] == self.api_response['results']
 
+    @responses.activate
+    @patch('enterprise_reporting.clients.get_oauth_access_token')
+    def test_get_all_enterprise_reporting_configs_filtered(self, mock_get_oauth_access_token):
+        """
+        Verify that the configs are filtered by the endpoint on whether they are active and on their data type.
+        """
+        mock_get_oauth_access_token.return_value = ['test_access_token', datetime.now() + timedelta(minutes=60)]
+        url = urljoin(self.client.API_BASE_URL + '/', self.client.ENTERPRISE_REPORTING_ENDPOINT)
+        responses.add(
+            responses.GET,
+            url,
+            json=self.mocked_get_endpoint(),
+            status=200,
+            content_type='application/json',
+            match=[responses.matchers.query_param_matcher({'active': 'true', 'data_type': 'catalog'})],
+        )
+        results = self.client.get_all_enterprise_reporting_configs(active=True, data_type='catalog')
+        assert results['results'] == self.api_response['results']
+
     @responses.activate
     @patch('enterprise_reporting.clients.get_oauth_access_token')
     def test_get_enterprise_reporting_configs(self, mock_get_oauth_access_token):
@@ -64,6 +89,70 @@ class TestEnterpriseAPIClient(TestCase):
         results = self.client.get_enterprise_reporting_configs(self.enterprise_customer_uuid)
         assert results['results'] == self.api_response['results']
 
+    @responses.activate
+    @patch('enterprise_reporting.clients.get_oauth_access_token')
+    def test_iter_pages(self, mock_get_oauth_access_token):
+        """
+        Verify that pages are only requested as the results are consumed.
+        """
+        mock_get_oauth_access_token.return_value = ['test_access_token', datetime.now() + timedelta(minutes=60)]
+        url = urljoin(self.client.API_BASE_URL + '/', self.client.ENTERPRISE_REPORTING_ENDPOINT)
+        responses.add(
+            responses.GET,
+            url,
+            json={'next': f'{url}?page=2&page_size=1', 'results': [{'id': 1}]},
+            match=[responses.matchers.query_param_matcher({'page_size': '1'})],
+        )
+        responses.add(
+            responses.GET,
+            url,
+            json={'next': None, 'results': [{'id': 2}]},
+            match=[responses.matchers.query_param_matcher({'page': '2', 'page_size': '1'})],
+        )
+
+        results = self.client.iter_results(self.client.ENTERPRISE_REPORTING_ENDPOINT, querystring={'page_size': 1})
+        assert next(results) == {'id': 1}
+        assert len(responses.calls) == 1
+        assert list(results) == [{'id': 2}]
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    @patch('time.sleep')
+    @patch('enterprise_reporting.clients.get_oauth_access_token')
+    def test_traverse_pagination_concurrently(self, mock_get_oauth_access_token, mock_sleep):
+        """
+        Verify that the pages following the first one are fetched concurrently, retried on their own, and
+        returned in order.
+        """
+        mock_get_oauth_access_token.return_value = ['test_access_token', datetime.now() + timedelta(minutes=60)]
+        url = urljoin(self.client.API_BASE_URL + '/', self.client.ENTERPRISE_REPORTING_ENDPOINT)
+        page_count = 5
+
+        def page_params(page):
+            return [responses.matchers.query_param_matcher({'page': str(page)} if page > 1 else {})]
+
+        for page in range(1, page_count + 1):
+            if page == 3:
+                responses.add(responses.GET, url, status=503, match=page_params(page))
+            responses.add(
+                responses.GET,
+                url,
+                json={
+                    'count': page_count * 2,
+                    'num_pages': page_count,
+                    'next': f'{url}?page={page + 1}' if page < page_count else None,
+                    'results': [{'id': page * 2 - 1}, {'id': page * 2}],
+                },
+                match=page_params(page),
+            )
+
+        results = self.client.get_all_enterprise_reporting_configs()
+
+        assert results['results'] == [{'id': index} for index in range(1, page_count * 2 + 1)]
+        assert results['count'] == page_count * 2
+        assert len(responses.calls) == page_count + 1
+        mock_sleep.assert_called_once()
+
 
 class TestEnterpriseCatalogAPIClient(TestCase):
     """
@@ -213,6 +302,165 @@ class TestEnterpriseCatalogAPIClient(TestCase):
         except Exception as e:
             self.assertEqual(str(e), expected_error_message)
 
+    @responses.activate
+    @patch('enterprise_reporting.clients.get_oauth_access_token')
+    def test_get_content_metadata_cached(self, mock_get_oauth_access_token):
+        """
+        Test that catalogs are fetched once per run, and merged in order without duplicates.
+        """
+        mock_get_oauth_access_token.return_value = ['test_access_token', datetime.now() + timedelta(minutes=60)]
+        catalogs_content = {
+            'catalog-a': [{'uuid': 'program-1', 'content_type': 'program'}],
+            'catalog-b': [
+                {'uuid': 'program-1', 'content_type': 'program', 'title': 'Newer'},
+                {'uuid': 'program-2', 'content_type': 'program'},
+            ],
+        }
+        for catalog_uuid, results in catalogs_content.items():
+            url_path = self.client.GET_CONTENT_METADATA_ENDPOINT.format(catalog_uuid)
+            responses.add(
+                responses.GET,
+                urljoin(self.client.API_BASE_URL, f'{url_path}?page_size=1000'),
+                json={'results': results},
+                status=200,
+                content_type='application/json'
+            )
+        request_catalogs = {'results': [{'uuid': 'catalog-a'}, {'uuid': 'catalog-b'}]}
+
+        with content_metadata_cache_for_run():
+            first_results = self.client.get_content_metadata(request_catalogs)
+            second_results = EnterpriseCatalogAPIClient(
+                settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+                settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+            ).get_content_metadata(request_catalogs)
+            streamed_results = list(self.client.iter_content_metadata(request_catalogs))
+
+        assert first_results == second_results == streamed_results
+        # Duplicated content keeps the position of its first copy and the value of its last one.
+        assert [(item['uuid'], item['title']) for item in first_results] == [
+            ('program-1', 'Newer'),
+            ('program-2', None),
+        ]
+        assert len(responses.calls) == 2
+
+
+class TestClientRegistry(TestCase):
+    """
+    Test the tokens and HTTP session shared by the API clients.
+    """
+
+    url = 'http://localhost-test:8000/oauth2/access_token'
+
+    @patch('enterprise_reporting.clients.get_oauth_access_token')
+    def test_token_shared_per_client_and_host(self, mock_get_oauth_access_token):
+        """
+        Verify that a token is only requested once per client id and OAuth host.
+        """
+        mock_get_oauth_access_token.side_effect = lambda url, client_id, secret: [
+            f'{client_id}_token', datetime.utcnow() + timedelta(minutes=60)
+        ]
+        registry = ClientRegistry()
+
+        assert registry.get_access_token(self.url, 'client', 'secret')[0] == 'client_token'
+        assert registry.get_access_token(self.url, 'client', 'secret')[0] == 'client_token'
+        assert registry.get_access_token(self.url, 'other', 'secret')[0] == 'other_token'
+        registry.get_access_token('http://other-host/oauth2/access_token', 'client', 'secret')
+        assert mock_get_oauth_access_token.call_count == 3
+
+        registry.clear()
+        registry.get_access_token(self.url, 'client', 'secret')
+        assert mock_get_oauth_access_token.call_count == 4
+
+    @patch('enterprise_reporting.clients.get_oauth_access_token')
+    def test_token_refreshed_before_expiry(self, mock_get_oauth_access_token):
+        """
+        Verify that a token expiring within the refresh margin is replaced.
+        """
+        mock_get_oauth_access_token.side_effect = [
+            ['first_token', datetime.utcnow() + timedelta(seconds=100)],
+            ['second_token', datetime.utcnow() + timedelta(minutes=60)],
+        ]
+        registry = ClientRegistry(refresh_margin=300)
+
+        assert registry.get_access_token(self.url, 'client', 'secret')[0] == 'first_token'
+        assert registry.get_access_token(self.url, 'client', 'secret')[0] == 'second_token'
+        assert registry.get_access_token(self.url, 'client', 'secret')[0] == 'second_token'
+        assert mock_get_oauth_access_token.call_count == 2
+
+    def test_session_shared(self):
+        """
+        Verify that the clients share one session, pooling the given number of connections, renewed after a fork.
+        """
+        registry = ClientRegistry(pool_maxsize=4)
+        session = registry.session
+
+        assert registry.session is session
+        assert session.get_adapter('https://example.com')._pool_maxsize == 4  # pylint: disable=protected-access
+        registry._reset_session()  # pylint: disable=protected-access
+        assert registry.session is not session
+
+    @patch('enterprise_reporting.clients.get_oauth_access_token')
+    def test_clients_share_registry(self, mock_get_oauth_access_token):
+        """
+        Verify that the API clients use the session and tokens of the process wide registry.
+        """
+        mock_get_oauth_access_token.return_value = ['shared_token', datetime.utcnow() + timedelta(minutes=60)]
+        with patch('enterprise_reporting.clients.CLIENT_REGISTRY', ClientRegistry()):
+            enterprise_client = EnterpriseAPIClient('shared_client', 'secret')
+            catalog_client = EnterpriseCatalogAPIClient('shared_client', 'secret')
+            enterprise_client.connect()
+            catalog_client.connect()
+
+            assert enterprise_client.session is catalog_client.session
+            assert catalog_client.access_token == 'shared_token'
+            mock_get_oauth_access_token.assert_called_once()
+
+
+class TestS3Client(TestCase):
+    """
+    Test the S3 client used to fetch the reports stored on S3.
+    """
+
+    @patch.object(s3, '_client', None)
+    @patch('enterprise_reporting.clients.s3.boto3')
+    def test_shared_client(self, mock_boto3):
+        """
+        Test that every S3Client shares a single boto3 client.
+        """
+        assert s3.S3Client().client is s3.S3Client().client
+        mock_boto3.client.assert_called_once_with('s3')
+
+    def test_get_enterprise_report(self):
+        """
+        Test that reports are downloaded with the tuned transfer configuration.
+        """
+        client = MagicMock()
+        file_handler = io.BytesIO()
+        s3.S3Client(client=client).get_enterprise_report('BATMAN/REPORTS/grade.csv', file_handler)
+        client.download_fileobj.assert_called_once_with(
+            'edx-enterprise-reporting', 'BATMAN/REPORTS/grade.csv', file_handler, Config=s3.TRANSFER_CONFIG
+        )
+        assert s3.TRANSFER_CONFIG.max_request_concurrency == s3.S3_MAX_CONCURRENCY
+        assert s3.TRANSFER_CONFIG.multipart_chunksize == s3.S3_MULTIPART_CHUNK_SIZE
+
+    def test_open_enterprise_report(self):
+        """
+        Test that a report is streamed from the body of the S3 object.
+        """
+        content = b'user_id,grade\n1,0.9\n' * 1000
+        client = boto3.client(
+            's3', region_name='us-east-1', aws_access_key_id='key', aws_secret_access_key='secret'
+        )
+        with Stubber(client) as stubber:
+            stubber.add_response(
+                'get_object',
+                {'Body': StreamingBody(io.BytesIO(content), len(content))},
+                {'Bucket': 'edx-enterprise-reporting', 'Key': 'BATMAN/REPORTS/grade.csv'},
+            )
+            body = s3.S3Client(client=client).open_enterprise_report('BATMAN/REPORTS/grade.csv')
+            assert body.read(10) + body.read() == content
+            body.close()
+
 
 class TestGetSnowflakeConnectionReporting(TestCase):
     """Tests for the module-level _get_snowflake_connection in enterprise_reporting."""
@@ -281,7 +529,8 @@ class TestSnowflakeClient(TestCase):
     def _make_connection(self, rows=None):
         """Return a mock Snowflake connection whose cursor yields *rows*."""
         cursor = MagicMock()
-        cursor.execute.return_value = iter(rows or [])
+        batches = iter([rows] if rows else [])
+        cursor.fetchmany.side_effect = lambda size: next(batches, [])
         conn = MagicMock()
         conn.cursor.return_value = cursor
         return conn, cursor
@@ -329,3 +578,19 @@ class TestSnowflakeClient(TestCase):
         rows = list(client.stream_results('SELECT 1'))
 
         assert rows == [['2024-01-15 10:30:00', 'hello', 42]]
+
+    @patch(_PATCH)
+    def test_stream_batches_formats_datetime_columns(self, mock_factory):
+        """stream_batches() fetches rows in batches, formatting the datetime columns of every batch."""
+        from enterprise_reporting.clients.snowflake import SnowflakeClient
+        dt = datetime(2024, 1, 15, 10, 30, 0)
+        conn, cursor = self._make_connection(rows=[(dt, 'hello', None), (None, 'world', dt)])
+        mock_factory.return_value = conn
+
+        client = SnowflakeClient()
+        client.connect()
+        batches = list(client.stream_batches('SELECT 1', batch_size=500))
+
+        assert batches == [[('2024-01-15 10:30:00', 'hello', None), (None, 'world', '2024-01-15 10:30:00')]]
+        cursor.execute.assert_called_once_with('SELECT 1')
+        cursor.fetchmany.assert_called_with(500)
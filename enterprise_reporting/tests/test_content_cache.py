@@ -0,0 +1,131 @@
+"""
+Test the content metadata cache.
+"""
+
+import os
+import tempfile
+import unittest
+
+from mock import patch
+
+from enterprise_reporting.content_cache import (
+    CONTENT_METADATA_CACHE_ENV,
+    ContentMetadataCache,
+    content_metadata_cache_for_run,
+    get_content_metadata_cache,
+)
+
+
+class TestContentMetadataCache(unittest.TestCase):
+    """
+    Tests for `ContentMetadataCache`.
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ContentMetadataCache(os.path.join(directory.name, 'cache.sqlite3'), max_age=60)
+        self.content_metadata = [['course-v1:edX+DemoX', {'key': 'edX+DemoX', 'content_type': 'course'}]]
+
+    def test_get_and_set(self):
+        """
+        Test that content metadata is cached per catalog version.
+        """
+        assert self.cache.get('catalog', '2024-01-01T00:00:00Z') is None
+        self.cache.set('catalog', '2024-01-01T00:00:00Z', self.content_metadata)
+
+        assert self.cache.get('catalog', '2024-01-01T00:00:00Z') == self.content_metadata
+        assert self.cache.get('catalog', '2024-02-01T00:00:00Z') is None
+        assert self.cache.get('other-catalog', '2024-01-01T00:00:00Z') is None
+
+    def test_store_streams(self):
+        """
+        Test that items are yielded as they are stored, and only served once all of them have been stored.
+        """
+        items = iter([('course-1', {'key': 'course-1'}), ('course-2', {'key': 'course-2'})])
+        stored = self.cache.store('catalog', None, items)
+
+        assert next(stored) == ('course-1', {'key': 'course-1'})
+        assert self.cache.iter_items('catalog') is None
+        assert list(stored) == [('course-2', {'key': 'course-2'})]
+        assert list(self.cache.iter_items('catalog')) == [
+            ('course-1', {'key': 'course-1'}),
+            ('course-2', {'key': 'course-2'}),
+        ]
+
+    @patch('enterprise_reporting.content_cache.STORE_BATCH_SIZE', 2)
+    def test_concurrent_stores(self):
+        """
+        Test that jobs storing the same catalog version at the same time never publish a mix of their items.
+        """
+        items = [(f'id{index}', {'key': f'id{index}'}) for index in range(10)]
+        first = self.cache.store('catalog', None, iter(items))
+        for _ in range(5):
+            next(first)
+        second = self.cache.store('catalog', None, iter(items))
+        next(second)
+
+        assert list(first) == items[5:]
+        assert self.cache.get('catalog') == [list(item) for item in items]
+        assert list(second) == items[1:]
+        assert self.cache.get('catalog') == [list(item) for item in items]
+
+    @patch('enterprise_reporting.content_cache.STORE_BATCH_SIZE', 2)
+    def test_abandoned_store(self):
+        """
+        Test that the items stored by an abandoned iteration are discarded, and the cached version kept.
+        """
+        self.cache.set('catalog', None, self.content_metadata)
+        stored = self.cache.store('catalog', None, iter([(f'id{index}', {}) for index in range(5)]))
+        for _ in range(3):
+            next(stored)
+        stored.close()
+
+        assert self.cache.get('catalog') == self.content_metadata
+        with self.cache._connect() as connection:  # pylint: disable=protected-access
+            assert connection.execute('SELECT COUNT(*) FROM content_metadata').fetchone() == (1,)
+
+    @patch('enterprise_reporting.content_cache.CONNECTION_TIMEOUT', 0.1)
+    def test_store_while_reading(self):
+        """
+        Test that catalogs can be stored while another catalog is being read.
+        """
+        self.cache.set('catalog', None, [(f'id{index}', {}) for index in range(3)])
+        items = self.cache.iter_items('catalog')
+        assert next(items) == ('id0', {})
+
+        ContentMetadataCache(self.cache.path).set('other-catalog', None, self.content_metadata)
+
+        assert list(items) == [('id1', {}), ('id2', {})]
+        assert self.cache.get('other-catalog') == self.content_metadata
+
+    def test_max_age(self):
+        """
+        Test that content metadata of a catalog without modified timestamp expires.
+        """
+        with patch('enterprise_reporting.content_cache.time.time', return_value=1000):
+            self.cache.set('catalog', None, self.content_metadata)
+            self.cache.set('catalog', '2024-01-01T00:00:00Z', self.content_metadata)
+        with patch('enterprise_reporting.content_cache.time.time', return_value=1030):
+            assert self.cache.get('catalog') == self.content_metadata
+        with patch('enterprise_reporting.content_cache.time.time', return_value=1100):
+            assert self.cache.get('catalog') is None
+            assert self.cache.get('catalog', '2024-01-01T00:00:00Z') == self.content_metadata
+
+    def test_cache_for_run(self):
+        """
+        Test that a temporary cache is provided for the run, unless one is configured.
+        """
+        assert get_content_metadata_cache() is None
+        with content_metadata_cache_for_run(tempfile.gettempdir()) as path:
+            assert os.environ[CONTENT_METADATA_CACHE_ENV] == path
+            get_content_metadata_cache().set('catalog', None, self.content_metadata)
+            assert get_content_metadata_cache().get('catalog') == self.content_metadata
+        assert CONTENT_METADATA_CACHE_ENV not in os.environ
+        assert not os.path.exists(path)
+
+        with patch.dict(os.environ, {CONTENT_METADATA_CACHE_ENV: self.cache.path}):
+            with content_metadata_cache_for_run() as path:
+                assert path == self.cache.path
+            assert os.environ[CONTENT_METADATA_CACHE_ENV] == self.cache.path
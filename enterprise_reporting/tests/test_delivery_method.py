@@ -2,7 +2,10 @@
 Test delivery methods.
 """
 
+import io
+import os
 import unittest
+from zipfile import ZipFile
 
 import ddt
 from mock import MagicMock, patch
@@ -10,7 +13,7 @@ from mock import MagicMock, patch
 from enterprise_reporting.delivery_method import SFTPDeliveryMethod, SMTPDeliveryMethod
 from enterprise_reporting.utils import encrypt_string
 
-from .utils import create_files, verify_compressed
+from .utils import FakeSFTPClient, create_files, verify_compressed
 
 
 @ddt.ddt
@@ -96,7 +99,8 @@ class TestDeliveryMethod(unittest.TestCase):
         sftp_delivery_method = SFTPDeliveryMethod(self.reporting_config, self.password)
 
         # Verify failed SFTP transmission.
-        with patch('paramiko.SSHClient.connect', side_effect=Exception('SFTP transmission failed')):
+        with patch('paramiko.Transport', side_effect=Exception('SFTP transmission failed')), \
+                patch('enterprise_reporting.sftp.time.sleep'):
             sftp_delivery_method.send([file['file'] for file in files])
             mock_send_email_with_attachment.assert_called_with(
                 subject='SFTP transmission failed for bleh-bleh',
@@ -107,7 +111,8 @@ class TestDeliveryMethod(unittest.TestCase):
             )
 
         # Verify successful SFTP transmission.
-        with patch('paramiko.SSHClient', MagicMock()):
+        with patch('paramiko.Transport', MagicMock()), \
+                patch('paramiko.SFTPClient.from_transport', return_value=FakeSFTPClient({})):
             sftp_delivery_method.send([file['file'] for file in files])
             mock_send_email_with_attachment.assert_called_with(
                 subject='SFTP transmission successful for bleh-bleh',
@@ -116,3 +121,40 @@ class TestDeliveryMethod(unittest.TestCase):
                 to_email=['enterprise-reporting-sftp@2u-internal.opsgenie.net'],
                 attachment_data={},
             )
+
+    @patch('enterprise_reporting.delivery_method.send_email_with_attachment')
+    def test_smtp_streams_attachment(self, mock_send_email_with_attachment):
+        """
+        Verify that without a zip password the attachment is compressed in memory, without any file on disk.
+        """
+        self.reporting_config['encrypted_password'] = None
+        self.reporting_config['enable_compression'] = True
+        files, total_original_size = create_files([{'name': 'A History of Magic.txt', 'size': 1000}])
+        SMTPDeliveryMethod(self.reporting_config, self.password).send([file['file'] for file in files])
+
+        attachment_data = mock_send_email_with_attachment.call_args[0][4]
+        zip_file_name = os.path.basename(files[0]['file'].name).replace('.txt', '.zip')
+        assert list(attachment_data) == [zip_file_name]
+        assert not os.path.exists(os.path.join(os.path.dirname(files[0]['file'].name), zip_file_name))
+        archive = ZipFile(io.BytesIO(attachment_data[zip_file_name]))
+        assert len(archive.read(os.path.basename(files[0]['file'].name))) == total_original_size
+
+    @patch('enterprise_reporting.delivery_method.send_email_with_attachment')
+    def test_sftp_streams_upload(self, mock_send_email_with_attachment):
+        """
+        Verify that without a zip password the report is compressed straight into the remote file.
+        """
+        self.reporting_config['encrypted_password'] = None
+        self.reporting_config['enable_compression'] = True
+        files, total_original_size = create_files([{'name': 'A History of Magic.txt', 'size': 1000}])
+        sftp = FakeSFTPClient({})
+
+        with patch('paramiko.Transport', MagicMock()), patch('paramiko.SFTPClient.from_transport', return_value=sftp):
+            SFTPDeliveryMethod(self.reporting_config, self.password).send([file['file'] for file in files])
+
+        zip_file_name = os.path.basename(files[0]['file'].name).replace('.txt', '.zip')
+        remote_path = os.path.join('platform/3/4', zip_file_name)
+        assert sftp.opened == [(remote_path, 'wb')]
+        archive = ZipFile(io.BytesIO(sftp.files[remote_path]))
+        assert len(archive.read(os.path.basename(files[0]['file'].name))) == total_original_size
+        assert mock_send_email_with_attachment.call_args[1]['subject'] == 'SFTP transmission successful for bleh-bleh'
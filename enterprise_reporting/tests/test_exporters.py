@@ -0,0 +1,90 @@
+"""
+Tests for the direct database exporters of enterprise_reporting.
+"""
+
+import datetime
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+from rest_framework.reverse import reverse
+from rest_framework.test import APITransactionTestCase
+
+from enterprise_data.tests.mixins import JWTTestMixin
+from enterprise_data.tests.test_utils import (
+    EnterpriseLearnerEnrollmentFactory,
+    EnterpriseLearnerFactory,
+    UserFactory,
+    get_dummy_enterprise_api_data,
+)
+from enterprise_data_roles.constants import ENTERPRISE_DATA_ADMIN_ROLE
+from enterprise_data_roles.models import EnterpriseDataFeatureRole, EnterpriseDataRoleAssignment
+from enterprise_reporting.exporters import export_progress_v3_csv
+from enterprise_reporting.utils import write_csv_records
+
+
+@mock.patch('enterprise_data.api.v1.views.enterprise_learner.SnowflakeCoursePassingGradeSource')
+@mock.patch('enterprise_data.api.v1.views.enterprise_learner.SnowflakeCourseProgressSource')
+class TestExportProgressV3CSV(JWTTestMixin, APITransactionTestCase):
+    """
+    Tests for export_progress_v3_csv.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = UserFactory(is_staff=True)
+        role, __ = EnterpriseDataFeatureRole.objects.get_or_create(name=ENTERPRISE_DATA_ADMIN_ROLE)
+        EnterpriseDataRoleAssignment.objects.create(role=role, user=self.user)
+        self.client.force_authenticate(user=self.user)
+        mocked_get_enterprise_customer = mock.patch(
+            'enterprise_data.filters.EnterpriseApiClient.get_enterprise_customer',
+            return_value=get_dummy_enterprise_api_data(),
+        )
+        mocked_get_enterprise_customer.start()
+        self.addCleanup(mocked_get_enterprise_customer.stop)
+        self.enterprise_id = 'ee5e6b3a-069a-4947-bb8d-d2dbc323396c'
+        self.set_jwt_cookie()
+
+    def _api_report(self):
+        """
+        Build the progress_v3 CSV the way the reporter does from the v1 enrollments API.
+        """
+        url = reverse('v1:enterprise-learner-enrollment-list', kwargs={'enterprise_id': self.enterprise_id})
+        enrollments = json.loads(self.client.get(url, data={'page_size': 100}).content)['results']
+        output = io.StringIO()
+        write_csv_records(output, enrollments)
+        return output.getvalue()
+
+    def test_output_matches_api_report(self, mock_progress_source, mock_grade_source):
+        learner = EnterpriseLearnerFactory(enterprise_customer_uuid=self.enterprise_id)
+        unlinked_learner = EnterpriseLearnerFactory(enterprise_customer_uuid=self.enterprise_id, is_linked=False)
+        today = datetime.date.today()
+        for index in range(5):
+            EnterpriseLearnerEnrollmentFactory(
+                enterprise_customer_uuid=self.enterprise_id,
+                enterprise_user_id=learner.enterprise_user_id,
+                user_email=learner.user_email,
+                courserun_key=f'course-v1:edX+C{index}+2024',
+                last_activity_date=today - datetime.timedelta(days=index),
+            )
+        EnterpriseLearnerEnrollmentFactory(
+            enterprise_customer_uuid=self.enterprise_id,
+            enterprise_user_id=unlinked_learner.enterprise_user_id,
+        )
+        mock_progress_source.return_value.get_course_progress_map.return_value = {
+            (learner.user_email, 'course-v1:edX+C1+2024'): Decimal('0.50'),
+        }
+        mock_grade_source.return_value.get_passing_grade_map.return_value = {'course-v1:edX+C2+2024': 0.7}
+
+        output = io.StringIO()
+        count = export_progress_v3_csv(self.enterprise_id, output, chunk_size=2)
+
+        assert count == 5
+        assert output.getvalue() == self._api_report()
+
+    def test_no_enrollments(self, mock_progress_source, mock_grade_source):  # pylint: disable=unused-argument
+        output = io.StringIO()
+
+        assert export_progress_v3_csv(self.enterprise_id, output) == 0
+        assert output.getvalue() == ''
@@ -4,13 +4,18 @@ Test utils for external link reports.
 
 import unittest
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import MagicMock, patch
 
+from enterprise_reporting import external_resource_link_report
 from enterprise_reporting.external_resource_link_report import (
     AGGREGATE_REPORT_CSV_HEADER_ROW,
     create_columns_for_aggregate_report,
     create_csv_string,
+    gather_links_from_html,
+    iter_csv_chunks,
     process_coursegraph_results,
-    split_up_results,
+    query_coursegraph,
 )
 
 
@@ -112,10 +117,57 @@ class TestUtilsCoursegraph(unittest.TestCase):
         }
         assert process_coursegraph_results(self.raw_data) == expected
 
-    def test_split_up_results(self):
+    def test_process_coursegraph_results_in_process_pool(self):
         """
-        split_up_results should take a dictionary of process results and split
-        it into a list of smaller dictionaries.
+        process_results should aggregate the same data from a stream of entries,
+        extracting links in batches in a process pool
+        """
+        expected = process_coursegraph_results(self.raw_data)
+        with patch.object(external_resource_link_report, 'LINK_EXTRACTION_BATCH_SIZE', 3):
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                assert process_coursegraph_results(iter(self.raw_data), executor) == expected
+
+    def test_gather_links_from_html(self):
+        """
+        gather_links_from_html should skip edx links
+        """
+        html = (
+            '<a href="https://www.edx.org/course">edX</a>'
+            '<a href="https://example.com/page?a=1">page</a> see http://example.org <br>'
+        )
+        assert gather_links_from_html(html) == ['https://example.com/page?a=1', 'http://example.org']
+
+    def test_query_coursegraph(self):
+        """
+        query_coursegraph should query the html blocks a page of courses at a time
+        """
+        course_keys = ['course-v1:I+am+a+test1', 'course-v1:I+am+a+test2', 'course-v1:I+am+a+test3']
+        graph = MagicMock()
+
+        def run(query, **parameters):
+            if not parameters:
+                return [{'course_key': course_key} for course_key in course_keys]
+            records = []
+            for course_key in parameters['course_keys']:
+                record = MagicMock()
+                record.data.return_value = {'h.course_key': course_key}
+                records.append(record)
+            return records
+
+        graph.run.side_effect = run
+        results = list(query_coursegraph(graph, page_size=2))
+
+        assert results == [{'h.course_key': course_key} for course_key in course_keys]
+        assert [call[1] for call in graph.run.call_args_list] == [
+            {},
+            {'course_keys': course_keys[:2]},
+            {'course_keys': course_keys[2:]},
+        ]
+
+    def test_iter_csv_chunks(self):
+        """
+        iter_csv_chunks should pack the courses in as few chunks under the byte
+        budget as their order allows, each starting with the header row
         """
         processed_results = OrderedDict([
             ('course-v1:I+am+a+test1', {
@@ -127,7 +179,7 @@ class TestUtilsCoursegraph(unittest.TestCase):
                 ]),
             }),
             ('course-v1:I+am+a+test2', {
-                'course_title': 'course2',
+                'course_title': 'coursé2',
                 'organization': 'edx',
                 'domain_count': {'http://www.google2.com': 4},
             }),
@@ -137,12 +189,28 @@ class TestUtilsCoursegraph(unittest.TestCase):
                 'domain_count': {'http://www.google3.com': 1},
             }),
         ])
+        header = AGGREGATE_REPORT_CSV_HEADER_ROW.encode('utf-8')
+        rows = [
+            'course-v1:I+am+a+test1,"course1",edx,http://www.google.com,2\n,,,http://www.facebook.com,1\n',
+            'course-v1:I+am+a+test2,"coursé2",edx,http://www.google2.com,4\n',
+            'course-v1:I+am+a+test3,"course3",edx2,http://www.google3.com,1\n',
+        ]
+        rows = [row.encode('utf-8') for row in rows]
 
-        results_list = split_up_results(processed_results)
+        def chunks(max_bytes):
+            return list(iter_csv_chunks(
+                processed_results, AGGREGATE_REPORT_CSV_HEADER_ROW, create_columns_for_aggregate_report, max_bytes,
+            ))
 
-        assert len(results_list) == 2
-        assert len(results_list[0]) == 1
-        assert len(results_list[1]) == 2
+        assert chunks(10 ** 6) == [header + b''.join(rows)]
+        assert chunks(len(header) + len(rows[0]) + len(rows[1])) == [header + rows[0] + rows[1], header + rows[2]]
+        assert chunks(len(header) + len(rows[0]) + len(rows[1]) - 1) == [
+            header + rows[0], header + rows[1] + rows[2],
+        ]
+        assert chunks(1) == [header + row for row in rows]
+        assert list(iter_csv_chunks({}, AGGREGATE_REPORT_CSV_HEADER_ROW, create_columns_for_aggregate_report)) == [
+            header,
+        ]
 
     def test_create_aggregate_report_csv_string(self):
         """
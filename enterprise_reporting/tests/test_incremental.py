@@ -0,0 +1,62 @@
+"""
+Test incremental progress reports.
+"""
+
+import datetime
+import tempfile
+import unittest
+
+import ddt
+import pytz
+
+from enterprise_reporting import incremental
+
+
+@ddt.ddt
+class TestIncremental(unittest.TestCase):
+    """Tests for the watermarks of incremental progress reports."""
+
+    def test_watermark_tracker(self):
+        tracker = incremental.WatermarkTracker()
+        assert tracker.value is None
+
+        records = [
+            {'created': '2024-01-02T10:00:00Z', 'last_activity_date': '2024-01-01'},
+            {'created': '2024-01-02T09:00:00.500000Z', 'last_activity_date': '2024-01-05'},
+            {'created': None, 'last_activity_date': None},
+        ]
+        assert list(tracker.track(iter(records))) == records
+        assert tracker.value == {'created': '2024-01-02T10:00:00+00:00', 'last_activity_date': '2024-01-05'}
+
+    def test_merge_watermarks(self):
+        previous = {'created': '2024-01-03T00:00:00+00:00', 'last_activity_date': '2024-01-01'}
+        current = {'created': '2024-01-02T00:00:00+00:00', 'last_activity_date': '2024-01-04'}
+
+        assert incremental.merge_watermarks(None, current) == current
+        assert incremental.merge_watermarks(previous, None) == previous
+        assert incremental.merge_watermarks(previous, current) == {
+            'created': '2024-01-03T00:00:00+00:00', 'last_activity_date': '2024-01-04',
+        }
+
+    def test_changed_since_params(self):
+        assert incremental.changed_since_params(None) == {}
+        assert incremental.changed_since_params({'created': 'c', 'last_activity_date': None}) == {
+            'changed_since_created': 'c',
+        }
+
+    @ddt.data(
+        ({}, None),
+        ({'watermark': {'created': 'c'}}, None),
+        ({'watermark': {'created': 'c'}, 'last_full_snapshot': '2024-01-01T00:00:00+00:00'}, {'created': 'c'}),
+        ({'watermark': {'created': 'c'}, 'last_full_snapshot': '2023-12-20T00:00:00+00:00'}, None),
+    )
+    @ddt.unpack
+    def test_get_changed_since(self, config_state, expected):
+        now = datetime.datetime(2024, 1, 5, tzinfo=pytz.utc)
+        assert incremental.get_changed_since(config_state, 7, now) == expected
+
+    def test_watermark_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            assert incremental.read_watermark(directory) is None
+            incremental.write_watermark(directory, {'created': 'c'})
+            assert incremental.read_watermark(directory) == {'created': 'c'}
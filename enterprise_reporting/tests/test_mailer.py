@@ -0,0 +1,100 @@
+"""
+Test sending report emails.
+"""
+
+import email
+import os
+import tempfile
+import unittest
+from email.policy import default
+
+from mock import MagicMock, patch
+
+from enterprise_reporting import mailer
+
+
+class TestMailer(unittest.TestCase):
+    """
+    Tests for `build_raw_message` and `send_raw_email`.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.attachment = tempfile.NamedTemporaryFile(suffix='.zip')
+        self.attachment.write(os.urandom(200000))
+        self.attachment.flush()
+
+    def parse(self, raw_message):
+        """Return the given raw message parsed."""
+        return email.message_from_bytes(raw_message, policy=default)
+
+    def test_build_raw_message(self):
+        """
+        Test that the message holds the body, and the attachments read from disk or given as data.
+        """
+        raw_message = mailer.build_raw_message(
+            'Hogwarts Learner Data',
+            'Please find the attached data.',
+            'owl@hogwarts.edu',
+            {self.attachment.name: None, 'my_test.csv': 'some,csv,data\n'},
+        )
+        message = self.parse(mailer.address(raw_message, 'harry@gryffindor.hogwarts'))
+
+        assert message['Subject'] == 'Hogwarts Learner Data'
+        assert message['From'] == 'owl@hogwarts.edu'
+        assert message['To'] == 'harry@gryffindor.hogwarts'
+        body, disk_attachment, data_attachment = message.iter_parts()
+        assert body.get_content() == 'Please find the attached data.'
+        assert disk_attachment.get_filename() == os.path.basename(self.attachment.name)
+        with open(self.attachment.name, 'rb') as attachment_file:
+            assert disk_attachment.get_content() == attachment_file.read()
+        assert data_attachment.get_filename() == 'my_test.csv'
+        assert data_attachment.get_content() == b'some,csv,data\n'
+
+    @patch('enterprise_reporting.mailer.boto3')
+    def test_send_raw_email(self, mock_boto3):
+        """
+        Test that every recipient gets its own copy of the message, built once.
+        """
+        recipients = ['harry@gryffindor.hogwarts', 'ron@gryffindor.hogwarts', 'hermione@gryffindor.hogwarts']
+        client = mock_boto3.client.return_value
+
+        with patch('enterprise_reporting.mailer.build_raw_message', wraps=mailer.build_raw_message) as mock_build:
+            mailer.send_raw_email(
+                'Hogwarts Learner Data', 'body', 'owl@hogwarts.edu', recipients, {self.attachment.name: None},
+                'us-east-1',
+            )
+
+        mock_build.assert_called_once()
+        mock_boto3.client.assert_called_once_with('ses', region_name='us-east-1')
+        sent = {
+            call[1]['Destinations'][0]: call[1]['RawMessage']['Data'] for call in client.send_raw_email.call_args_list
+        }
+        assert sorted(sent) == sorted(recipients)
+        for recipient, raw_message in sent.items():
+            message = self.parse(raw_message)
+            assert message['To'] == recipient
+            assert message['From'] == 'owl@hogwarts.edu'
+
+    @patch('enterprise_reporting.mailer.boto3')
+    def test_send_raw_email_failure(self, mock_boto3):
+        """
+        Test that a failure is raised once every recipient has been attempted.
+        """
+        client = mock_boto3.client.return_value
+        client.send_raw_email.side_effect = [Exception('Throttling'), None]
+
+        with self.assertRaises(Exception):
+            mailer.send_raw_email('Subject', 'body', 'owl@hogwarts.edu', ['a@hogwarts.edu', 'b@hogwarts.edu'], {}, 'x')
+        assert client.send_raw_email.call_count == 2
+
+    @patch('enterprise_reporting.mailer.time')
+    def test_rate_limiter(self, mock_time):
+        """
+        Test that calls are spaced out to the configured rate.
+        """
+        mock_time.monotonic = MagicMock(return_value=100.0)
+        rate_limiter = mailer.RateLimiter(4)
+        for _ in range(3):
+            rate_limiter.wait()
+        assert [call[0][0] for call in mock_time.sleep.call_args_list] == [0.25, 0.5]
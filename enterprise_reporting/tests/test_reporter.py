@@ -2,7 +2,9 @@
 Test reporter.
 """
 import datetime
+import json
 import os
+import tempfile
 import unittest
 from unittest import mock
 from unittest.mock import MagicMock
@@ -88,6 +90,31 @@ class TestReporter(unittest.TestCase):
 
 		mock_s3_client.return_value.get_enterprise_report.assert_called_with(s3_csv_path, data_report_file[0])
 
+	@ddt.data(
+		'grade',
+		'course_structure',
+		'completion',
+	)
+	@mock.patch("enterprise_reporting.reporter.S3Client")
+	def test_manual_reports_streamed(self, data_type, mock_s3_client):
+		"""
+		Verify that manual reports are streamed from S3 when the delivered file is streamed.
+		"""
+		report_config = dict(
+			self.reporting_config, data_type=data_type, report_type="csv", enable_compression=True, encrypted_password=None,
+		)
+		enterprise_uuid = report_config['enterprise_customer']['uuid']
+		s3_csv_path = f"BATMAN/REPORTS/{data_type}.csv"
+		os.environ[f"{data_type}-{enterprise_uuid}"] = s3_csv_path
+
+		enterprise_report_sender = EnterpriseReportSender.create(report_config)
+		data_report_file, = getattr(enterprise_report_sender, f'_generate_enterprise_report_{data_type}_csv')()
+
+		assert data_report_file.name == enterprise_report_sender.data_report_file_name
+		mock_s3_client.return_value.get_enterprise_report.assert_not_called()
+		assert data_report_file.open() == mock_s3_client.return_value.open_enterprise_report.return_value
+		mock_s3_client.return_value.open_enterprise_report.assert_called_once_with(s3_csv_path)
+
 	@ddt.data(
 		'grade',
 		'course_structure',
@@ -113,3 +140,120 @@ class TestReporter(unittest.TestCase):
 
 		assert ve.value.args[0] == 'Invalid S3 CSV path. Path: [None]'
 		mock_s3_client.return_value.get_enterprise_report.assert_not_called()
+
+	@ddt.data(
+		('csv', 'a,b\r\n1,2\r\n3,4\r\n'),
+		('json', None),
+	)
+	@ddt.unpack
+	@mock.patch("enterprise_reporting.reporter.EnterpriseDataV1ApiClient")
+	def test_progress_v3_report_is_streamed(self, report_type, expected_content, mock_client):
+		"""
+		Verify that the progress_v3 reports are written from the lazily iterated enrollments.
+		"""
+		enrollments = [{'a': 1, 'b': 2}, {'a': 3, 'b': 4}]
+		mock_client.return_value.iter_enterprise_enrollments.return_value = iter(enrollments)
+		report_config = dict(self.reporting_config, data_type='progress_v3', report_type=report_type)
+
+		with tempfile.TemporaryDirectory() as directory:
+			enterprise_report_sender = EnterpriseReportSender.create(report_config, file_write_directory=directory)
+			files = getattr(enterprise_report_sender, f'_generate_enterprise_report_progress_v3_{report_type}')()
+			with open(files[0].name, newline='') as report_file:
+				content = report_file.read()
+
+		assert os.path.dirname(files[0].name) == directory
+		assert content == (expected_content or json.dumps(enrollments, indent=4))
+		mock_client.return_value.get_enterprise_enrollments.assert_not_called()
+
+	@mock.patch("enterprise_reporting.reporter.EnterpriseDataV1ApiClient")
+	def test_send_enterprise_report_telemetry(self, mock_client):
+		"""
+		Verify that the stages, rows and bytes of a report are recorded in its telemetry.
+		"""
+		mock_client.return_value.iter_enterprise_enrollments.return_value = iter([{'a': 1, 'b': 2}, {'a': 3, 'b': 4}])
+		report_config = dict(self.reporting_config, data_type='progress_v3', report_type='csv')
+
+		with tempfile.TemporaryDirectory() as directory:
+			enterprise_report_sender = EnterpriseReportSender.create(report_config, file_write_directory=directory)
+			enterprise_report_sender.delivery_method = MagicMock()
+			enterprise_report_sender.send_enterprise_report()
+
+		summary = enterprise_report_sender.telemetry.summary()
+		assert sorted(summary['durations']) == ['delivery', 'fetch', 'generate']
+		assert summary['rows'] == 2
+		assert summary['bytes_written'] == len('a,b\r\n1,2\r\n3,4\r\n')
+		enterprise_report_sender.delivery_method.send.assert_called_once()
+
+	@mock.patch("enterprise_reporting.reporter.EnterpriseDataApiClient")
+	def test_progress_v2_csv_without_enrollments(self, mock_client):
+		"""
+		Verify that no file is created when there are no enrollments.
+		"""
+		mock_client.return_value.iter_enterprise_enrollments.return_value = iter([])
+		report_config = dict(self.reporting_config, data_type='progress_v2', report_type='csv')
+
+		with tempfile.TemporaryDirectory() as directory:
+			enterprise_report_sender = EnterpriseReportSender.create(report_config, file_write_directory=directory)
+			files = enterprise_report_sender._generate_enterprise_report_progress_v2_csv()  # pylint: disable=protected-access
+			assert files == []
+			assert not os.listdir(directory)
+
+	@mock.patch("enterprise_reporting.reporter.EnterpriseDataV1ApiClient")
+	@mock.patch("enterprise_reporting.reporter.export_progress_v3_csv")
+	@mock.patch("enterprise_reporting.reporter.is_direct_export_enabled", return_value=True)
+	def test_progress_v3_csv_direct_export(self, mock_enabled, mock_export, mock_client):
+		"""
+		Verify that the progress_v3 CSV is exported from the database when direct export is enabled.
+		"""
+		report_config = dict(self.reporting_config, data_type='progress_v3', report_type='csv')
+		with tempfile.TemporaryDirectory() as directory:
+			enterprise_report_sender = EnterpriseReportSender.create(report_config, file_write_directory=directory)
+
+			generate = enterprise_report_sender._generate_enterprise_report_progress_v3_csv  # pylint: disable=protected-access
+
+			mock_export.return_value = 3
+			assert [file.name for file in generate()] == [enterprise_report_sender.data_report_file_name]
+
+			mock_export.return_value = 0
+			assert generate() == []
+			assert not os.listdir(directory)
+
+		mock_enabled.assert_called()
+		mock_client.assert_not_called()
+
+	@mock.patch("enterprise_reporting.reporter.EnterpriseCatalogAPIClient")
+	def test_catalog_csv_is_streamed(self, mock_client):
+		"""
+		Verify that the catalog CSV files are written per content type from the lazily iterated content metadata.
+		"""
+		content_metadata = [
+			{'key': 'course-1', 'content_type': 'course', 'subjects': []},
+			{'uuid': 'program-1', 'content_type': 'program'},
+			{'key': 'course-2', 'content_type': 'course', 'subjects': ['Math']},
+		]
+		mock_client.return_value.iter_content_metadata.return_value = iter(content_metadata)
+		report_config = dict(
+			self.reporting_config,
+			report_type='csv',
+			enterprise_customer_catalogs=[{'uuid': 'catalog'}],
+		)
+
+		with tempfile.TemporaryDirectory() as directory:
+			enterprise_report_sender = EnterpriseReportSender.create(report_config, file_write_directory=directory)
+			files = enterprise_report_sender._generate_enterprise_report_catalog_csv()  # pylint: disable=protected-access
+			contents = []
+			for file in files:
+				assert file.closed
+				with open(file.name, newline='') as report_file:
+					contents.append(report_file.read())
+
+		assert [os.path.basename(file.name) for file in files] == [
+			enterprise_report_sender.data_report_file_name_with.format(content_type).split('/')[-1]
+			for content_type in ('course', 'program')
+		]
+		assert contents == [
+			'content_type,key,subjects\r\ncourse,course-1,\r\ncourse,course-2,[\'Math\']\r\n',
+			'content_type,uuid\r\nprogram,program-1\r\n',
+		]
+		mock_client.return_value.iter_content_metadata.assert_called_once_with({'results': [{'uuid': 'catalog'}]})
+		mock_client.return_value.get_content_metadata.assert_not_called()
@@ -3,13 +3,23 @@ Test send enterprise reports.
 """
 
 import datetime
+import os
+import time
 import unittest
 from collections import namedtuple
+from unittest.mock import patch
 
 import pytz
 
-from enterprise_reporting.send_enterprise_reports import should_deliver_report
-from enterprise_reporting.utils import FREQUENCY_TYPE_DAILY
+from enterprise_reporting.incremental import write_watermark
+from enterprise_reporting.send_enterprise_reports import (
+    get_eligible_reporting_configs,
+    run_reports,
+    send_data,
+    should_deliver_report,
+)
+from enterprise_reporting.telemetry import ReportTelemetry, write_summary
+from enterprise_reporting.utils import FREQUENCY_TYPE_DAILY, FREQUENCY_TYPE_WEEKLY
 
 
 class TestSendEnterpriseReports(unittest.TestCase):
@@ -34,3 +44,175 @@ class TestSendEnterpriseReports(unittest.TestCase):
 		args = Command('', '')
 
 		assert should_deliver_report(args, reporting_config, current_est_time)
+
+	def test_get_eligible_reporting_configs(self):
+		"""
+		Verify that only the active configs of the requested data types due now are delivered, unless forced.
+		"""
+		current_est_time = pytz.timezone('US/Eastern').localize(datetime.datetime(2024, 3, 13, 9))
+
+		def reporting_config(uuid, active=True, data_type='progress_v3', frequency=FREQUENCY_TYPE_DAILY, hour=9):
+			return {
+				'uuid': uuid,
+				'active': active,
+				'data_type': data_type,
+				'frequency': frequency,
+				'hour_of_day': hour,
+				'day_of_month': None,
+				'day_of_week': 4,
+			}
+		reporting_configs = [
+			reporting_config('due'),
+			reporting_config('inactive', active=False),
+			reporting_config('catalog', data_type='catalog'),
+			reporting_config('later', hour=10),
+			reporting_config('other-day', frequency=FREQUENCY_TYPE_WEEKLY),
+		]
+		Command = namedtuple("Command", "data_type enterprise_customer")
+
+		def eligible(args):
+			return [config['uuid'] for config in get_eligible_reporting_configs(args, reporting_configs, current_est_time)]
+
+		assert eligible(Command('', '')) == ['due', 'catalog']
+		assert eligible(Command('progress_v3', '')) == ['due']
+		assert eligible(Command('', 'enterprise-uuid')) == ['due', 'catalog', 'later', 'other-day']
+
+	@staticmethod
+	def _reporting_config(name, data_type='progress_v3'):
+		return {
+			'uuid': f'{name}-{data_type}-config',
+			'enterprise_customer': {'name': name, 'uuid': f'{name}-uuid'},
+			'data_type': data_type,
+			'report_type': 'csv',
+		}
+
+	@patch('enterprise_reporting.send_enterprise_reports.EnterpriseReportSender.create')
+	def test_send_data_isolates_files(self, mock_create):
+		"""
+		Verify that `send_data` writes the report files to a private directory and removes it afterwards.
+		"""
+		directories = []
+
+		def send_enterprise_report():
+			directory = mock_create.call_args[1]['file_write_directory']
+			directories.append(directory)
+			with open(os.path.join(directory, 'report.csv'), 'w') as report_file:
+				report_file.write('data')
+
+		mock_create.return_value.send_enterprise_report.side_effect = send_enterprise_report
+		config = self._reporting_config('Acme')
+
+		assert send_data(config) is False
+		assert send_data(config) is False
+		assert directories[0] != directories[1]
+		assert not any(os.path.exists(directory) for directory in directories)
+
+	@patch('enterprise_reporting.send_enterprise_reports.send_data')
+	def test_run_reports_sequential(self, mock_send_data):
+		"""
+		Verify that `run_reports` sends the reports one after the other and reports the failed ones.
+		"""
+		def send(config, file_write_directory=None, changed_since=None):  # pylint: disable=unused-argument
+			with open(os.path.join(file_write_directory, 'report.csv'), 'w') as report_file:
+				report_file.write('a,b\n')
+			telemetry = ReportTelemetry()
+			telemetry.add('rows', 1)
+			write_summary(file_write_directory, telemetry)
+			return config['data_type'] == 'catalog'
+
+		mock_send_data.side_effect = send
+		configs = [self._reporting_config('Acme'), self._reporting_config('Globex', 'catalog')]
+
+		summary = run_reports(configs)
+
+		assert summary == {
+			'succeeded': ['Acme (progress_v3 csv)'],
+			'failed': ['Globex (catalog csv)'],
+			'timed_out': [],
+			'sizes': {'Acme-progress_v3-config': 4},
+			'watermarks': {},
+			'telemetry': [
+				{
+					'uuid': f'{name}-{data_type}-config',
+					'enterprise_customer': name,
+					'data_type': data_type,
+					'report_type': 'csv',
+					'status': status,
+					'summary': {'durations': {}, 'rows': 1},
+				}
+				for name, data_type, status in [('Acme', 'progress_v3', 'succeeded'), ('Globex', 'catalog', 'failed')]
+			],
+		}
+		assert mock_send_data.call_count == 2
+
+	@patch('enterprise_reporting.send_enterprise_reports.send_data')
+	def test_run_reports_streamed_sizes(self, mock_send_data):
+		"""
+		Verify that the size of reports streamed into their delivery is the number of bytes transferred.
+		"""
+		def send(config, file_write_directory=None, changed_since=None):  # pylint: disable=unused-argument
+			telemetry = ReportTelemetry()
+			if config['data_type'] == 'grade':
+				telemetry.add('bytes_transferred', 2048)
+			write_summary(file_write_directory, telemetry)
+			return False
+
+		mock_send_data.side_effect = send
+		configs = [self._reporting_config('Acme', 'grade'), self._reporting_config('Globex', 'catalog')]
+
+		summary = run_reports(configs)
+
+		assert summary['succeeded'] == ['Acme (grade csv)', 'Globex (catalog csv)']
+		assert summary['sizes'] == {'Acme-grade-config': 2048}
+
+	@patch('enterprise_reporting.send_enterprise_reports.send_data')
+	def test_run_reports_concurrent(self, mock_send_data):
+		"""
+		Verify that `run_reports` runs the jobs in parallel processes and terminates the ones running too long.
+		"""
+		def send(config, file_write_directory=None, changed_since=None):  # pylint: disable=unused-argument
+			assert os.path.isdir(file_write_directory)
+			if config['data_type'] == 'engagement':
+				time.sleep(30)
+			return config['data_type'] == 'catalog'
+
+		mock_send_data.side_effect = send
+		configs = [
+			self._reporting_config('Acme'),
+			self._reporting_config('Globex', 'catalog'),
+			self._reporting_config('Initech', 'engagement'),
+			self._reporting_config('Umbrella'),
+		]
+
+		started = time.monotonic()
+		summary = run_reports(configs, concurrency=2, job_timeout=2)
+
+		assert time.monotonic() - started < 10
+		assert sorted(summary['succeeded']) == ['Acme (progress_v3 csv)', 'Umbrella (progress_v3 csv)']
+		assert summary['failed'] == ['Globex (catalog csv)']
+		assert summary['timed_out'] == ['Initech (engagement csv)']
+
+	@patch('enterprise_reporting.send_enterprise_reports.send_data')
+	def test_run_reports_incremental(self, mock_send_data):
+		"""
+		Verify that every report job gets the watermark of its config and hands back the one it reached.
+		"""
+		received = {}
+
+		def send(config, file_write_directory=None, changed_since=None):
+			received[config['uuid']] = changed_since
+			write_watermark(file_write_directory, {'created': f'{config["uuid"]}-created', 'last_activity_date': None})
+			return False
+
+		mock_send_data.side_effect = send
+		configs = [self._reporting_config('Acme'), self._reporting_config('Globex')]
+		watermark = {'created': '2024-01-01T00:00:00+00:00', 'last_activity_date': '2024-01-01'}
+
+		summary = run_reports(configs, changed_since={'Acme-progress_v3-config': watermark})
+
+		assert received == {'Acme-progress_v3-config': watermark, 'Globex-progress_v3-config': None}
+		assert summary['watermarks'] == {
+			config_id: {'created': f'{config_id}-created', 'last_activity_date': None} for config_id in received
+		}
+		# Jobs which left no report file nor telemetry have no known size.
+		assert summary['sizes'] == {}
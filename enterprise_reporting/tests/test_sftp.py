@@ -0,0 +1,145 @@
+"""
+Test the SFTP transport layer.
+"""
+
+import unittest
+
+from mock import MagicMock, patch
+
+from enterprise_reporting.sftp import SFTPConnectionPool, SFTPUploader, upload_file
+
+from .utils import FakeSFTPClient, create_files
+
+
+class TestSFTPConnectionPool(unittest.TestCase):
+    """
+    Tests for `SFTPConnectionPool`.
+    """
+
+    @patch('paramiko.Transport', side_effect=lambda *args, **kwargs: MagicMock())
+    def test_reuses_active_transports(self, mock_transport):
+        """
+        Test that a transport is reused per account, and replaced once inactive.
+        """
+        pool = SFTPConnectionPool()
+        transport = pool.get('hogwarts_express', 4444, 'harry_potter', 'alohomora')
+        assert pool.get('hogwarts_express', 4444, 'harry_potter', 'alohomora') is transport
+        assert mock_transport.call_count == 1
+        transport.connect.assert_called_once_with(username='harry_potter', password='alohomora')
+
+        pool.get('hogwarts_express', 4444, 'ron_weasley', 'alohomora')
+        assert mock_transport.call_count == 2
+
+        transport.is_active.return_value = False
+        pool.get('hogwarts_express', 4444, 'harry_potter', 'alohomora')
+        assert mock_transport.call_count == 3
+
+        pool.close_all()
+        transport.close.assert_called_once_with()
+
+    @patch('paramiko.Transport')
+    def test_failed_connection_is_not_pooled(self, mock_transport):
+        """
+        Test that a transport failing to authenticate is closed and not kept.
+        """
+        pool = SFTPConnectionPool()
+        mock_transport.return_value.connect.side_effect = Exception('Authentication failed')
+        with self.assertRaises(Exception):
+            pool.get('hogwarts_express', 4444, 'harry_potter', 'alohomora')
+        mock_transport.return_value.close.assert_called_once_with()
+
+        mock_transport.return_value.connect.side_effect = None
+        pool.get('hogwarts_express', 4444, 'harry_potter', 'alohomora')
+        assert mock_transport.call_count == 2
+
+
+class TestSFTPUploader(unittest.TestCase):
+    """
+    Tests for `upload_file` and `SFTPUploader`.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.remote_files = {}
+        self.pool = MagicMock()
+        self.uploader = SFTPUploader('hogwarts_express', 4444, 'harry_potter', 'alohomora', pool=self.pool)
+        patcher = patch('enterprise_reporting.sftp.time.sleep')
+        self.mock_sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_upload_file(self):
+        """
+        Test that a file is uploaded from scratch, overwriting a previous remote file.
+        """
+        files, size = create_files([{'name': 'A History of Magic.txt', 'size': 100000}])
+        self.remote_files['/remote/a.txt'] = b'stale'
+        sftp = FakeSFTPClient(self.remote_files)
+
+        assert upload_file(sftp, files[0]['file'].name, '/remote/a.txt') == size
+        assert self.remote_files['/remote/a.txt'] == b'i' * size
+        assert sftp.opened == [('/remote/a.txt', 'wb')]
+
+    def test_upload_resumes_after_failure(self):
+        """
+        Test that a retried upload continues from the bytes the failed attempt wrote.
+        """
+        files, size = create_files([{'name': 'A History of Magic.txt', 'size': 100000}])
+        failing_sftp = FakeSFTPClient(self.remote_files, fail_after=40000)
+        resuming_sftp = FakeSFTPClient(self.remote_files)
+
+        with patch('paramiko.SFTPClient.from_transport', side_effect=[failing_sftp, resuming_sftp]):
+            sent = self.uploader.upload(files[0]['file'].name, '/remote/a.txt')
+
+        # The chunk being written when the connection was lost is sent again.
+        assert sent == size - 32768
+        assert self.remote_files['/remote/a.txt'] == b'i' * size
+        assert resuming_sftp.opened == [('/remote/a.txt', 'r+b')]
+        self.mock_sleep.assert_called_once_with(2)
+
+    def test_upload_overwrites_stale_file(self):
+        """
+        Test that a retried upload does not resume from a remote file its failed attempt did not write to.
+        """
+        files, size = create_files([{'name': 'A History of Magic.txt', 'size': 100000}])
+        self.remote_files['/remote/a.txt'] = b'o' * 60000
+        self.pool.get.side_effect = [Exception('Connection refused'), MagicMock()]
+        sftp = FakeSFTPClient(self.remote_files)
+
+        with patch('paramiko.SFTPClient.from_transport', return_value=sftp):
+            sent = self.uploader.upload(files[0]['file'].name, '/remote/a.txt')
+
+        assert sent == size
+        assert self.remote_files['/remote/a.txt'] == b'i' * size
+        assert sftp.opened == [('/remote/a.txt', 'wb')]
+
+    def test_upload_gives_up(self):
+        """
+        Test that the error of the last attempt is raised once the retries are exhausted.
+        """
+        files, _ = create_files([{'name': 'A History of Magic.txt', 'size': 1000}])
+        self.pool.get.side_effect = Exception('SFTP transmission failed')
+
+        with self.assertRaises(Exception):
+            self.uploader.upload(files[0]['file'].name, '/remote/a.txt')
+        assert self.pool.get.call_count == 4
+        assert [call[0][0] for call in self.mock_sleep.call_args_list] == [2, 4, 8]
+
+    def test_upload_all(self):
+        """
+        Test that all the files of a report are uploaded over the pooled transport.
+        """
+        files, _ = create_files([
+            {'name': 'A History of Magic.txt', 'size': 1000},
+            {'name': 'Quidditch Through the Ages.txt', 'size': 500},
+            {'name': 'Fantastic Beasts.txt', 'size': 200},
+        ])
+
+        with patch('paramiko.SFTPClient.from_transport', side_effect=lambda *args, **kwargs: FakeSFTPClient(
+            self.remote_files
+        )):
+            self.uploader.upload_all([file['file'].name for file in files], 'platform/3/4')
+
+        assert self.remote_files == {
+            'platform/3/4/' + file['file'].name.split('/')[-1]: b'i' * file['size'] for file in files
+        }
+        self.pool.get.assert_called_with('hogwarts_express', 4444, 'harry_potter', 'alohomora')
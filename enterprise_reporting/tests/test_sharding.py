@@ -0,0 +1,60 @@
+"""
+Test sharding of the enterprise reports.
+"""
+
+import os
+import tempfile
+import unittest
+
+import ddt
+
+from enterprise_reporting import sharding
+from enterprise_reporting.state import ReportStateStore
+
+
+@ddt.ddt
+class TestSharding(unittest.TestCase):
+    """Tests for splitting the reporting configs of a run into shards."""
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.manifest_path = os.path.join(self.directory.name, 'manifest.json')
+        self.state_store = ReportStateStore(os.path.join(self.directory.name, 'state.json'))
+
+    @ddt.data(('0/1', (0, 1)), ('3/4', (3, 4)))
+    @ddt.unpack
+    def test_parse_shard(self, value, expected):
+        assert sharding.parse_shard(value) == expected
+
+    @ddt.data('1', 'a/b', '2/2', '-1/2', '0/0')
+    def test_parse_shard_invalid(self, value):
+        with self.assertRaises(ValueError):
+            sharding.parse_shard(value)
+
+    def test_balance(self):
+        """
+        Verify that the largest items are spread first and the shard totals end up even.
+        """
+        shards = sharding.balance({'a': 7, 'b': 5, 'c': 4, 'd': 3, 'e': 3, 'f': 2}, 3)
+
+        assert shards == [['a', 'f'], ['b', 'e'], ['c', 'd']]
+
+    def test_manifest_round_trip(self):
+        """
+        Verify that workers load the configs of their shard, weighted by the size history of the state store.
+        """
+        configs = [{'uuid': f'config-{index}', 'data_type': 'progress_v3'} for index in range(4)]
+        self.state_store.record_sizes({'config-0': 10 ** 9, 'config-1': 10})
+
+        sharding.write_manifest(sharding.build_manifest(configs, 2, self.state_store), self.manifest_path)
+
+        assert sharding.load_shard(self.manifest_path, 0, 2) == [configs[0]]
+        assert sharding.load_shard(self.manifest_path, 1, 2) == [configs[2], configs[3], configs[1]]
+
+    def test_load_shard_count_mismatch(self):
+        sharding.write_manifest(sharding.build_manifest([], 2), self.manifest_path)
+
+        with self.assertRaises(ValueError):
+            sharding.load_shard(self.manifest_path, 0, 3)
@@ -0,0 +1,52 @@
+"""
+Test the persistent report state store.
+"""
+
+import os
+import tempfile
+import unittest
+
+from enterprise_reporting.state import SIZE_HISTORY_LENGTH, ReportStateStore
+
+
+class TestReportStateStore(unittest.TestCase):
+    """Tests for ReportStateStore."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'state.json')
+
+    def test_missing_or_unreadable_file(self):
+        assert ReportStateStore(self.path).state == {}
+        with open(self.path, 'w') as state_file:
+            state_file.write('{not json')
+        assert ReportStateStore(self.path).get('config') == {}
+
+    def test_update(self):
+        """
+        Verify that updates are merged with changes made through another store and persisted.
+        """
+        store = ReportStateStore(self.path)
+        other_store = ReportStateStore(self.path)
+
+        store.update({'a': {'watermark': '2024-01-01', 'other': 1}})
+        other_store.update({'b': {'watermark': '2024-02-01'}})
+        store.update({'a': {'other': None}})
+
+        assert ReportStateStore(self.path).state == {'a': {'watermark': '2024-01-01'}, 'b': {'watermark': '2024-02-01'}}
+
+    def test_record_sizes(self):
+        """
+        Verify that only the most recent sizes are kept and averaged.
+        """
+        store = ReportStateStore(self.path)
+        assert store.estimated_size('a', default=5) == 5
+
+        for size in range(SIZE_HISTORY_LENGTH + 2):
+            store.record_sizes({'a': size * 10})
+
+        expected = [size * 10 for size in range(2, SIZE_HISTORY_LENGTH + 2)]
+        assert ReportStateStore(self.path).get('a')['sizes'] == expected
+        assert store.estimated_size('a') == 40
@@ -0,0 +1,145 @@
+"""
+Test the streaming compression and encryption of reports.
+"""
+
+import io
+import unittest
+from zipfile import ZipFile
+
+import ddt
+import pgpy
+from mock import patch
+from pgpy.constants import CompressionAlgorithm, HashAlgorithm, KeyFlags, PubKeyAlgorithm, SymmetricKeyAlgorithm
+
+from enterprise_reporting.streaming import PGPEncryptingWriter, StreamedReportFile, _iter_packets, write_compressed
+
+from .utils import create_files
+
+
+@ddt.ddt
+class TestStreaming(unittest.TestCase):
+    """
+    Tests for `write_compressed` and `PGPEncryptingWriter`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.key = pgpy.PGPKey.new(PubKeyAlgorithm.RSAEncryptOrSign, 2048)
+        uid = pgpy.PGPUID.new('JohnDoe', email='johndoe@unknown.com')
+        cls.key.add_uid(uid, usage={KeyFlags.Sign, KeyFlags.EncryptCommunications, KeyFlags.EncryptStorage},
+                        hashes=[HashAlgorithm.SHA256], ciphers=[SymmetricKeyAlgorithm.AES256],
+                        compression=[CompressionAlgorithm.Uncompressed])
+
+    def decrypt(self, data):
+        """Return the decrypted content of the given OpenPGP message, and the file name stored in it."""
+        message = self.key.decrypt(pgpy.PGPMessage.from_blob(data))
+        return bytes(message.message), message.filename
+
+    def verify_zip(self, data, files):
+        """Verify that the given zip archive holds the given files under their base names."""
+        archive = ZipFile(io.BytesIO(data))
+        assert archive.testzip() is None
+        assert archive.namelist() == [file['file'].name.split('/')[-1] for file in files]
+        for file in files:
+            assert len(archive.read(file['file'].name.split('/')[-1])) == file['size']
+
+    @ddt.data(False, True)
+    def test_write_compressed(self, encrypt):
+        """
+        Test that the files are zipped, and encrypted when a PGP key is given.
+        """
+        files, total_size = create_files([
+            {'name': 'lord-of-the-rings.txt', 'size': 1000},
+            {'name': 'harry-potter-and-deathly-hollows.txt', 'size': 200000},
+        ])
+        output = io.BytesIO()
+        write_compressed(
+            [file['file'] for file in files],
+            output,
+            str(self.key.pubkey) if encrypt else None,
+            'report.zip',
+        )
+
+        data = output.getvalue()
+        assert len(data) < total_size
+        if encrypt:
+            data, filename = self.decrypt(data)
+            assert filename == 'report.zip'
+        self.verify_zip(data, files)
+
+    @ddt.data(False, True)
+    def test_write_compressed_streamed_files(self, encrypt):
+        """
+        Test that reports streamed from elsewhere than the disk are zipped like the files on disk.
+        """
+        files, _ = create_files([{'name': 'lord-of-the-rings.txt', 'size': 1000}])
+        streams = []
+
+        def open_stream():
+            streams.append(io.BytesIO(b'i' * 300000))
+            return streams[-1]
+
+        streamed_file = StreamedReportFile('/tmp/harry-potter-and-deathly-hollows.txt', open_stream)
+        files.append({'file': streamed_file, 'size': 300000})
+        output = io.BytesIO()
+        write_compressed([file['file'] for file in files], output, str(self.key.pubkey) if encrypt else None)
+
+        data = output.getvalue()
+        if encrypt:
+            data, _ = self.decrypt(data)
+        self.verify_zip(data, files)
+        assert len(streams) == 1
+        assert streams[0].closed
+
+    @ddt.data(0, 100, 191, 192, 8383, 8384, 65536, 65536 * 3 + 17)
+    def test_encrypting_writer(self, size):
+        """
+        Test that content of any size, written in pieces, survives the encryption.
+        """
+        content = bytes(index % 251 for index in range(size))
+        output = io.BytesIO()
+        with PGPEncryptingWriter(output, str(self.key.pubkey), '/tmp/report.zip') as encrypted:
+            for start in range(0, size, 5000):
+                encrypted.write(content[start:start + 5000])
+
+        decrypted, filename = self.decrypt(output.getvalue())
+        assert decrypted == content
+        assert filename == 'report.zip'
+
+    def test_encrypting_writer_wrong_key(self):
+        """
+        Test that the message can not be decrypted with another key.
+        """
+        wrong_key = pgpy.PGPKey.new(PubKeyAlgorithm.RSAEncryptOrSign, 2048)
+        output = io.BytesIO()
+        with PGPEncryptingWriter(output, str(self.key.pubkey), 'report.zip') as encrypted:
+            encrypted.write(b'secret')
+
+        with self.assertRaises(pgpy.errors.PGPError):
+            wrong_key.decrypt(pgpy.PGPMessage.from_blob(output.getvalue()))
+
+    def test_iter_packets(self):
+        """
+        Test that packets with old and new format headers of every length size are read.
+        """
+        packets = [
+            (1, b'\x84\x03abc'),
+            (1, b'\x85\x00\x02ab'),
+            (2, b'\x8a\x00\x00\x00\x01a'),
+            (18, b'\xd2\x01a'),
+            (18, b'\xd2\xc0\x00' + b'a' * 192),
+            (11, b'\xcb\xff\x00\x00\x00\x02ab'),
+        ]
+        assert list(_iter_packets(b''.join(packet for _, packet in packets))) == packets
+
+        with self.assertRaises(ValueError):
+            list(_iter_packets(b'\xd2\xe0a'))
+
+    def test_encrypting_writer_without_session_key(self):
+        """
+        Test that the encryption fails loudly if no session key packet can be found in the message of pgpy.
+        """
+        with patch('enterprise_reporting.streaming._iter_packets', return_value=iter([(18, b'\xd2\x00')])):
+            with self.assertRaises(ValueError):
+                PGPEncryptingWriter(io.BytesIO(), str(self.key.pubkey), 'report.zip')
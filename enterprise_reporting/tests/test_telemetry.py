@@ -0,0 +1,81 @@
+"""
+Test the telemetry of the report jobs.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from enterprise_reporting import telemetry
+
+
+class TestTelemetry(unittest.TestCase):
+    """
+    Tests for `ReportTelemetry` and the functions recording into it.
+    """
+
+    def test_nothing_recorded_outside_of_a_report_job(self):
+        """
+        Test that stages and counters are ignored when no telemetry is recording.
+        """
+        with telemetry.stage('generate'):
+            telemetry.count('rows', 1)
+        assert list(telemetry.fetched([1, 2])) == [1, 2]
+
+    def test_recording(self):
+        """
+        Test that stages and counters are added to the recording telemetry, and that fetched rows are counted.
+        """
+        report_telemetry = telemetry.ReportTelemetry()
+        with telemetry.recording(report_telemetry):
+            with telemetry.stage('generate'):
+                assert list(telemetry.fetched(iter([{'a': 1}, {'a': 2}]))) == [{'a': 1}, {'a': 2}]
+                assert list(telemetry.fetched([[1, 2, 3], [4]], batched=True)) == [[1, 2, 3], [4]]
+            with telemetry.stage('delivery'):
+                output = io.BytesIO()
+                telemetry.CountingWriter(output).write(b'x' * 1000)
+        telemetry.count('rows', 100)
+
+        summary = report_telemetry.summary()
+        assert sorted(summary['durations']) == ['delivery', 'fetch', 'generate']
+        assert summary['durations']['fetch'] <= summary['durations']['generate']
+        assert summary['rows'] == 6
+        assert summary['bytes_transferred'] == 1000
+        assert summary['throughput'] > 0
+        assert output.getvalue() == b'x' * 1000
+
+    def test_summary_round_trip(self):
+        """
+        Test that the summary left in a job directory is read back, and that a missing one is None.
+        """
+        report_telemetry = telemetry.ReportTelemetry()
+        report_telemetry.add_duration('generate', 1.23456)
+        report_telemetry.add('bytes_written', 42)
+        with tempfile.TemporaryDirectory() as directory:
+            assert telemetry.read_summary(directory) is None
+            telemetry.write_summary(directory, report_telemetry)
+            assert telemetry.read_summary(directory) == {'durations': {'generate': 1.235}, 'bytes_written': 42}
+
+    def test_send_to_statsd(self):
+        """
+        Test that the metrics are only sent when statsd is installed and configured.
+        """
+        reports = [{
+            'data_type': 'catalog',
+            'summary': {'durations': {'generate': 1.5}, 'rows': 3, 'bytes_written': 100},
+        }]
+        with patch.object(telemetry, 'statsd', None), patch.dict(os.environ, {'STATSD_HOST': 'localhost'}):
+            assert not telemetry.send_to_statsd(reports)
+
+        mock_statsd = MagicMock()
+        with patch.object(telemetry, 'statsd', mock_statsd), patch.dict(os.environ, {'STATSD_HOST': 'localhost'}):
+            assert telemetry.send_to_statsd(reports)
+        mock_statsd.StatsClient.assert_called_once_with('localhost', 8125, prefix='enterprise_reporting')
+        pipeline = mock_statsd.StatsClient.return_value.pipeline.return_value.__enter__.return_value
+        pipeline.timing.assert_called_once_with('report.catalog.generate', 1500)
+        assert [call[0] for call in pipeline.incr.call_args_list] == [
+            ('report.catalog.rows', 3),
+            ('report.catalog.bytes_written', 100),
+        ]
@@ -3,19 +3,23 @@ Test utilities.
 """
 
 
+import csv
 import datetime
+import io
+import json
 import os
 import tempfile
 import unittest
-from collections import OrderedDict
+import unittest.mock
 
 import ddt
 import pgpy
 import pytz
+from cryptography.fernet import InvalidToken, MultiFernet
 from pgpy.constants import CompressionAlgorithm, HashAlgorithm, KeyFlags, PubKeyAlgorithm, SymmetricKeyAlgorithm
 from pgpy.errors import PGPError
 
-from enterprise_reporting import utils
+from enterprise_reporting import benchmark, utils
 
 from .utils import create_files, verify_compressed
 
@@ -172,6 +176,221 @@ class TestUtilities(unittest.TestCase):
             current_est_time.weekday()
         )
 
+    def test_schedule_index(self):
+        """
+        Verify that ScheduleIndex returns the configs is_current_time_in_schedule accepts, in their original order.
+        """
+        current_est_time = pytz.timezone('US/Eastern').localize(datetime.datetime(2024, 3, 13, 9))
+        schedules = [
+            (utils.FREQUENCY_TYPE_DAILY, 9, None, None),
+            (utils.FREQUENCY_TYPE_MONTHLY, 9, 13, None),
+            (utils.FREQUENCY_TYPE_DAILY, 10, None, None),
+            (utils.FREQUENCY_TYPE_WEEKLY, 9, 13, 2),
+            (utils.FREQUENCY_TYPE_WEEKLY, 9, 13, 3),
+            (utils.FREQUENCY_TYPE_MONTHLY, 9, 12, 2),
+            (utils.FREQUENCY_TYPE_DAILY, 9, 1, 0),
+        ]
+        reporting_configs = [
+            {'uuid': index, 'frequency': frequency, 'hour_of_day': hour, 'day_of_month': day, 'day_of_week': weekday}
+            for index, (frequency, hour, day, weekday) in enumerate(schedules)
+        ]
+
+        due = utils.ScheduleIndex(reporting_configs).due(current_est_time)
+
+        assert [reporting_config['uuid'] for reporting_config in due] == [0, 1, 3, 6]
+        assert due == [
+            reporting_config for reporting_config in reporting_configs
+            if utils.is_current_time_in_schedule(current_est_time, *schedules[reporting_config['uuid']])
+        ]
+
+
+@ddt.ddt
+class TestDictFlattener(unittest.TestCase):
+    """Tests for flattening dicts with compiled `FlattenPlan`s."""
+
+    def assert_flattened(self, flattener, dictionary):
+        """Assert that the flattener output is identical to `flatten_dict`."""
+        assert flattener.flatten(dictionary) == (
+            utils.flatten_dict(dictionary, target='key'),
+            utils.flatten_dict(dictionary, target='value'),
+        )
+
+    def test_flatten_scary_dictionary(self):
+        """The output is identical to `flatten_dict`, even though the items of its lists differ from each other."""
+        flattener = utils.DictFlattener()
+        for _ in range(2):
+            self.assert_flattened(flattener, TestUtilities.SCARY_DICTIONARY)
+        assert not flattener.plans
+
+    def test_flatten_varying_list_lengths(self):
+        """Dicts only differing by the length of their lists share a plan."""
+        flattener = utils.DictFlattener()
+        for count in (2, 0, 1, 3):
+            self.assert_flattened(flattener, {
+                'key': 'a',
+                'course_runs': [{'key': f'run{index}', 'seats': ['audit'] * index} for index in range(count)],
+                'skills': ['Python'] * count,
+            })
+        assert len(flattener.plans) == 2
+
+    @ddt.data(
+        {'key': 'a', 'extra': 'b', 'image': {'src': 'c'}},
+        {'key': 'a', 'image': ['c']},
+        {'key': 'a', 'image': {'src': {'width': 1}}},
+        {'key': 'a', 'image': {'url': 'c'}},
+        {'key': 'a', 'image': {'src': 'c'}, 'runs': [{'key': 'b'}, {'key': 'c', 'start': None}]},
+        {'key': ['a'], 'image': {'src': 'c'}},
+    )
+    def test_flatten_other_shapes(self, dictionary):
+        """Dicts of another shape than the previous ones get their own plan, or are flattened by `flatten_dict`."""
+        flattener = utils.DictFlattener()
+        self.assert_flattened(flattener, {'key': 'a', 'image': {'src': 'c'}})
+        self.assert_flattened(flattener, dictionary)
+        self.assert_flattened(flattener, {'key': 'b', 'image': {'src': 'd'}})
+
+    @ddt.data(
+        {'H': [{'H': 'i'}, 'Hi']},
+        {'i': [['Hi']]},
+    )
+    def test_flatten_weird_cases(self, dictionary):
+        """The dictionary, when weird, raises the error of `flatten_dict`."""
+        flattener = utils.DictFlattener()
+        flattener.flatten({'H': [{'H': 'i'}]})
+        with self.assertRaises(NotImplementedError):
+            flattener.flatten(dictionary)
+
+    def test_benchmark(self):
+        """The benchmark checks that both implementations flatten a synthetic catalog identically."""
+        results = benchmark.run_flatten_benchmark(300)
+        assert results['items'] == 300
+
+
+@ddt.ddt
+class TestFormatDatetimeColumns(unittest.TestCase):
+    """Tests for formatting the datetimes of database rows a column at a time."""
+
+    @ddt.data(
+        [],
+        [(1, 'a', None)],
+        [(datetime.datetime(2024, 1, 15, 10, 30, 5, 123), 'a'), (datetime.datetime(2023, 12, 1), 'b')],
+        [(datetime.datetime(2024, 1, 15, 10, 30), None), (None, datetime.datetime(5, 1, 1, 0, 0, 1))],
+        [(datetime.datetime(2024, 1, 15, 23, 30, tzinfo=pytz.timezone('US/Eastern')), datetime.date(2024, 1, 15))],
+        [(pytz.utc.localize(datetime.datetime(2024, 1, 15)),), (datetime.datetime(2024, 1, 15, 1, 2, 3),)],
+    )
+    def test_format_datetime_columns(self, rows):
+        """The output is identical to formatting every datetime of every row with `strftime`."""
+        expected = [
+            [
+                value.strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, datetime.datetime) else value
+                for value in row
+            ]
+            for row in rows
+        ]
+        assert [list(row) for row in utils.format_datetime_columns(rows)] == expected
+
+    def test_iter_row_batches(self):
+        """The rows of the cursor are fetched and formatted in batches."""
+        rows = [(index, datetime.datetime(2024, 1, 1, index)) for index in range(5)]
+        cursor = unittest.mock.Mock()
+        batches = iter([rows[:2], rows[2:4], rows[4:], []])
+        cursor.fetchmany.side_effect = lambda size: next(batches)
+
+        assert [len(batch) for batch in utils.iter_row_batches(cursor, 2)] == [2, 2, 1]
+        cursor.fetchmany.assert_called_with(2)
+
+    def test_benchmark(self):
+        """The benchmark checks that the batches are written like the rows formatted one by one."""
+        assert benchmark.run_rows_benchmark(300)['items'] == 300
+
+
+class TestFernetKeyManager(unittest.TestCase):
+    """Tests for encrypting and decrypting strings with keys derived once."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = unittest.mock.patch.dict(os.environ, {'LMS_FERNET_KEY': 'new-key'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.environ.pop('LMS_FERNET_ROTATED_KEYS', None)
+        self.manager = utils.FernetKeyManager()
+
+    def test_keys_derived_once(self):
+        """The key is derived once for as long as it does not change."""
+        with unittest.mock.patch.object(utils, 'derive_fernet_key', wraps=utils.derive_fernet_key) as mock_derive:
+            encrypted = [self.manager.encrypt(f'password{index}') for index in range(3)]
+            assert [self.manager.decrypt(string) for string in encrypted] == ['password0', 'password1', 'password2']
+            assert mock_derive.call_count == 1
+
+            os.environ['LMS_FERNET_KEY'] = 'newer-key'
+            self.manager.encrypt('password')
+            assert mock_derive.call_count == 2
+
+    def test_key_rotation(self):
+        """Strings encrypted with a rotated key are still decrypted, and new ones use the current key."""
+        old_encrypted = self.manager.encrypt('password')
+        os.environ['LMS_FERNET_KEY'] = 'newer-key'
+        with self.assertRaises(InvalidToken):
+            self.manager.decrypt(old_encrypted)
+
+        os.environ['LMS_FERNET_ROTATED_KEYS'] = 'older-key,new-key'
+        assert self.manager.decrypt(old_encrypted) == 'password'
+        new_encrypted = self.manager.encrypt('password')
+        del os.environ['LMS_FERNET_ROTATED_KEYS']
+        assert self.manager.decrypt(new_encrypted) == 'password'
+
+    def test_decrypt_all(self):
+        """Strings decrypted up front are served from the cache, while invalid ones still fail on their own."""
+        encrypted = self.manager.encrypt('password')
+        assert self.manager.decrypt_all([encrypted, encrypted, 'invalid']) == 1
+
+        with unittest.mock.patch.object(MultiFernet, 'decrypt') as mock_decrypt:
+            assert self.manager.decrypt(encrypted) == 'password'
+            mock_decrypt.assert_not_called()
+        with self.assertRaises(InvalidToken):
+            self.manager.decrypt('invalid')
+
+    def test_decrypt_reporting_configs(self):
+        """The passwords of the reporting configs are decrypted by the shared key manager."""
+        configs = [
+            {'encrypted_password': 'a', 'encrypted_sftp_password': None},
+            {'encrypted_password': '', 'encrypted_sftp_password': 'b'},
+        ]
+        with unittest.mock.patch.object(utils.FERNET_KEY_MANAGER, 'decrypt_all') as mock_decrypt_all:
+            utils.decrypt_reporting_configs(configs)
+        assert list(mock_decrypt_all.call_args[0][0]) == ['a', 'b']
+
+
+@ddt.ddt
+class TestRecordWriters(unittest.TestCase):
+    """Tests for the streaming CSV and JSON record writers."""
+
+    @ddt.data(
+        [],
+        [{'a': 1}],
+        [{'a': 1, 'b': [1, {'c': None}], 'd': 'line\nbreak'}, {'a': 'é', 'b': [], 'd': {}}],
+    )
+    def test_write_json_records(self, records):
+        """
+        Verify that the output is identical to `json.dump` with an indent of 4.
+        """
+        output = io.StringIO()
+        count = utils.write_json_records(output, iter(records))
+
+        assert count == len(records)
+        assert output.getvalue() == json.dumps(records, indent=4)
+
+    @ddt.data(
+        (False, 'b,a\r\n1,2\r\n3,4\r\n'),
+        (True, 'a,b\r\n2,1\r\n4,3\r\n'),
+    )
+    @ddt.unpack
+    def test_write_csv_records(self, sort_keys, expected):
+        output = io.StringIO()
+        count = utils.write_csv_records(output, iter([{'b': 1, 'a': 2}, {'b': 3, 'a': 4}]), sort_keys=sort_keys)
+
+        assert count == 2
+        assert output.getvalue() == expected
+
 
 @ddt.ddt
 class TestCompressEncrypt(unittest.TestCase):
@@ -275,27 +494,33 @@ class TestCompressEncrypt(unittest.TestCase):
         assert actual_file_name == expected_file_name
 
 
-class TestPrepareAttachments(unittest.TestCase):
+class TestSortedColumnsCSVWriter(unittest.TestCase):
+    """
+    Tests for `SortedColumnsCSVWriter`.
+    """
 
-    def test_prepare_attachments(self):
+    def test_same_output_as_generate_data(self):
         """
-        prepare_attachments should properly create MIMEApplication
-        depending on whether or not attachment data is provided
+        Test that the rows are those `generate_data` builds, including for items with other keys than the first.
         """
-        file_on_filesystem = tempfile.NamedTemporaryFile()
-        file_on_filesystem_name = file_on_filesystem.name
-
-        attachment_data = OrderedDict([
-            (file_on_filesystem_name, None),
-            ('my_test.csv', 'some,csv,data\n'),
-        ])
-        attachments = utils.prepare_attachments(attachment_data)
-
-        for index, filename in enumerate([file_on_filesystem_name, 'my_test.csv']):
-            expected_header = 'attachment; filename="{}"'.format(
-                os.path.basename(filename)
-            )
-            assert attachments[index].get('Content-Disposition') == expected_header
+        items = [
+            {'title': 'Demo', 'key': 'edX+DemoX', 'subjects': [], 'active': True},
+            {'key': 'edX+Other', 'active': False, 'title': 'Other', 'subjects': ['Math', 'Physics']},
+            {'key': 'edX+Odd', 'extra': 1},
+        ]
+        expected = io.StringIO()
+        expected_writer = csv.writer(expected)
+        expected_writer.writerow(utils.generate_data(items[0], target='key'))
+        for item in items:
+            expected_writer.writerow(utils.generate_data(item, target='value'))
+
+        output = io.StringIO()
+        writer = utils.SortedColumnsCSVWriter(output)
+        for item in items:
+            writer.writerow(item)
+
+        assert output.getvalue() == expected.getvalue()
+        assert writer.header == ['active', 'key', 'subjects', 'title']
 
 
 class TestRetryOnException(unittest.TestCase):
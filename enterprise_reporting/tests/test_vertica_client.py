@@ -2,10 +2,56 @@
 Test Vertica client.
 """
 
+import datetime
 import unittest
+from unittest.mock import MagicMock, patch
 
-from enterprise_reporting import clients
+from enterprise_reporting.clients.vertica import VerticaClient
 
 
 class TestVerticaClient(unittest.TestCase):
-	pass
+	"""
+	Tests for streaming query results from Vertica.
+	"""
+
+	def setUp(self):
+		super().setUp()
+		self.date = datetime.datetime(2024, 1, 15, 10, 30, 0)
+		self.rows = [[1, 'harry@hogwarts.edu', self.date], [2, 'ron@hogwarts.edu', None]]
+		patcher = patch('enterprise_reporting.clients.vertica.vertica_python')
+		self.mock_vertica = patcher.start()
+		self.addCleanup(patcher.stop)
+		self.cursor = MagicMock()
+		batches = iter([self.rows])
+		self.cursor.fetchmany.side_effect = lambda size: next(batches, [])
+		self.mock_vertica.connect.return_value.cursor.return_value = self.cursor
+		self.client = VerticaClient()
+		self.client.connect()
+
+	def test_stream_results(self):
+		"""
+		Verify that rows are streamed with their datetimes formatted.
+		"""
+		assert list(self.client.stream_results('SELECT 1')) == [
+			[1, 'harry@hogwarts.edu', '2024-01-15 10:30:00'],
+			[2, 'ron@hogwarts.edu', None],
+		]
+		self.cursor.execute.assert_called_once_with('SELECT 1')
+
+	def test_stream_batches(self):
+		"""
+		Verify that rows are fetched in batches of the given size.
+		"""
+		assert list(self.client.stream_batches('SELECT 1', batch_size=1000)) == [[
+			(1, 'harry@hogwarts.edu', '2024-01-15 10:30:00'),
+			(2, 'ron@hogwarts.edu', None),
+		]]
+		self.cursor.fetchmany.assert_called_with(1000)
+
+	def test_fetch_results(self):
+		"""
+		Verify that all the raw rows are fetched, in batches of the given size.
+		"""
+		assert self.client.fetch_results('SELECT 1', batch_size=500) == self.rows
+		self.cursor.fetchmany.assert_called_with(500)
+		self.cursor.fetchall.assert_not_called()
@@ -1,8 +1,11 @@
+import io
 import os
 import tempfile
 import zlib
 from zipfile import ZipFile
 
+from mock import MagicMock
+
 
 def create_files(files_data):
     """
@@ -48,3 +51,53 @@ def verify_compressed(self, delivery_files, files, original_file_size, password)
         # either to keep the test robust across environments.
         with self.assertRaises((RuntimeError, zlib.error)):
             zipfile.read(file['file'].name.split('/')[-1], b'wrong-password')
+
+
+class FakeRemoteFile(io.BytesIO):
+    """
+    In-memory remote file of `FakeSFTPClient`, failing once it holds `fail_after` bytes if set.
+    """
+    def __init__(self, sftp, path, initial=b'', fail_after=None):
+        super().__init__(initial)
+        self.sftp = sftp
+        self.path = path
+        self.fail_after = fail_after
+
+    def set_pipelined(self, pipelined=True):
+        pass
+
+    def write(self, data):
+        if self.fail_after is not None and self.tell() + len(data) > self.fail_after:
+            super().write(data[:self.fail_after - self.tell()])
+            self.sftp.files[self.path] = self.getvalue()
+            raise OSError('Connection lost')
+        return super().write(data)
+
+    def close(self):
+        if not self.closed:
+            self.sftp.files[self.path] = self.getvalue()
+        super().close()
+
+
+class FakeSFTPClient:
+    """
+    In-memory stand-in for `paramiko.SFTPClient`, keeping the remote files in the shared `files` dict.
+    """
+    def __init__(self, files, fail_after=None):
+        self.files = files
+        self.fail_after = fail_after
+        self.opened = []
+
+    def open(self, path, mode='r'):
+        self.opened.append((path, mode))
+        initial = self.files.get(path, b'') if 'r' in mode else b''
+        fail_after, self.fail_after = self.fail_after, None
+        return FakeRemoteFile(self, path, initial, fail_after)
+
+    def stat(self, path):
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        return MagicMock(st_size=len(self.files[path]))
+
+    def close(self):
+        pass
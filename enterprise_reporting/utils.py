@@ -3,26 +3,30 @@ Utility functions for Enterprise Reporting.
 """
 
 
+import csv
+import datetime
+import heapq
+import json
 import logging
 import os
 import re
-from collections import OrderedDict
-from email.mime.application import MIMEApplication
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import threading
+from collections import OrderedDict, defaultdict
+from itertools import repeat
+from operator import attrgetter
 from urllib.parse import parse_qs, urlparse
 
-import boto3
-import pgpy
 import pyminizip
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from fernet_fields.hkdf import derive_fernet_key
 
 from django.utils.encoding import force_str
 
-LOGGER = logging.getLogger(__name__)
+from enterprise_reporting import telemetry
+from enterprise_reporting.mailer import send_raw_email
+from enterprise_reporting.streaming import COMPRESSION_LEVEL, copy_encrypted
 
-COMPRESSION_LEVEL = 4
+LOGGER = logging.getLogger(__name__)
 
 FREQUENCY_TYPE_DAILY = 'daily'
 FREQUENCY_TYPE_MONTHLY = 'monthly'
@@ -30,6 +34,11 @@ FREQUENCY_TYPE_WEEKLY = 'weekly'
 
 AWS_REGION = 'us-east-1'
 
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Number of rows fetched at a time from the database cursors of the reports.
+FETCH_BATCH_SIZE = int(os.environ.get('FETCH_BATCH_SIZE', 10000))
+
 
 def compress_and_encrypt(files, password=None, pgp_key=''):
     """
@@ -38,32 +47,40 @@ def compress_and_encrypt(files, password=None, pgp_key=''):
     Return the new filename.
     """
     if pgp_key:
-        zipfile = _get_compressed_file(files)
-        return _get_encrypted_file(zipfile, pgp_key)
+        with telemetry.stage('compression'):
+            zipfile = _get_compressed_file(files)
+        with telemetry.stage('encryption'):
+            return _get_encrypted_file(zipfile, pgp_key)
     else:
-        return _get_compressed_file(files, password)
+        with telemetry.stage('compression'):
+            return _get_compressed_file(files, password)
 
 
 def _get_encrypted_file(zipfile, pgp_key):
     """
     Given a file and a pgp public key, create an encrypted file. Return the new filename.
     """
-    rsa_pub, _ = pgpy.PGPKey.from_blob(pgp_key)
-    message = pgpy.PGPMessage.new(zipfile, file=True)
     pgpfile = f'{zipfile}.pgp'
-    encrypted_message = rsa_pub.encrypt(message)
     with open(pgpfile, 'wb') as encrypted_file:
-        encrypted_file.write(encrypted_message.__bytes__())
+        copy_encrypted(zipfile, encrypted_file, pgp_key)
+    os.remove(zipfile)
     return pgpfile
 
 
+def compressed_file_name(files):
+    """
+    Return the name of the zip file the given file(s) are compressed to.
+    """
+    # Replace the file extension with `.zip`
+    return re.sub(r'\.(\w+)$', '.zip', files[0].name)
+
+
 def _get_compressed_file(files, password=None):
     """
     Given file(s) and a password, create a zip file. Return the new filename.
     """
     multiple_files = len(files) > 1
-    # Replace the file extension with `.zip`
-    zipfile = re.sub(r'\.(\w+)$', '.zip', files[0].name)
+    zipfile = compressed_file_name(files)
     compression = pyminizip.compress_multiple if multiple_files else pyminizip.compress
     src_file_path_prefix = [] if multiple_files else None
     compression(
@@ -76,75 +93,15 @@ def _get_compressed_file(files, password=None):
     return zipfile
 
 
-def prepare_attachments(attachment_data):
-    """
-    Helper function to create a list contain file attachment objects
-    for use with MIMEMultipart
-
-    attachment_data should be a dictionary, with filenames as keys, and None
-        or a string as value. If the value is None, the key is assumed to be a
-        filename
-
-    attachment_data = {
-        'my_file_name.csv': '1,1,1,1,1,\n2,2,2,2,2\n3,3,3,3,3\n'
-        '/abs/path/to/myfile.csv': None
-    }
-
-    Returns a list of MIMEApplication objects
-    """
-
-    attachments = []
-    for filename, data in list(attachment_data.items()):
-        if data is None:
-            msg_attachment = MIMEApplication(open(filename, 'rb').read())
-        else:
-            msg_attachment = MIMEApplication(data)
-        msg_attachment.add_header(
-            'Content-Disposition',
-            'attachment',
-            filename=os.path.basename(filename)
-        )
-        msg_attachment.set_type('application/zip')
-        attachments.append(msg_attachment)
-
-    return attachments
-
-
 def send_email_with_attachment(subject, body, from_email, to_email, attachment_data):
     """
     Send an email with a file attachment.
 
-    Adapted from https://gist.github.com/yosemitebandit/2883593
+    The message is built once, and sent to each recipient independently and concurrently through SES.
 
     attachment_data should be a dict of file name and data key-value pairs
     """
-    # connect to SES
-    client = boto3.client('ses', region_name=AWS_REGION)
-
-    # the message body
-    msg_body = MIMEText(body)
-
-    # the attachment
-    attachments = prepare_attachments(attachment_data)
-
-    # iterate over each email in the list to send emails independently
-    for email in to_email:
-        msg = MIMEMultipart()
-        msg['Subject'] = subject
-        msg['From'] = from_email
-        msg['To'] = email
-
-        # what a recipient sees if they don't use an email reader
-        msg.preamble = 'Multipart message.\n'
-
-        # attach the message body and attachment
-        msg.attach(msg_body)
-        for msg_attachment in attachments:
-            msg.attach(msg_attachment)
-
-        # and send the message
-        result = client.send_raw_email(RawMessage={'Data': msg.as_string()}, Source=msg['From'], Destinations=[email])
-        LOGGER.debug(result)
+    send_raw_email(subject, body, from_email, to_email, attachment_data, AWS_REGION)
 
 
 def is_current_time_in_schedule(current_est_time, frequency, hour_of_day, day_of_month=None, day_of_week=None):
@@ -156,8 +113,8 @@ def is_current_time_in_schedule(current_est_time, frequency, hour_of_day, day_of
     current_day_of_week = current_est_time.weekday()
     current_day_of_month = current_est_time.day
 
-    LOGGER.info(f'Job Current EST: [{current_hour_of_day}-{current_day_of_week}-{current_day_of_month}]')
-    LOGGER.info(f'Enterprise Report Schedule: [{frequency}-{hour_of_day}-{day_of_week}-{day_of_month}]')
+    LOGGER.debug(f'Job Current EST: [{current_hour_of_day}-{current_day_of_week}-{current_day_of_month}]')
+    LOGGER.debug(f'Enterprise Report Schedule: [{frequency}-{hour_of_day}-{day_of_week}-{day_of_month}]')
 
     # All configurations have an hour of the day, so the hour must always match in order to send a report.
     if hour_of_day == current_hour_of_day:
@@ -174,30 +131,145 @@ def is_current_time_in_schedule(current_est_time, frequency, hour_of_day, day_of
     return False
 
 
+def schedule_key(frequency, hour_of_day, day_of_month=None, day_of_week=None):
+    """
+    Return the (frequency, hour, day) key of a schedule, the day being None for daily schedules.
+    """
+    if frequency == FREQUENCY_TYPE_MONTHLY:
+        return frequency, hour_of_day, day_of_month
+    if frequency == FREQUENCY_TYPE_WEEKLY:
+        return frequency, hour_of_day, day_of_week
+    return frequency, hour_of_day, None
+
+
+class ScheduleIndex:
+    """
+    Reporting configs bucketed by the (frequency, hour, day) key of their schedule, built once per run.
+
+    `due` returns the configs whose schedule matches a time, like `is_current_time_in_schedule` does, by looking up
+    the three keys a time can match rather than evaluating the schedule of every config.
+    """
+
+    def __init__(self, reporting_configs):
+        """Index the given reporting configs."""
+        self._buckets = defaultdict(list)
+        for position, reporting_config in enumerate(reporting_configs):
+            key = schedule_key(
+                reporting_config['frequency'],
+                reporting_config['hour_of_day'],
+                reporting_config['day_of_month'],
+                reporting_config['day_of_week'],
+            )
+            self._buckets[key].append((position, reporting_config))
+
+    def due(self, current_est_time):
+        """
+        Return the configs scheduled at the hour of the given time, in the order they were indexed.
+        """
+        hour_of_day = current_est_time.hour
+        buckets = [
+            self._buckets.get((FREQUENCY_TYPE_DAILY, hour_of_day, None), []),
+            self._buckets.get((FREQUENCY_TYPE_WEEKLY, hour_of_day, current_est_time.weekday()), []),
+            self._buckets.get((FREQUENCY_TYPE_MONTHLY, hour_of_day, current_est_time.day), []),
+        ]
+        return [reporting_config for _, reporting_config in heapq.merge(*buckets, key=lambda item: item[0])]
+
+
+class FernetKeyManager:
+    """
+    Fernet encryption with the keys of the LMS, derived once per process for every value of the keys.
+
+    Strings are encrypted with `LMS_FERNET_KEY`, and decrypted with it or any of the comma separated keys of
+    `LMS_FERNET_ROTATED_KEYS`, the keys it replaced. Decrypted strings are cached until the keys change.
+    """
+
+    def __init__(self):
+        """Initialize without any derived key."""
+        self._lock = threading.Lock()
+        self._keys = None
+        self._fernet = None
+        self._decrypted = {}
+
+    def get_fernet(self):
+        """
+        Return the `MultiFernet` of the current keys, deriving them if they changed since the last call.
+        """
+        rotated_keys = os.environ.get('LMS_FERNET_ROTATED_KEYS')
+        keys = (os.environ.get('LMS_FERNET_KEY'),) + tuple(rotated_keys.split(',') if rotated_keys else ())
+        with self._lock:
+            if keys != self._keys:
+                self._fernet = MultiFernet([Fernet(derive_fernet_key(key)) for key in keys])
+                self._keys = keys
+                self._decrypted = {}
+            return self._fernet
+
+    def encrypt(self, string):
+        """
+        Encrypts a string with the current key.
+        """
+        return force_str(self.get_fernet().encrypt(bytes(string, 'utf-8')))
+
+    def decrypt(self, string):
+        """
+        Decrypts a string that was encrypted with the current key or a rotated one.
+        """
+        fernet = self.get_fernet()
+        decrypted = self._decrypted.get(string)
+        if decrypted is None:
+            decrypted = self._decrypted[string] = force_str(fernet.decrypt(bytes(string, 'utf-8')))
+        return decrypted
+
+    def decrypt_all(self, strings):
+        """
+        Decrypts the given strings up front, so that they are served from the cache later on.
+
+        Strings which can not be decrypted are logged and skipped, their error being raised once they are decrypted
+        on their own.
+
+        Returns:
+            (int): Number of strings decrypted.
+        """
+        count = 0
+        for string in set(strings):
+            try:
+                self.decrypt(string)
+            except InvalidToken:
+                LOGGER.warning('Could not decrypt a string with the configured Fernet keys')
+                continue
+            count += 1
+        return count
+
+
+FERNET_KEY_MANAGER = FernetKeyManager()
+
+# Fields of the reporting configs holding encrypted passwords.
+ENCRYPTED_REPORTING_CONFIG_FIELDS = ('encrypted_password', 'encrypted_sftp_password')
+
+
 def encrypt_string(string):
     """
     Encrypts a string using Fernet symmetric encryption.
     """
-    fernet = Fernet(
-        derive_fernet_key(
-            os.environ.get('LMS_FERNET_KEY')
-        )
-    )
-
-    return force_str(fernet.encrypt(bytes(string, 'utf-8')))
+    return FERNET_KEY_MANAGER.encrypt(string)
 
 
 def decrypt_string(string):
     """
     Decrypts a string that was encrypted using Fernet symmetric encryption.
     """
-    fernet = Fernet(
-        derive_fernet_key(
-            os.environ.get('LMS_FERNET_KEY')
-        )
-    )
+    return FERNET_KEY_MANAGER.decrypt(string)
 
-    return force_str(fernet.decrypt(bytes(string, 'utf-8')))
+
+def decrypt_reporting_configs(reporting_configs):
+    """
+    Decrypts the passwords of all the given reporting configs at once, ahead of the report jobs that use them.
+    """
+    return FERNET_KEY_MANAGER.decrypt_all(
+        config[field]
+        for config in reporting_configs
+        for field in ENCRYPTED_REPORTING_CONFIG_FIELDS
+        if config.get(field)
+    )
 
 
 def flatten_dict(d, target='key' or 'value'):
@@ -276,6 +348,160 @@ def flatten_dict(d, target='key' or 'value'):
     return flattened
 
 
+class _ShapeMismatch(Exception):
+    """Raised when a dict is not shaped like the dict a `FlattenPlan` was compiled from."""
+
+
+# Kinds of the nodes of a `FlattenPlan`.
+_DICT, _LIST, _EMPTY_LIST = range(3)
+
+
+def _compile_flatten_node(value):
+    """
+    Return the plan node of a nested dict or list: `(_DICT, sorted keys, child nodes)` with a None child for plain
+    values, `(_LIST, element node)` with a None element node for lists of plain values, or `(_EMPTY_LIST,)`.
+    """
+    if isinstance(value, dict):
+        keys = tuple(sorted(value))
+        return _DICT, keys, tuple(
+            _compile_flatten_node(value[key]) if isinstance(value[key], (dict, list)) else None for key in keys
+        )
+    if not value:
+        return (_EMPTY_LIST,)
+    return _LIST, _compile_flatten_node(value[0]) if isinstance(value[0], dict) else None
+
+
+def _extract_flatten_values(node, value, values, lengths):
+    """
+    Append the flattened values of `value` to `values`, and the length of every list met to `lengths`.
+    """
+    kind = node[0]
+    if kind == _DICT:
+        _, keys, children = node
+        if not isinstance(value, dict) or len(value) != len(keys):
+            raise _ShapeMismatch
+        for key, child in zip(keys, children):
+            try:
+                item = value[key]
+            except KeyError as error:
+                raise _ShapeMismatch from error
+            if child is None:
+                if isinstance(item, (dict, list)):
+                    raise _ShapeMismatch
+                values.append(item)
+            else:
+                _extract_flatten_values(child, item, values, lengths)
+        return
+
+    if not isinstance(value, list) or (kind == _EMPTY_LIST and value):
+        raise _ShapeMismatch
+    lengths.append(len(value))
+    if kind == _EMPTY_LIST:
+        return
+    element = node[1]
+    if element is None:
+        for item in value:
+            if isinstance(item, (dict, list)):
+                raise _ShapeMismatch
+        values.extend(value)
+    else:
+        for item in value:
+            _extract_flatten_values(element, item, values, lengths)
+
+
+def _flatten_keys(node, prefix, lengths, keys):
+    """
+    Append the flattened keys of a value planned by `node` to `keys`, taking its list lengths from `lengths`.
+    """
+    kind = node[0]
+    if kind == _DICT:
+        for key, child in zip(node[1], node[2]):
+            name = key if prefix is None else f'{prefix}_{key}'
+            if child is None:
+                keys.append(name)
+            else:
+                _flatten_keys(child, name, lengths, keys)
+        return
+
+    length = next(lengths)
+    if kind == _EMPTY_LIST:
+        return
+    element = node[1]
+    for index in range(length):
+        if element is None:
+            keys.append(f'{prefix}_{index}')
+        else:
+            _flatten_keys(element, f'{prefix}_{index}', lengths, keys)
+
+
+class FlattenPlan:
+    """
+    Precomputed flattening of the dicts shaped like a given dict, with the same output as `flatten_dict`.
+
+    The sorted keys of every nested dict, and the kind of items of every nested list, are derived once from the dict
+    the plan is compiled from. Other dicts with the same keys at every level are then flattened in a single pass,
+    without sorting, whatever the length of their lists. The flattened keys are computed once per list lengths.
+    """
+
+    def __init__(self, d):
+        """Compile the plan of dicts shaped like `d`, raising the errors `flatten_dict` raises for `d`."""
+        flatten_dict(d, target='key')
+        self._root = _compile_flatten_node(d)
+        self._keys = {}
+
+    def flatten(self, d):
+        """
+        Return the flattened keys and values of `d`, or raise `_ShapeMismatch` if it is not shaped like the plan.
+        """
+        values = []
+        lengths = []
+        _extract_flatten_values(self._root, d, values, lengths)
+        lengths = tuple(lengths)
+        keys = self._keys.get(lengths)
+        if keys is None:
+            keys = self._keys[lengths] = []
+            _flatten_keys(self._root, None, iter(lengths), keys)
+        return keys, values
+
+
+class DictFlattener:
+    """
+    Flatten a stream of dicts like `flatten_dict`, reusing the plans compiled from previous dicts of the same shape.
+
+    A flattener is meant to be used for items of the same type, such as the content metadata of one content type,
+    which mostly share a single plan.
+    """
+
+    MAX_PLANS = 8
+
+    def __init__(self):
+        """Initialize without any plan."""
+        self.plans = []
+
+    def flatten(self, d):
+        """
+        Return the flattened keys and values of `d`, as `flatten_dict` does with `target='key'` and `target='value'`.
+        """
+        for index, plan in enumerate(self.plans):
+            try:
+                keys, values = plan.flatten(d)
+            except _ShapeMismatch:
+                continue
+            if index:
+                # Keep the most recently used plan first.
+                self.plans.insert(0, self.plans.pop(index))
+            return list(keys), values
+
+        plan = FlattenPlan(d)
+        try:
+            keys, values = plan.flatten(d)
+        except _ShapeMismatch:
+            # The items of a list of `d` differ from each other, which no plan supports.
+            return flatten_dict(d, target='key'), flatten_dict(d, target='value')
+        self.plans = [plan] + self.plans[:self.MAX_PLANS - 1]
+        return list(keys), values
+
+
 def generate_data(item, target='key' or 'value'):
     """
     Either return a list of JSON data objects or
@@ -297,6 +523,135 @@ def generate_data(item, target='key' or 'value'):
     return data
 
 
+class SortedColumnsCSVWriter:
+    """
+    Write dict items to a CSV file with one column per key, in key order, like `generate_data`.
+
+    The header is taken from the first item, and its sorted keys are reused for every item with the same keys, so
+    rows are written as items arrive without sorting each of them.
+    """
+
+    def __init__(self, file):
+        """Initialize with a file object opened for writing text."""
+        self.writer = csv.writer(file)
+        self.header = None
+        self.keys = None
+
+    def writerow(self, item):
+        """Write the given item, preceded by the header row if it is the first one."""
+        if self.header is None:
+            self.header = sorted(item)
+            self.keys = set(self.header)
+            self.writer.writerow(self.header)
+        if item.keys() == self.keys:
+            values = [item[key] for key in self.header]
+        else:
+            # Keep the columns of an item with other keys than the first one in its own key order.
+            values = [item[key] for key in sorted(item)]
+        # For empty list we are just writing an empty string ''.
+        self.writer.writerow(['' if isinstance(value, list) and not value else value for value in values])
+
+
+def write_csv_records(file, records, sort_keys=False):
+    """
+    Write the given dict records to a CSV file as they are consumed, with a header row taken from the first one.
+
+    Arguments:
+        file: File object opened for writing text.
+        records (iterable): The records, possibly a generator.
+        sort_keys (bool): Whether to order the columns of every record by key instead of by insertion order.
+
+    Returns:
+        (int): Number of records written.
+    """
+    writer = csv.writer(file)
+    count = 0
+    for record in records:
+        if sort_keys:
+            record = OrderedDict(sorted(record.items()))
+        if not count:
+            writer.writerow(list(record.keys()))
+        writer.writerow(list(record.values()))
+        count += 1
+    return count
+
+
+_TZINFO = attrgetter('tzinfo')
+
+
+def format_datetime(value):
+    """
+    Return the given datetime formatted with `DATETIME_FORMAT`, and any other value as is.
+    """
+    if value.__class__ is datetime.datetime and value.tzinfo is None and value.year >= 1000:
+        # Same output as `strftime(DATETIME_FORMAT)`, several times faster.
+        return value.isoformat(' ', 'seconds')
+    if isinstance(value, datetime.datetime):
+        return value.strftime(DATETIME_FORMAT)
+    return value
+
+
+def format_datetime_columns(rows):
+    """
+    Return the given rows with their datetimes formatted with `DATETIME_FORMAT`.
+
+    The rows are transposed so that only the columns holding datetimes are formatted, a column at a time.
+
+    Arguments:
+        rows (list): Rows of the same length, as sequences of values.
+
+    Returns:
+        (list): The formatted rows as tuples, or the given rows if they hold no datetime.
+    """
+    if not rows:
+        return []
+    columns = list(zip(*rows))
+    formatted = False
+    for index, column in enumerate(columns):
+        value_types = set(map(type, column))
+        if value_types == {datetime.datetime} and not any(map(_TZINFO, column)) and min(column).year >= 1000:
+            # Every value is a naive datetime, formatted without calling back into Python for each of them.
+            columns[index] = map(datetime.datetime.isoformat, column, repeat(' '), repeat('seconds'))
+        elif any(issubclass(value_type, datetime.datetime) for value_type in value_types):
+            columns[index] = map(format_datetime, column)
+        else:
+            continue
+        formatted = True
+    return list(zip(*columns)) if formatted else rows
+
+
+def iter_row_batches(cursor, batch_size=FETCH_BATCH_SIZE, format_datetimes=True):
+    """
+    Yield the rows of an executed database cursor, `batch_size` rows at a time, with their datetimes formatted unless
+    `format_datetimes` is False.
+
+    Every batch of formatted rows can be given to `csv.writer.writerows` as is.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield format_datetime_columns(rows) if format_datetimes else rows
+
+
+def write_json_records(file, records):
+    """
+    Write the given records to a file as a JSON array as they are consumed.
+
+    The output is identical to `json.dump(list(records), file, indent=4)`, without holding all the records in memory.
+
+    Returns:
+        (int): Number of records written.
+    """
+    count = 0
+    for record in records:
+        file.write(',\n    ' if count else '[\n    ')
+        file.write(json.dumps(record, indent=4).replace('\n', '\n    '))
+        count += 1
+    file.write('\n]' if count else '[]')
+    return count
+
+
 def get_content_metadata_item_id(content_metadata_item):
     """
     Return the unique identifier given a content metadata item dictionary.